@@ -0,0 +1,208 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.ingestion.chunker import estimate_tokens
+
+# Shortest shared text treated as a chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+def pack_context(
+    query_embedding,
+    hits: List[Dict],
+    max_tokens: int = 800,
+    mmr_lambda: float = 0.7,
+    dedupe_threshold: float = 0.95,
+    baseline_k: Optional[int] = None,
+) -> Tuple[List[Dict], Dict]:
+    """
+    Turn ranked search hits into prompt passages.
+
+    1. Drop exact and near-duplicate chunks (cosine >= `dedupe_threshold`).
+    2. Merge chunks of the same document that overlap or are adjacent
+       (consecutive ids), removing the repeated text.
+    3. Order passages with maximal marginal relevance:
+       `mmr_lambda * sim(query) - (1 - mmr_lambda) * max sim(selected)`.
+    4. Keep passages in that order while they fit in the budget; a merged
+       passage that does not fit is retried as its individual chunks.
+       If nothing fits, the best passage is kept, truncated to the budget.
+
+    The budget is `max_tokens`, capped at what the first `baseline_k` hits
+    would cost verbatim, so packing never makes the prompt larger.
+
+    Hits must carry "embedding" (search with `with_vectors=True`).
+    Returns (passages, report). The report counts the repeated text
+    removed from the candidates and compares the packed context with
+    joining the first `baseline_k` hits verbatim (the unpacked prompt).
+    """
+    baseline_k = baseline_k or len(hits)
+    hit_tokens = [estimate_tokens(h["text"]) for h in hits]
+    baseline_tokens = sum(hit_tokens[:baseline_k])
+
+    unique = _dedupe(hits, dedupe_threshold)
+    passages = _merge_neighbours(unique)
+    ordered = _mmr(query_embedding, passages, mmr_lambda)
+
+    budget = min(max_tokens, baseline_tokens)
+    packed, used = [], 0
+    for passage in ordered:
+        # Too long as one passage: keep whichever of its chunks still fit
+        for part in [passage] + passage["members"]:
+            tokens = estimate_tokens(part["text"])
+            if used + tokens > budget:
+                continue
+            packed.append(part)
+            used += tokens
+            if part is passage:
+                break
+
+    if not packed and passages and budget > 0:
+        # Nothing fits whole: keep the best passage (its best chunk when
+        # merged), truncated, rather than answering without context
+        top = min(passages, key=lambda p: p["rank"])
+        top = dict((top["members"] or [top])[0])
+        top["text"] = _truncate(top["text"], budget)
+        packed.append(top)
+        used = estimate_tokens(top["text"])
+
+    report = {
+        "candidates": len(hits),
+        "passages": len(packed),
+        "tokens": used,
+        "redundant_tokens": sum(hit_tokens)
+        - sum(estimate_tokens(p["text"]) for p in passages),
+        "baseline_tokens": baseline_tokens,
+        "saved_tokens": baseline_tokens - used,
+    }
+    return packed, report
+
+
+# -------------------------------------------------
+# Steps
+# -------------------------------------------------
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """
+    Longest prefix of `text` within `max_tokens`, cut at a word boundary
+    when there is one.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text, 0, mid) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    space = text.rfind(" ", 0, low + 1)
+    return text[:space if space > 0 else low].rstrip()
+
+
+def _dedupe(hits: List[Dict], threshold: float) -> List[Dict]:
+    kept, vectors, texts = [], [], set()
+    for hit in hits:
+        text = " ".join(hit["text"].split()).lower()
+        if text in texts:
+            continue
+        vector = _unit(hit["embedding"])
+        if vectors and float(np.max(np.stack(vectors) @ vector)) >= threshold:
+            continue
+        kept.append(hit)
+        vectors.append(vector)
+        texts.add(text)
+    return kept
+
+
+def _overlap(a: str, b: str) -> int:
+    """
+    Length of the longest suffix of `a` that is a prefix of `b`.
+    """
+    if len(a) < MIN_OVERLAP_CHARS or len(b) < MIN_OVERLAP_CHARS:
+        return 0
+    probe = b[:MIN_OVERLAP_CHARS]
+    start = a.find(probe, max(0, len(a) - len(b)))
+    while start != -1:
+        if b.startswith(a[start:]):
+            return len(a) - start
+        start = a.find(probe, start + 1)
+    return 0
+
+
+def _merge_neighbours(hits: List[Dict]) -> List[Dict]:
+    """
+    Group same-document hits into runs of consecutive or overlapping
+    chunks. A merged passage keeps the best score of its members and
+    the mean of their vectors.
+    """
+    by_doc: Dict[str, List[Dict]] = {}
+    for rank, hit in enumerate(hits):
+        by_doc.setdefault(hit.get("document_id"), []).append({**hit, "rank": rank})
+
+    passages = []
+    for doc_hits in by_doc.values():
+        doc_hits.sort(key=lambda h: h["id"])
+        run = [doc_hits[0]]
+        for hit in doc_hits[1:]:
+            prev = run[-1]
+            if hit["id"] == prev["id"] + 1 or _overlap(prev["text"], hit["text"]):
+                run.append(hit)
+            else:
+                passages.append(_join(run))
+                run = [hit]
+        passages.append(_join(run))
+
+    # Back in relevance order of each passage's best member
+    passages.sort(key=lambda p: p["rank"])
+    return passages
+
+
+def _join(run: List[Dict]) -> Dict:
+    text = run[0]["text"]
+    for hit in run[1:]:
+        cut = _overlap(text, hit["text"])
+        text += hit["text"][cut:] if cut else "\n\n" + hit["text"]
+
+    best = min(run, key=lambda h: h["rank"])
+    members = []
+    if len(run) > 1:
+        members = [_join([hit]) for hit in sorted(run, key=lambda h: h["rank"])]
+    return {
+        "ids": [h["id"] for h in run],
+        "text": text,
+        "score": best.get("score"),
+        "rank": best["rank"],
+        "document": best.get("document"),
+        "document_id": best.get("document_id"),
+        "embedding": _unit(np.mean([_unit(h["embedding"]) for h in run], axis=0)),
+        "members": members,
+    }
+
+
+def _mmr(query_embedding, passages: List[Dict], mmr_lambda: float) -> List[Dict]:
+    if len(passages) <= 1:
+        return passages
+
+    query = _unit(query_embedding)
+    vectors = np.stack([p["embedding"] for p in passages])
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+
+    selected: List[int] = []
+    remaining = list(range(len(passages)))
+    redundancy = np.full(len(passages), -np.inf, dtype=np.float32)
+    while remaining:
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * penalty
+        best = max(remaining, key=lambda i: scores[i])
+        selected.append(best)
+        remaining.remove(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+
+    return [passages[i] for i in selected]
@@ -37,30 +37,101 @@
 #     return answer.strip()
 
 
+import asyncio
 import logging
-from src.llm.groq_client import call_llm
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
+
+from src.app.config import settings
+from src.llm.gemini_client import embed_texts
+from src.llm.llm_client import agenerate, astream, call_llm, stream_llm
 from src.mcp.registry import MCP_TOOLS
+from src.Query.context_packer import pack_context
+from src.Query.semantic_cache import answer_cache
+from src.utils.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+NO_CONTEXT_ANSWER = "I could not find relevant information in the document."
 
-def answer_question(question: str) -> str:
-    """
-    Simple agent loop using MCP tools.
-    """
 
-    logger.info(f"[QUERY] {question}")
+def _retrieve(
+    question: str,
+    embedding: list[float],
+    document_id: str | None = None,
+    ef: int | None = None,
+    session_id: str | None = None,
+) -> list[dict]:
+    # Retrieve context via MCP tool
+    hits = MCP_TOOLS["vector.search"](
+        query=question,
+        document_id=document_id,
+        embedding=embedding,
+        session_id=session_id,
+        **_search_options(ef),
+    )
+    return _pack(embedding, hits)
 
-    # Step 1: Retrieve context via MCP tool
-    search_tool = MCP_TOOLS["vector.search"]
-    results = search_tool(query=question, top_k=5)
 
-    if not results:
-        return "I could not find relevant information in the document."
+def _retrieve_batch(
+    questions: list[str],
+    embeddings: list[list[float]],
+    document_id: str | None = None,
+    ef: int | None = None,
+    session_id: str | None = None,
+) -> list[list[dict]]:
+    # One multi-vector search for every question
+    batches = MCP_TOOLS["vector.search_batch"](
+        queries=questions,
+        document_id=document_id,
+        embeddings=embeddings,
+        session_id=session_id,
+        **_search_options(ef),
+    )
+    return [_pack(e, hits) for e, hits in zip(embeddings, batches)]
+
+
+def _search_options(ef: int | None = None) -> dict:
+    options = {"top_k": settings.TOP_K}
+    if settings.CONTEXT_PACKING:
+        # Over-fetch, then pack: dedupe, merge neighbours, MMR, token budget
+        options = {
+            "top_k": max(settings.CONTEXT_CANDIDATES, settings.TOP_K),
+            "with_vectors": True,
+        }
+    if ef is not None:
+        options["ef"] = ef
+    return options
+
 
+def _pack(embedding: list[float], hits: list[dict]) -> list[dict]:
+    if not settings.CONTEXT_PACKING:
+        return hits
+
+    passages, report = pack_context(
+        embedding,
+        hits,
+        max_tokens=settings.CONTEXT_MAX_TOKENS,
+        mmr_lambda=settings.CONTEXT_MMR_LAMBDA,
+        dedupe_threshold=settings.CONTEXT_DEDUPE_THRESHOLD,
+        baseline_k=settings.TOP_K,
+    )
+    metrics.inc("rag_tokens_total", report["tokens"], stage="context_packed")
+    metrics.inc("rag_tokens_total", report["saved_tokens"], stage="context_saved")
+    logger.info(
+        f"CONTEXT PACK | candidates={report['candidates']} "
+        f"| passages={report['passages']} | tokens={report['tokens']} "
+        f"| redundant_tokens={report['redundant_tokens']} "
+        f"| saved_tokens={report['saved_tokens']}"
+    )
+    return passages
+
+
+def _build_prompt(question: str, results: list[dict]) -> str:
     context = "\n\n".join(r["text"] for r in results)
 
-    prompt = f"""
+    return f"""
 You are answering questions from a document.
 
 Context:
@@ -72,7 +143,267 @@ Question:
 Answer clearly and concisely.
 """
 
-    answer = call_llm(prompt)
+
+def _cache_answer(
+    embedding, answer, document_id, question, start, generation, session_id=None
+):
+    if answer_cache is not None:
+        answer_cache.store(
+            embedding,
+            answer,
+            scope=document_id,
+            question=question,
+            latency_s=time.perf_counter() - start,
+            generation=generation,
+            session=session_id,
+        )
+
+
+def _prepare(question, document_id, ef, session_id):
+    """
+    Embed the question, then answer it from the semantic cache or
+    retrieve its context. Returns (embedding, generation, cached, results).
+    """
+    embedding = embed_texts([question])[0]
+    generation = answer_cache.generation if answer_cache else None
+    if answer_cache is not None:
+        cached = answer_cache.lookup(embedding, scope=document_id, session=session_id)
+        if cached is not None:
+            logger.info("[ANSWER CACHE HIT]")
+            return embedding, generation, cached, []
+
+    results = _retrieve(question, embedding, document_id, ef, session_id)
+    return embedding, generation, None, results
+
+
+@metrics.timed("answer_question")
+def answer_question(
+    question: str,
+    document_id: str | None = None,
+    ef: int | None = None,
+    session_id: str | None = None,
+) -> str:
+    """
+    Simple agent loop using MCP tools.
+    `document_id` scopes retrieval to one document; `ef` overrides the
+    HNSW search beam; `session_id` searches that session's documents
+    instead of the shared index.
+    Near-identical questions are answered from the semantic cache.
+    """
+
+    logger.info(f"[QUERY] {question}")
+    start = time.perf_counter()
+
+    # Step 0-1: Semantic cache, then context via MCP tool
+    embedding, generation, cached, results = _prepare(
+        question, document_id, ef, session_id
+    )
+    if cached is not None:
+        return cached
+    if not results:
+        return NO_CONTEXT_ANSWER
+
+    # Step 2: Generate the answer
+    answer = call_llm(_build_prompt(question, results))
+    _cache_answer(embedding, answer, document_id, question, start, generation, session_id)
 
     logger.info("[ANSWER GENERATED]")
     return answer
+
+
+async def answer_question_async(
+    question: str,
+    document_id: str | None = None,
+    ef: int | None = None,
+    session_id: str | None = None,
+) -> str:
+    """
+    `answer_question` for event-loop callers: embedding and retrieval
+    run in a worker thread, generation is awaited on the LLM client.
+    """
+
+    logger.info(f"[QUERY] {question}")
+    start = time.perf_counter()
+
+    with metrics.track("answer_question"):
+        embedding, generation, cached, results = await asyncio.to_thread(
+            _prepare, question, document_id, ef, session_id
+        )
+        if cached is not None:
+            return cached
+        if not results:
+            return NO_CONTEXT_ANSWER
+
+        answer = await agenerate(_build_prompt(question, results))
+        _cache_answer(
+            embedding, answer, document_id, question, start, generation, session_id
+        )
+
+    logger.info("[ANSWER GENERATED]")
+    return answer
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+@metrics.timed("answer_questions")
+def answer_questions(
+    questions: list[str],
+    document_id: str | None = None,
+    max_concurrency: int | None = None,
+    ef: int | None = None,
+    session_id: str | None = None,
+) -> list[dict]:
+    """
+    Batch variant of `answer_question`.
+    All questions are embedded in one batched request and retrieved with
+    one multi-vector search; answers are generated with at most
+    `max_concurrency` LLM calls in flight. Results keep input order and
+    carry per-question timings in milliseconds.
+    """
+
+    logger.info(f"[QUERY BATCH] questions={len(questions)}")
+    start = time.perf_counter()
+
+    embeddings = embed_texts(questions)
+    embed_s = time.perf_counter() - start
+    generation = answer_cache.generation if answer_cache else None
+
+    results = [
+        {"question": q, "answer": None, "cached": False, "timings": {"embed_ms": _ms(embed_s)}}
+        for q in questions
+    ]
+
+    # Step 0: Semantic cache
+    pending = []
+    for i, embedding in enumerate(embeddings):
+        cached = (
+            answer_cache.lookup(embedding, scope=document_id, session=session_id)
+            if answer_cache is not None
+            else None
+        )
+        if cached is None:
+            pending.append(i)
+        else:
+            results[i].update(answer=cached, cached=True)
+            results[i]["timings"]["total_ms"] = _ms(time.perf_counter() - start)
+
+    # Step 1: Retrieve context for every cache miss in one search
+    retrieve_start = time.perf_counter()
+    contexts = []
+    if pending:
+        contexts = _retrieve_batch(
+            [questions[i] for i in pending],
+            [embeddings[i] for i in pending],
+            document_id,
+            ef,
+            session_id,
+        )
+    retrieve_ms = _ms(time.perf_counter() - retrieve_start)
+
+    # Step 2: Generate with bounded concurrency
+    def _generate(i, context):
+        timings = results[i]["timings"]
+        timings["retrieve_ms"] = retrieve_ms
+        generate_start = time.perf_counter()
+        try:
+            if not context:
+                results[i]["answer"] = NO_CONTEXT_ANSWER
+            else:
+                answer = call_llm(_build_prompt(questions[i], context))
+                results[i]["answer"] = answer
+                _cache_answer(
+                    embeddings[i],
+                    answer,
+                    document_id,
+                    questions[i],
+                    start,
+                    generation,
+                    session_id,
+                )
+        except Exception as exc:
+            # One failed generation must not fail the whole batch
+            logger.exception(f"QUERY BATCH FAILED | question={questions[i]!r}")
+            results[i]["error"] = str(exc)
+        timings["generate_ms"] = _ms(time.perf_counter() - generate_start)
+        timings["total_ms"] = _ms(time.perf_counter() - start)
+
+    workers = min(max_concurrency or settings.QUERY_BATCH_CONCURRENCY, len(pending))
+    workers = max(workers, 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query-batch") as pool:
+        list(pool.map(_generate, pending, contexts))
+
+    logger.info(
+        f"[ANSWER BATCH] questions={len(questions)} | cached={len(questions) - len(pending)} "
+        f"| total={_ms(time.perf_counter() - start):.0f}ms"
+    )
+    return results
+
+
+def stream_answer(
+    question: str,
+    document_id: str | None = None,
+    ef: int | None = None,
+    session_id: str | None = None,
+) -> Iterator[str]:
+    """
+    Streaming variant of `answer_question`: yields answer text deltas.
+    """
+
+    logger.info(f"[QUERY STREAM] {question}")
+    start = time.perf_counter()
+
+    embedding, generation, cached, results = _prepare(
+        question, document_id, ef, session_id
+    )
+    if cached is not None:
+        yield cached
+        return
+    if not results:
+        yield NO_CONTEXT_ANSWER
+        return
+
+    parts = []
+    for token in stream_llm(_build_prompt(question, results)):
+        parts.append(token)
+        yield token
+
+    _cache_answer(
+        embedding, "".join(parts), document_id, question, start, generation, session_id
+    )
+    logger.info("[ANSWER STREAMED]")
+
+
+async def stream_answer_async(
+    question: str,
+    document_id: str | None = None,
+    ef: int | None = None,
+    session_id: str | None = None,
+) -> AsyncIterator[str]:
+    """
+    Async variant of `stream_answer`.
+    """
+
+    logger.info(f"[QUERY STREAM] {question}")
+    start = time.perf_counter()
+
+    embedding, generation, cached, results = await asyncio.to_thread(
+        _prepare, question, document_id, ef, session_id
+    )
+    if cached is not None:
+        yield cached
+        return
+    if not results:
+        yield NO_CONTEXT_ANSWER
+        return
+
+    parts = []
+    async for token in astream(_build_prompt(question, results)):
+        parts.append(token)
+        yield token
+
+    _cache_answer(
+        embedding, "".join(parts), document_id, question, start, generation, session_id
+    )
+    logger.info("[ANSWER STREAMED]")
@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.app.config import settings
+from src.utils.metrics import metrics
+
+
+class _Entry:
+    __slots__ = (
+        "vector", "session", "scope", "question", "answer", "latency_s", "created_at"
+    )
+
+    def __init__(self, vector, session, scope, question, answer, latency_s):
+        self.vector = vector
+        self.session = session
+        self.scope = scope
+        self.question = question
+        self.answer = answer
+        self.latency_s = latency_s
+        self.created_at = time.time()
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on question meaning rather than exact text.
+
+    Each entry holds (normalized query embedding, document scope, answer).
+    A lookup returns the cached answer of the most similar question in
+    the same scope if its cosine similarity is >= `threshold`.
+    Entries expire after `ttl_seconds` and the least recently used ones
+    are evicted beyond `max_entries`.
+
+    Scope is the `document_id` a question was restricted to, or None for
+    the whole corpus. Entries of different sessions never match each
+    other; `session` None is the shared index.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._next_id = 0
+        # (session, scope) -> (entry ids, stacked vectors), rebuilt after changes
+        self._matrices: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency_s = 0.0
+        self.invalidations = 0
+        # Bumped on every invalidation so answers computed against an
+        # older index are not stored afterwards
+        self.generation = 0
+
+    # -------------------------------------------------
+    # Lookup / store
+    # -------------------------------------------------
+    def lookup(
+        self, embedding, scope: Optional[str] = None, session: Optional[str] = None
+    ) -> Optional[str]:
+        query = _normalize(embedding)
+        entry = None
+
+        with self._lock:
+            self._expire()
+            ids, matrix = self._matrix(session, scope)
+
+            if ids:
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry = self._entries[ids[best]]
+                    self._entries.move_to_end(ids[best])
+                    self.hits += 1
+                    self.saved_latency_s += entry.latency_s
+            if entry is None:
+                self.misses += 1
+
+        if entry is None:
+            metrics.inc("rag_answer_cache_lookups_total", result="miss")
+            return None
+        metrics.inc("rag_answer_cache_lookups_total", result="hit")
+        metrics.inc("rag_answer_cache_saved_seconds_total", entry.latency_s)
+        return entry.answer
+
+    def store(
+        self,
+        embedding,
+        answer: str,
+        scope: Optional[str] = None,
+        question: str = "",
+        latency_s: float = 0.0,
+        generation: Optional[int] = None,
+        session: Optional[str] = None,
+    ):
+        """
+        Cache an answer. Pass the `generation` read before retrieval to
+        discard answers that raced with an index change.
+        """
+        entry = _Entry(_normalize(embedding), session, scope, question, answer, latency_s)
+
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrices.clear()
+
+    # -------------------------------------------------
+    # Invalidation
+    # -------------------------------------------------
+    def invalidate(self, document_id: Optional[str] = None, session: Optional[str] = None):
+        """
+        Drop answers of `session` that may be stale after `document_id`
+        changed: entries scoped to it plus whole-corpus entries.
+        With no document_id every entry of the session is dropped.
+        """
+        with self._lock:
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry.session == session
+                and (document_id is None or entry.scope in (None, document_id))
+            ]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._matrices.clear()
+            self.invalidations += 1
+            self.generation += 1
+        metrics.inc("rag_answer_cache_invalidations_total")
+
+    # -------------------------------------------------
+    # Internals
+    # -------------------------------------------------
+    def _expire(self):
+        if not self.ttl_seconds:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        expired = [k for k, e in self._entries.items() if e.created_at < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrices.clear()
+
+    def _matrix(self, session: Optional[str], scope: Optional[str]):
+        key = (session, scope)
+        if key not in self._matrices:
+            ids = [
+                k for k, e in self._entries.items() if e.session == session and e.scope == scope
+            ]
+            matrix = (
+                np.stack([self._entries[k].vector for k in ids]) if ids else None
+            )
+            self._matrices[key] = (ids, matrix)
+        return self._matrices[key]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_latency_s": round(self.saved_latency_s, 3),
+            "entries": len(self._entries),
+            "invalidations": self.invalidations,
+        }
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# Process-wide answer cache (None when disabled)
+answer_cache = (
+    SemanticCache(
+        threshold=settings.ANSWER_CACHE_THRESHOLD,
+        max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+    )
+    if settings.ANSWER_CACHE_ENABLED
+    else None
+)
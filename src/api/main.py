@@ -1,102 +1,398 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pathlib import Path
-import shutil
+from starlette.requests import ClientDisconnect
+from typing import Optional
+import hashlib
+import json
+import time
 import uuid
 from pydantic import BaseModel
 
-from src.ingestion.preocr import analyze_document
-from src.ingestion.loader import load_document
-from src.ingestion.chunker import semantic_chunk_text
-from src.llm.gemini_client import embed_texts
-from src.vectorstore.milvus_client import MilvusClient
-from src.Query.query_engine import answer_question
+from src.app.config import settings
+from src.ingestion.loader import supported_extensions
+from src.ingestion.jobs import ingest_jobs
+from src.ingestion.ocr import check_ocr_backend
+from src.ingestion.uploads import (
+    UploadConflict,
+    UploadNotFound,
+    UploadTooLarge,
+    uploads,
+)
+from src.llm.gemini_client import embedding_cache_stats
+from src.llm.llm_client import LLMDeadlineExceeded, llm_stats
+from src.Query.query_engine import (
+    answer_question_async,
+    answer_questions,
+    stream_answer_async,
+)
+from src.Query.semantic_cache import answer_cache
 from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.vectorstore.hnsw import MAX_EF
+from src.vectorstore.sessions import SessionBusy, SessionNotFound, sessions
+from src.vectorstore.store import use_vector_store
 
 
 # -------------------------------------------------
 # App setup
 # -------------------------------------------------
-app = FastAPI(title="Agentic RAG API (Overwrite Mode)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Surface a broken setup at startup, not on the first request
+    settings.validate("vectordb")
+    if settings.VECTOR_DB == "milvus":
+        settings.validate("milvus")
+    if settings.ENABLE_PREOCR:
+        await run_in_threadpool(check_ocr_backend)
+    yield
 
-UPLOAD_DIR = Path("data/uploads")
+
+app = FastAPI(
+    title=f"Agentic RAG API ({settings.INGEST_MODE.title()} Mode)",
+    lifespan=lifespan,
+)
+
+UPLOAD_DIR = Path(settings.UPLOAD_DIR)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _check_extension(filename: str) -> str:
+    ext = Path(filename).suffix.lower()
+    if ext not in supported_extensions():
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+    return ext
+
+
+def _check_session(session_id: Optional[str]):
+    # May delete expired sessions (blocking I/O): async handlers run it
+    # in the threadpool
+    if session_id is None:
+        return
+    try:
+        sessions.get(session_id)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+async def _queue_ingest(
+    file_path: Path,
+    document_id: str,
+    document_name: str,
+    sha256: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> dict:
+    """
+    Queue the ingestion job (PreOCR runs as its first stage); with
+    `sha256`, the file is remembered as ingested once the job completes.
+    """
+    logger.info(f"INGEST STARTED | file={document_name} | session={session_id}")
+
+    on_complete = None
+    if sha256:
+        def on_complete(job):
+            uploads.mark_ingested(
+                sha256, job.document_id, job.document_name, job.session_id
+            )
+
+    # PreOCR → load → chunk → embed → insert, on the ingest worker pool
+    job = ingest_jobs.submit(
+        str(file_path),
+        document_id=document_id,
+        document_name=document_name,
+        on_complete=on_complete,
+        session_id=session_id,
+    )
+
+    return {
+        "status": "queued",
+        "job_id": job.id,
+        "active_document": document_name,
+        "document_id": document_id,
+        "session_id": session_id,
+        "mode": settings.INGEST_MODE,
+    }
+
+
+# -------------------------------------------------
+# Sessions (one isolated index per user)
+# -------------------------------------------------
+@app.post("/sessions", status_code=201)
+async def create_session():
+    """
+    Start a session. Pass its `session_id` to /ingest, /uploads,
+    /query and /documents to work on documents only this session sees.
+    """
+    session = await run_in_threadpool(sessions.create)
+    return session.to_dict()
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    try:
+        session = await run_in_threadpool(sessions.get, session_id)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session.to_dict()
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """
+    Drop the session and every document ingested into it.
+    """
+    try:
+        await run_in_threadpool(sessions.delete, session_id)
+    except SessionNotFound:
+        raise HTTPException(status_code=404, detail="Session not found")
+    except SessionBusy:
+        raise HTTPException(status_code=409, detail="Session is in use")
+    return {"status": "deleted", "session_id": session_id}
+
+
 # -------------------------------------------------
-# Ingest Endpoint (OVERWRITE MODE)
+# Ingest Endpoint
 # -------------------------------------------------
-@app.post("/ingest")
-async def ingest_file(file: UploadFile = File(...)):
+@app.post("/ingest", status_code=202)
+async def ingest_file(
+    file: UploadFile = File(...),
+    document_id: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None),
+):
     """
     Upload a document.
-    This DROPS the previous document and replaces it.
-    """
-
-    ext = Path(file.filename).suffix.lower()
-    # if ext not in [".txt", ".pdf", ".docx",".pptx"]:
-    #     raise HTTPException(status_code=400, detail="Unsupported file type")
-
-    if ext not in [
-    ".txt", ".md",
-    ".pdf",
-    ".docx",
-    ".pptx",
-    ".xlsx", ".xls",
-    ".csv",
-    ".html", ".htm",
-]:
-        raise HTTPException(status_code=400, detail="Unsupported file type")
+    Overwrite mode: this DROPS the previous document and replaces it.
+    Incremental mode: the document is added to the corpus; passing an
+    existing `document_id` replaces only that document.
+    With `session_id`, both apply to that session's documents only.
 
+    Ingestion runs in the background; poll `/ingest/jobs/{job_id}`.
+    """
 
+    ext = _check_extension(file.filename)
+    await run_in_threadpool(_check_session, session_id)
 
     file_id = f"{uuid.uuid4()}{ext}"
     file_path = UPLOAD_DIR / file_id
+    document_id = document_id or file_id
+
+    def _save() -> str:
+        # Hash while copying so later chunked uploads can skip this file
+        digest = hashlib.sha256()
+        with open(file_path, "wb") as f:
+            for block in iter(lambda: file.file.read(1024 * 1024), b""):
+                digest.update(block)
+                f.write(block)
+        return digest.hexdigest()
+
+    sha256 = await run_in_threadpool(_save)
+
+    return await _queue_ingest(file_path, document_id, file.filename, sha256, session_id)
+
+
+# -------------------------------------------------
+# Resumable chunked upload: init / append part / finalize
+# -------------------------------------------------
+class UploadInitRequest(BaseModel):
+    filename: str
+    # Total bytes, if known; enforced as parts arrive
+    size: Optional[int] = None
+    document_id: Optional[str] = None
+    session_id: Optional[str] = None
+
+
+class UploadFinalizeRequest(BaseModel):
+    # Client-side digest to verify against the one computed while writing
+    sha256: Optional[str] = None
+    ingest: bool = True
+    # Skip ingestion when the same bytes are already in the corpus
+    skip_duplicate: bool = True
+
+
+@app.post("/uploads", status_code=201)
+async def init_upload(request: UploadInitRequest):
+    """
+    Start a resumable upload. Send the bytes with
+    `PUT /uploads/{upload_id}?offset=N` (any number of parts), then
+    `POST /uploads/{upload_id}/finalize`.
+    """
+    _check_extension(request.filename)
+    await run_in_threadpool(_check_session, request.session_id)
+    try:
+        session = await run_in_threadpool(
+            uploads.create,
+            request.filename,
+            request.size,
+            request.document_id,
+            request.session_id,
+        )
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return session.to_dict()
+
 
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+@app.put("/uploads/{upload_id}")
+async def append_upload_part(upload_id: str, offset: int, request: Request):
+    """
+    Append the raw request body at `offset`. Bytes are written to the
+    final file and hashed as they arrive; after a dropped connection,
+    `GET /uploads/{upload_id}` returns the offset to resume from.
+    Restoring a session (rehash), file writes and state saves all run
+    in the threadpool.
+    """
+    try:
+        session = await run_in_threadpool(uploads.begin_part, upload_id, offset)
+        try:
+            received = 0
+            async for data in request.stream():
+                received += len(data)
+                if received > settings.UPLOAD_PART_MAX_BYTES:
+                    raise UploadTooLarge(
+                        f"Part exceeds {settings.UPLOAD_PART_MAX_BYTES} bytes"
+                    )
+                await run_in_threadpool(session.write, data)
+        finally:
+            await run_in_threadpool(uploads.end_part, session)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadConflict as exc:
+        raise HTTPException(
+            status_code=409, detail={"error": str(exc), "offset": exc.offset}
+        )
+    except UploadTooLarge as exc:
+        raise HTTPException(
+            status_code=413, detail={"error": str(exc), "offset": session.offset}
+        )
+    except ClientDisconnect:
+        logger.info(f"UPLOAD INTERRUPTED | id={upload_id} | offset={session.offset}")
+        return session.to_dict()
+    return session.to_dict()
 
-    logger.info(f"INGEST STARTED | file={file.filename}")
 
-    # PreOCR (agentic decision)
-    preocr = analyze_document(str(file_path))
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    try:
+        session = await run_in_threadpool(uploads.get, upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session.to_dict()
 
-    # Load text
-    text = load_document(str(file_path))
-    if not text.strip():
-        raise HTTPException(status_code=400, detail="No text extracted")
 
-    # Semantic chunking + overlap
-    chunks = semantic_chunk_text(text)
+@app.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    try:
+        await run_in_threadpool(uploads.discard, upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"status": "aborted", "upload_id": upload_id}
+
+
+@app.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, request: UploadFinalizeRequest):
+    """
+    Complete the upload, then queue ingestion right away (`ingest`), or
+    skip it when a file with the same SHA-256 is already ingested.
+    """
+    try:
+        session = await run_in_threadpool(uploads.finalize, upload_id, request.sha256)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadConflict as exc:
+        raise HTTPException(
+            status_code=409, detail={"error": str(exc), "offset": exc.offset}
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    await run_in_threadpool(_check_session, session.session_id)
 
-    for i, chunk in enumerate(chunks, start=1):
-        logger.info(f"[INGESTED CHUNK {i}]\n{chunk}")
+    sha256 = session.sha256()
+    result = {
+        "upload_id": upload_id,
+        "bytes": session.offset,
+        "sha256": sha256,
+        "file": session.path.name,
+    }
 
-    # Embeddings
-    embeddings = embed_texts(chunks)
+    if request.skip_duplicate:
+        previous = uploads.ingested(sha256, session.session_id)
+        # Only if that document is still in the store
+        if previous and await run_in_threadpool(
+            _has_document, previous["document_id"], session.session_id
+        ):
+            session.path.unlink(missing_ok=True)
+            logger.info(f"UPLOAD DUPLICATE | id={upload_id} | document={previous['document_id']}")
+            return {
+                **result,
+                "status": "duplicate",
+                "document_id": previous["document_id"],
+                "active_document": previous["document_name"],
+            }
 
-    # 🔥 OVERWRITE MODE
-    milvus = MilvusClient()
-    milvus.reset_collection()
+    document_id = session.document_id or session.path.name
+    if not request.ingest:
+        return {**result, "status": "uploaded", "document_id": document_id}
 
-    milvus.insert(
-        embeddings=embeddings,
-        texts=chunks,
-        document_id=file_id,
-        document_name=file.filename,
+    queued = await _queue_ingest(
+        session.path, document_id, session.filename, sha256, session.session_id
     )
+    return {**result, **queued}
+
+
+def _has_document(document_id: str, session_id: Optional[str]) -> bool:
+    with use_vector_store(session_id) as store:
+        return bool(store.chunk_ids(document_id))
+
+
+# -------------------------------------------------
+# Ingest job status / cancellation
+# -------------------------------------------------
+@app.get("/ingest/jobs")
+async def list_ingest_jobs():
+    return {"jobs": [job.to_dict() for job in ingest_jobs.list()]}
+
+
+@app.get("/ingest/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.delete("/ingest/jobs/{job_id}")
+async def cancel_ingest_job(job_id: str):
+    """
+    Cancel a queued or running job. Either mode rolls back the partial
+    document; overwrite mode cannot restore the previous corpus once the
+    store was reset, so a cancelled overwrite leaves it empty.
+    """
+    job = ingest_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+# -------------------------------------------------
+# Delete one document (incremental mode)
+# -------------------------------------------------
+@app.delete("/documents/{document_id}")
+def delete_document(document_id: str, session_id: Optional[str] = None):
+    _check_session(session_id)
+    with use_vector_store(session_id) as store:
+        deleted = store.delete_document(document_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if answer_cache is not None:
+        answer_cache.invalidate(document_id, session=session_id)
 
     logger.info(
-        f"INGEST COMPLETED | file={file.filename} | chunks={len(chunks)}"
+        f"DOCUMENT DELETED | id={document_id} | session={session_id} | chunks={deleted}"
     )
-
-    return {
-        "status": "success",
-        "active_document": file.filename,
-        "chunks_ingested": len(chunks),
-        "needs_ocr": preocr.get("needs_ocr"),
-        "reason_code": preocr.get("reason_code"),
-        "mode": "overwrite",
-    }
+    return {"status": "deleted", "document_id": document_id, "chunks_deleted": deleted}
 
 
 # -------------------------------------------------
@@ -104,21 +400,171 @@ async def ingest_file(file: UploadFile = File(...)):
 # -------------------------------------------------
 class QueryRequest(BaseModel):
     question: str
+    # Restrict retrieval to one document; None searches the whole corpus
+    document_id: Optional[str] = None
+    # HNSW search beam for this query; defaults to the index profile's ef
+    ef: Optional[int] = None
+    # Search this session's documents instead of the shared index
+    session_id: Optional[str] = None
+
+
+def _check_ef(ef: Optional[int]):
+    if ef is not None and not 1 <= ef <= MAX_EF:
+        raise HTTPException(status_code=400, detail=f"ef must be between 1 and {MAX_EF}")
 
 
 @app.post("/query")
 async def query_rag(request: QueryRequest):
     """
-    Ask a question about the CURRENT document only.
+    Ask a question about the current corpus (or one document).
+    Retrieval runs in a worker thread and generation is awaited on the
+    async LLM client, so neither blocks the event loop.
     """
 
     if not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
+    _check_ef(request.ef)
+    await run_in_threadpool(_check_session, request.session_id)
 
-    answer = answer_question(request.question)
+    try:
+        answer = await answer_question_async(
+            request.question,
+            document_id=request.document_id,
+            ef=request.ef,
+            session_id=request.session_id,
+        )
+    except LLMDeadlineExceeded as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
 
     return {
         "question": request.question,
         "answer": answer,
     }
 
+
+# -------------------------------------------------
+# Batch Query Endpoint
+# -------------------------------------------------
+class BatchQueryRequest(BaseModel):
+    questions: list[str]
+    document_id: Optional[str] = None
+    # Concurrent LLM calls; defaults to QUERY_BATCH_CONCURRENCY
+    max_concurrency: Optional[int] = None
+    ef: Optional[int] = None
+    session_id: Optional[str] = None
+
+
+@app.post("/query/batch")
+def query_rag_batch(request: BatchQueryRequest):
+    """
+    Answer many questions at once: one batched embedding request, one
+    multi-vector search, then concurrent generation. Answers come back in
+    input order with per-question timings.
+    """
+
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
+    if any(not q.strip() for q in request.questions):
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    if len(request.questions) > settings.QUERY_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.QUERY_BATCH_MAX_QUESTIONS} questions per batch",
+        )
+    if request.max_concurrency is not None and request.max_concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be >= 1")
+    _check_ef(request.ef)
+    _check_session(request.session_id)
+
+    start = time.perf_counter()
+    answers = answer_questions(
+        request.questions,
+        document_id=request.document_id,
+        max_concurrency=request.max_concurrency,
+        ef=request.ef,
+        session_id=request.session_id,
+    )
+
+    return {
+        "answers": answers,
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+# -------------------------------------------------
+# Streaming Query Endpoint (Server-Sent Events)
+# -------------------------------------------------
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/query/stream")
+async def query_rag_stream(request: QueryRequest):
+    """
+    Same as /query, but streams the answer as SSE `token` events,
+    followed by a `done` event carrying time-to-first-token.
+    """
+
+    if not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+    _check_ef(request.ef)
+    await run_in_threadpool(_check_session, request.session_id)
+
+    async def events():
+        start = time.perf_counter()
+        ttft_ms = None
+        try:
+            async for token in stream_answer_async(
+                request.question,
+                document_id=request.document_id,
+                ef=request.ef,
+                session_id=request.session_id,
+            ):
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                yield _sse("token", {"text": token})
+        except Exception as exc:
+            logger.exception("QUERY STREAM FAILED")
+            yield _sse("error", {"detail": str(exc)})
+            return
+
+        total_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"QUERY STREAM | ttft={ttft_ms or 0:.0f}ms | total={total_ms:.0f}ms"
+        )
+        yield _sse(
+            "done",
+            {"ttft_ms": round(ttft_ms or 0, 1), "total_ms": round(total_ms, 1)},
+        )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# -------------------------------------------------
+# Cache statistics
+# -------------------------------------------------
+@app.get("/stats")
+async def cache_stats():
+    return {
+        "embedding_cache": embedding_cache_stats(),
+        "answer_cache": (
+            answer_cache.stats() if answer_cache is not None else {"enabled": False}
+        ),
+        "sessions": sessions.stats(),
+        "llm": llm_stats(),
+        "stages": metrics.snapshot(),
+    }
+
+
+# -------------------------------------------------
+# Prometheus metrics
+# -------------------------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -10,38 +10,202 @@ def require(name: str) -> str:
     return value
 
 
+class Required:
+    """
+    Setting that must be set in the environment, grouped by subsystem.
+
+    It is read on access rather than at import, so a process only needs
+    the variables of the subsystems it actually uses (a Milvus check
+    script needs no LLM key, the API starts without a Milvus URI when
+    VECTOR_DB=local, ...).
+    """
+
+    def __init__(self, subsystem: str, transform=None):
+        self.subsystem = subsystem
+        self.transform = transform
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        names = owner.SUBSYSTEMS.setdefault(self.subsystem, [])
+        if name not in names:
+            names.append(name)
+
+    def __get__(self, obj, owner=None):
+        value = require(self.name)
+        return self.transform(value) if self.transform else value
+
+
 class Settings:
 
-   
+    # subsystem -> required variable names (filled in by `Required`)
+    SUBSYSTEMS: dict = {}
 
     # -------- LLM (Generation) --------
-    LLM_PROVIDER = require("LLM_PROVIDER")
-    GROQ_MODEL = require("GROQ_MODEL")
+    LLM_PROVIDER = Required("llm")
+    GROQ_MODEL = Required("llm")
+
+    # -------- LLM Client --------
+    LLM_FALLBACK_PROVIDER = os.getenv("LLM_FALLBACK_PROVIDER", "gemini").lower()  # "" = no failover
+    GEMINI_LLM_MODEL = os.getenv("GEMINI_LLM_MODEL", "gemini-2.0-flash")
+    LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))  # whole call, all providers
+    LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "20"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # per provider, transient errors only
+    LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))  # seconds, doubled per retry
+    LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() == "true"
+    LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))  # 0 = provider's recent p95
+    LLM_HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1.0"))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))  # shared HTTP pool
+    LLM_FAILURE_THRESHOLD = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))  # failures in a row, then cooldown
+    LLM_COOLDOWN_SECONDS = float(os.getenv("LLM_COOLDOWN_SECONDS", "30"))
+    FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))  # LLM_PROVIDER=fake
 
     # -------- Embeddings --------
-    EMBEDDING_PROVIDER = require("EMBEDDING_PROVIDER")
-    EMBEDDING_MODEL = require("EMBEDDING_MODEL")
+    EMBEDDING_PROVIDER = Required("embeddings")
+    EMBEDDING_MODEL = Required("embeddings")
 
     # -------- Vector Database --------
-    VECTOR_DB = require("VECTOR_DB")
-    MILVUS_URI = require("MILVUS_URI")
-    MILVUS_TOKEN = require("MILVUS_TOKEN")
+    VECTOR_DB = Required("vectordb", str.lower)  # "milvus" or "local"
+    MILVUS_URI = Required("milvus")
+    MILVUS_TOKEN = Required("milvus")
     MILVUS_COLLECTION = os.getenv("MILVUS_COLLECTION", "documents")
+    LOCAL_STORE_PATH = os.getenv("LOCAL_STORE_PATH", "data/index/local")
+    EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "768"))
+
+    # -------- Vector Quantization --------
+    VECTOR_PRECISION = os.getenv("VECTOR_PRECISION", "float32").lower()  # float32 | float16 | int8
+    RESCORE_CANDIDATES = int(os.getenv("RESCORE_CANDIDATES", "4"))  # re-scored pool = N * top_k (0 = off)
+    FULL_VECTORS_PATH = os.getenv("FULL_VECTORS_PATH", "")  # default: next to the collection
+
+    # -------- HNSW Index (Milvus) --------
+    HNSW_PROFILE = os.getenv("HNSW_PROFILE", "latency").lower()  # latency | balanced | recall (opt-in)
+    # Explicit overrides; unset = profile or tuned value
+    HNSW_M = int(os.getenv("HNSW_M", "0"))
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "0"))
+    HNSW_EF = int(os.getenv("HNSW_EF", "0"))
+    HNSW_PARAMS_PATH = os.getenv("HNSW_PARAMS_PATH", "")  # tuner output; default: next to the collection
+
+    # -------- Hybrid Retrieval (BM25 + vector) --------
+    HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+    BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "")  # default: next to the collection
+    RRF_K = int(os.getenv("RRF_K", "60"))
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))  # per-retriever pool = N * top_k
+
+    # -------- Chunk Deduplication --------
+    CHUNK_DEDUP = os.getenv("CHUNK_DEDUP", "true").lower() == "true"
+    CHUNK_MAP_PATH = os.getenv("CHUNK_MAP_PATH", "")  # default: next to the collection
 
     # -------- Agent Settings --------
     TOP_K = int(os.getenv("TOP_K", "5"))
+    QUERY_BATCH_MAX_QUESTIONS = int(os.getenv("QUERY_BATCH_MAX_QUESTIONS", "64"))
+    QUERY_BATCH_CONCURRENCY = int(os.getenv("QUERY_BATCH_CONCURRENCY", "4"))  # LLM calls in flight
     MAX_AGENT_RETRIES = int(os.getenv("MAX_AGENT_RETRIES", "1"))
 
-    GROQ_API_KEY = require("GROQ_API_KEY")
+    GROQ_API_KEY = Required("llm")
     # -------- PreOCR --------
     ENABLE_PREOCR = os.getenv("ENABLE_PREOCR", "true").lower() == "true"
     PREOCR_PAGE_LEVEL = os.getenv("PREOCR_PAGE_LEVEL", "true").lower() == "true"
     PREOCR_LAYOUT_AWARE = os.getenv("PREOCR_LAYOUT_AWARE", "true").lower() == "true"
+    # A PDF page needs OCR when images cover at least this share of it...
+    PREOCR_IMAGE_COVERAGE = float(os.getenv("PREOCR_IMAGE_COVERAGE", "0.3"))
+    # ...and its text layer has fewer chars per square inch than this
+    PREOCR_MIN_TEXT_DENSITY = float(os.getenv("PREOCR_MIN_TEXT_DENSITY", "1.0"))
+    PREOCR_SAMPLE_PAGES = int(os.getenv("PREOCR_SAMPLE_PAGES", "16"))  # when not page-level
+
+    # -------- OCR --------
+    OCR_BACKEND = os.getenv("OCR_BACKEND", "tesseract")  # tesseract | stub | none
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", "4"))
+    OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+    OCR_LANG = os.getenv("OCR_LANG", "eng")
 
     # -------- Embeddings --------
-    EMBEDDING_PROVIDER = require("EMBEDDING_PROVIDER")
-    EMBEDDING_MODEL = require("EMBEDDING_MODEL")
-    GEMINI_API_KEY = require("GEMINI_API_KEY")
+    EMBEDDING_PROVIDER = Required("embeddings")
+    EMBEDDING_MODEL = Required("embeddings")
+    GEMINI_API_KEY = Required("embeddings")
+
+    # -------- Embedding Engine --------
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+    EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+    EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "3"))
+    EMBEDDING_RETRY_BACKOFF = float(os.getenv("EMBEDDING_RETRY_BACKOFF", "0.5"))
+
+    # -------- Embedding Cache --------
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+
+    # -------- Semantic Answer Cache --------
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+    # -------- Streaming Ingestion --------
+    # "overwrite" = one active document, "incremental" = multi-document
+    INGEST_MODE = os.getenv("INGEST_MODE", "overwrite").lower()
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))  # concurrent ingest jobs
+    INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "100"))
+
+    # -------- Uploads --------
+    UPLOAD_DIR = os.getenv("UPLOAD_DIR", "data/uploads")
+    UPLOAD_STATE_DIR = os.getenv("UPLOAD_STATE_DIR", "data/index/uploads")  # resumable sessions
+    UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(512 * 1024 * 1024)))
+    UPLOAD_PART_MAX_BYTES = int(os.getenv("UPLOAD_PART_MAX_BYTES", str(64 * 1024 * 1024)))
+    UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", "86400"))  # seconds idle
+
+    # -------- Sessions --------
+    SESSION_INDEX_DIR = os.getenv("SESSION_INDEX_DIR", "data/index/sessions")
+    SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", "300"))  # then released from memory
+    SESSION_TTL = int(os.getenv("SESSION_TTL", "86400"))  # seconds unused, then deleted
+    SESSION_SWEEP_SECONDS = int(os.getenv("SESSION_SWEEP_SECONDS", "30"))  # 0 = no reaper
+
+    # -------- Context Packing --------
+    CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "true").lower() == "true"
+    CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "10"))  # hits considered before packing
+    CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "800"))
+    CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))  # 1.0 = relevance only
+    CONTEXT_DEDUPE_THRESHOLD = float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.95"))
+
+    # -------- Metrics --------
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "2048"))  # samples kept per stage for quantiles
+    # Histogram bucket upper bounds in seconds for /metrics
+    METRICS_BUCKETS = tuple(
+        float(v)
+        for v in os.getenv(
+            "METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30"
+        ).split(",")
+        if v.strip()
+    )
+
+    # -------- Chunking --------
+    CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+    CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+    # Input limit of the embedding model; chunks never exceed it
+    EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "2048"))
+
+    # -------- PDF Extraction --------
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0"))  # 0 = one per CPU
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+    PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+    def validate(self, *subsystems: str):
+        """
+        Fail fast, listing every unset variable of the given subsystems
+        ("llm", "embeddings", "vectordb", "milvus").
+        """
+        missing = [
+            name
+            for subsystem in subsystems
+            for name in self.SUBSYSTEMS[subsystem]
+            if os.getenv(name) is None
+        ]
+        if missing:
+            raise ValueError(
+                f"Missing environment variables for {'/'.join(subsystems)}: "
+                f"{', '.join(missing)}"
+            )
 
 
 # Singleton settings object
@@ -1,56 +1,224 @@
 import re
-from typing import List
+from typing import Iterable, Iterator, List, NamedTuple, Optional
 
+from src.app.config import settings
 
-def semantic_chunk_text(
-    text: str,
-    max_chars: int = 800,
-    overlap_chars: int = 150,
-) -> List[str]:
+# Unit boundaries: blank lines (consumed) and line breaks right before
+# a heading or bullet point (the heading / bullet starts the next unit)
+_BOUNDARY = re.compile(
+    r"\n[ \t\r]*\n\s*"
+    r"|\n(?=[A-Z][A-Z \t]{3,}\r?\n)"
+    r"|\n(?=●)"
+    r"|\n(?=- )"
+)
+_TOKEN = re.compile(r"\w+|[^\w\s]")
 
-    if not text:
-        return []
+# `load_document` joins segments with this, so spans index into its output
+SEGMENT_SEPARATOR = "\n\n"
+
+
+class Chunk(NamedTuple):
+    text: str
+    start: int  # offsets into SEGMENT_SEPARATOR.join(segments)
+    end: int
+    tokens: int
+
+
+class _Unit(NamedTuple):
+    segment: int  # index of the segment the unit came from
+    start: int    # offsets inside that segment
+    end: int
+    tokens: int
+
+
+def estimate_tokens(text: str, start: int = 0, end: Optional[int] = None) -> int:
+    """
+    Approximate subword token count of text[start:end] without copying it.
+
+    Takes the larger of the word/punctuation count and chars / 4, which
+    tracks BPE / SentencePiece tokenizers closely for prose and errs
+    high for number- and symbol-heavy text (tables, IDs).
+    """
+    if end is None:
+        end = len(text)
+    return max(len(_TOKEN.findall(text, start, end)), (end - start) // 4)
+
+
+def _trim(text: str, start: int, end: int):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def _iter_units(text: str, segment: int, max_tokens: int) -> Iterator[_Unit]:
+    """
+    Semantic units of one segment as spans. Units larger than the budget
+    are cut at a line break (or token boundary) so every unit fits.
+    """
+    pos = 0
+    bounds = [(m.start(), m.end()) for m in _BOUNDARY.finditer(text)]
+    bounds.append((len(text), len(text)))
+
+    for stop, resume in bounds:
+        start, end = _trim(text, pos, stop)
+        pos = resume
+        if start == end:
+            continue
+
+        tokens = estimate_tokens(text, start, end)
+        if tokens <= max_tokens:
+            yield _Unit(segment, start, end, tokens)
+        else:
+            yield from _split_unit(text, segment, start, end, max_tokens)
+
+
+def _split_unit(text: str, segment: int, start: int, end: int, max_tokens: int):
+    max_chars = 4 * max_tokens
+    piece, count = start, 0
+
+    for match in _TOKEN.finditer(text, start, end):
+        if count >= max_tokens or match.end() - piece > max_chars:
+            cut = match.start()
+            # Prefer a line break in the second half of the piece
+            newline = text.rfind("\n", piece + (cut - piece) // 2, cut)
+            if newline > piece:
+                cut = newline
+            if cut > piece:
+                lo, hi = _trim(text, piece, cut)
+                if lo < hi:
+                    yield _Unit(segment, lo, hi, estimate_tokens(text, lo, hi))
+                piece = cut
+                count = len(_TOKEN.findall(text, piece, match.start()))
+        # A single token longer than the budget (e.g. base64): hard cut
+        if match.end() - match.start() > max_chars:
+            lo, hi = _trim(text, piece, match.start())
+            if lo < hi:
+                yield _Unit(segment, lo, hi, estimate_tokens(text, lo, hi))
+            piece = match.start()
+            while match.end() - piece > max_chars:
+                yield _Unit(segment, piece, piece + max_chars, max_tokens)
+                piece += max_chars
+            count = 0
+        count += 1
+
+    lo, hi = _trim(text, piece, end)
+    if lo < hi:
+        yield _Unit(segment, lo, hi, estimate_tokens(text, lo, hi))
 
-    # Normalize whitespace
-    text = re.sub(r"\r", "", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-
-    # -------- STEP 1: Smarter semantic splits --------
-    # Split on:
-    # - blank lines
-    # - headings
-    # - bullet points
-    semantic_units = re.split(
-        r"\n\n|(?=\n[A-Z][A-Z\s]{3,}\n)|(?=\n●)|(?=\n- )",
+
+def _build_chunk(window: List[_Unit], texts: dict, offsets: dict, tokens: int) -> Chunk:
+    """
+    Materialize a run of units as one slice per segment it touches.
+    Text between units is kept verbatim, so `text` equals the joined
+    document sliced at [start:end].
+    """
+    first, last = window[0], window[-1]
+    if first.segment == last.segment:
+        text = texts[first.segment][first.start:last.end]
+    else:
+        parts = [texts[first.segment][first.start:]]
+        parts.extend(texts[i] for i in range(first.segment + 1, last.segment))
+        parts.append(texts[last.segment][:last.end])
+        text = SEGMENT_SEPARATOR.join(parts)
+
+    return Chunk(
         text,
+        offsets[first.segment] + first.start,
+        offsets[last.segment] + last.end,
+        tokens,
     )
 
-    semantic_units = [u.strip() for u in semantic_units if u.strip()]
 
-    # -------- STEP 2: Merge into chunks --------
-    chunks = []
-    current = ""
+def iter_chunks(
+    segments: Iterable[str],
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> Iterator[Chunk]:
+    """
+    Single pass over text segments (e.g. pages from `iter_document`),
+    yielding token-budgeted chunks with their spans as soon as they are
+    complete.
 
-    for unit in semantic_units:
-        if len(current) + len(unit) <= max_chars:
-            current += ("\n\n" if current else "") + unit
-        else:
-            chunks.append(current)
-            current = unit
+    Units (paragraphs, headings, bullets) are packed greedily into chunks
+    of at most `max_tokens`. With `overlap_tokens` a chunk starts with the
+    trailing whole units of the previous one that fit in that budget.
+    Only the segments the current chunk touches are kept in memory.
+    """
+    max_tokens = min(
+        max_tokens or settings.CHUNK_MAX_TOKENS, settings.EMBEDDING_MAX_TOKENS
+    )
+    if overlap_tokens is None:
+        overlap_tokens = settings.CHUNK_OVERLAP_TOKENS
 
-    if current:
-        chunks.append(current)
+    texts: dict = {}    # segment index -> text, for segments still in the window
+    offsets: dict = {}  # segment index -> offset in the joined document
+    window: List[_Unit] = []
+    tokens = 0
+    base = 0
 
-    # -------- STEP 3: Add overlap --------
-    final_chunks = []
-    for i, chunk in enumerate(chunks):
-        if i == 0:
-            final_chunks.append(chunk)
-        else:
-            overlap = chunks[i - 1][-overlap_chars:]
-            final_chunks.append(overlap + "\n\n" + chunk)
+    for index, segment in enumerate(segments):
+        texts[index], offsets[index] = segment or "", base
+        base += len(segment or "") + len(SEGMENT_SEPARATOR)
+
+        for unit in _iter_units(texts[index], index, max_tokens):
+            if window and tokens + unit.tokens > max_tokens:
+                yield _build_chunk(window, texts, offsets, tokens)
+
+                # -------- Carry whole trailing units as overlap --------
+                carried = 0
+                keep = len(window)
+                while keep > 1 and carried + window[keep - 1].tokens <= overlap_tokens:
+                    keep -= 1
+                    carried += window[keep].tokens
+                window = window[keep:] if keep < len(window) else []
+                tokens = carried if window else 0
+                if window and tokens + unit.tokens > max_tokens:
+                    window, tokens = [], 0
+
+            window.append(unit)
+            tokens += unit.tokens
+
+        # Forget segments the window no longer reaches
+        oldest = window[0].segment if window else index + 1
+        for stale in [i for i in texts if i < oldest]:
+            del texts[stale], offsets[stale]
+
+    if window:
+        yield _build_chunk(window, texts, offsets, tokens)
+
+
+def chunk_spans(
+    text: str,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> List[Chunk]:
+    if not text:
+        return []
+
+    return list(iter_chunks([text], max_tokens, overlap_tokens))
+
+
+def iter_semantic_chunks(
+    segments: Iterable[str],
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Text-only view of `iter_chunks`.
+    """
+    for chunk in iter_chunks(segments, max_tokens, overlap_tokens):
+        yield chunk.text
+
+
+def semantic_chunk_text(
+    text: str,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> List[str]:
 
-    return final_chunks
+    return [chunk.text for chunk in chunk_spans(text, max_tokens, overlap_tokens)]
 
 
 # backward compatibility
@@ -1,9 +1,7 @@
-from src.ingestion.preocr import analyze_document
+from pathlib import Path
 
-from src.ingestion.loader import load_document
-from src.ingestion.chunker import chunk_text
-from src.llm.gemini_client import embed_texts
-from src.vectorstore.milvus_client import MilvusClient
+from src.ingestion.preocr import analyze_document
+from src.ingestion.pipeline import ingest_document
 
 
 def ingest_file(file_path: str):
@@ -11,31 +9,25 @@ def ingest_file(file_path: str):
     Ingest a single document into Milvus.
     """
 
-    # 1. PreOCR decision
+    # 1. PreOCR decision: flagged PDF pages are OCR'd by the loader
     decision = analyze_document(file_path)
+    decision.pop("pages", None)
     print(f"[PreOCR] {decision}")
 
-    if decision.get("needs_ocr"):
-        raise RuntimeError("OCR required but OCR execution is not implemented.")
-
-    # 2. Load document text
-    text = load_document(file_path)
+    # 2-5. Stream: load → chunk → embed → store in Milvus
+    path = Path(file_path)
+    stats = ingest_document(
+        file_path,
+        document_id=path.name,
+        document_name=path.name,
+        mode="incremental",
+    )
 
-    # 3. Chunk text
-    chunks = chunk_text(text)
-    print(f"[Chunking] Created {len(chunks)} chunks")
-
-    if not chunks:
+    if not stats["chunks"]:
         raise RuntimeError("No text chunks generated")
 
-    # 4. Generate embeddings
-    embeddings = embed_texts(chunks)
-    print("[Embedding] Embeddings generated")
-
-    # 5. Store in Milvus
-    milvus = MilvusClient()
-    milvus.insert(embeddings, chunks)
-    print("[Milvus] Data inserted successfully")
+    print(f"[Chunking] Created {stats['chunks']} chunks")
+    print(f"[Milvus] Data inserted successfully in {stats['total_s']}s")
 
 
 if __name__ == "__main__":
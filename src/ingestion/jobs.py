@@ -0,0 +1,223 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from src.app.config import settings
+from src.ingestion.pipeline import IngestCancelled, ingest_document
+from src.ingestion.preocr import analyze_document
+from src.llm.gemini_client import embedding_cache_stats
+from src.utils.logger import logger
+from src.vectorstore.sessions import SessionNotFound, sessions
+
+
+class IngestJob:
+    """
+    State of one background ingestion run.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        document_id: str,
+        document_name: str,
+        on_complete: Optional[Callable[["IngestJob"], None]] = None,
+        session_id: Optional[str] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.document_id = document_id
+        self.document_name = document_name
+        self.session_id = session_id
+        # Called after a successful run (e.g. to remember the file's hash)
+        self.on_complete = on_complete
+
+        self.status = "queued"  # queued | running | completed | failed | cancelled
+        self.stage = "queued"
+        self.progress = {"parsed": 0, "embedded": 0, "inserted": 0}
+        # PreOCR decision, set by the job's first stage
+        self.preocr: Optional[Dict] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def on_progress(self, stage: str, count: int):
+        with self._lock:
+            self.progress[stage] += count
+            self.stage = stage
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            progress = dict(self.progress)
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "document_id": self.document_id,
+            "document_name": self.document_name,
+            "session_id": self.session_id,
+            "progress": {
+                "parsed_segments": progress["parsed"],
+                "chunks_embedded": progress["embedded"],
+                "rows_inserted": progress["inserted"],
+            },
+            "preocr": self.preocr,
+            "result": self.result,
+            "error": self.error,
+            "elapsed_s": round(end - (self.started_at or end), 3),
+        }
+
+
+class IngestJobManager:
+    """
+    Runs ingestion jobs on a bounded worker pool, off the event loop.
+    Keeps the most recent `history` jobs for status queries.
+    In overwrite mode, jobs of the same session (or of the shared
+    index) run one at a time; different sessions ingest in parallel.
+    """
+
+    def __init__(self, workers: int = 2, history: int = 100):
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ingest-job"
+        )
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+        self._scope_locks: Dict[Optional[str], threading.Lock] = defaultdict(threading.Lock)
+
+    def submit(
+        self,
+        file_path: str,
+        document_id: str,
+        document_name: str,
+        on_complete: Optional[Callable[[IngestJob], None]] = None,
+        session_id: Optional[str] = None,
+    ) -> IngestJob:
+        job = IngestJob(file_path, document_id, document_name, on_complete, session_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+        self._pool.submit(self._run, job)
+        logger.info(
+            f"INGEST JOB QUEUED | job={job.id} | file={document_name} | session={session_id}"
+        )
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.status == "queued":
+            job.status = job.stage = "cancelled"
+            job.finished_at = time.time()
+        return job
+
+    def _trim(self):
+        # Forget the oldest finished jobs beyond the history limit
+        excess = len(self._jobs) - self._history
+        for job_id in [j.id for j in self._jobs.values() if j.done][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _scope_lock(self, session_id: Optional[str]):
+        # Overwrite mode resets the whole scope, so its jobs must not overlap
+        if settings.INGEST_MODE != "overwrite":
+            return nullcontext()
+        with self._lock:
+            return self._scope_locks[session_id]
+
+    def _run(self, job: IngestJob):
+        with self._scope_lock(job.session_id):
+            # Keeps the session loaded (and undeletable) while ingesting
+            scope = sessions.use(job.session_id) if job.session_id else nullcontext()
+            try:
+                with scope:
+                    self._ingest(job)
+            except SessionNotFound:
+                job.status = job.stage = "failed"
+                job.error = "Session not found"
+                job.finished_at = time.time()
+                logger.warning(f"INGEST JOB FAILED | job={job.id} | session={job.session_id} gone")
+
+    def _ingest(self, job: IngestJob):
+        if job.cancel_event.is_set():
+            return
+
+        job.status = "running"
+        job.stage = "analyzing"
+        job.started_at = time.time()
+        logger.info(f"INGEST JOB STARTED | job={job.id} | file={job.document_name}")
+
+        try:
+            # PreOCR (agentic decision) first: profiles PDF pages, which the
+            # loader then reuses to pick the pages to OCR
+            decision = analyze_document(job.file_path)
+            job.preocr = {
+                "needs_ocr": decision.get("needs_ocr"),
+                "reason_code": decision.get("reason_code"),
+                "ocr_pages": decision.get("ocr_pages", []),
+            }
+            if job.cancel_event.is_set():
+                raise IngestCancelled(job.document_id)
+            job.stage = "running"
+
+            stats = ingest_document(
+                job.file_path,
+                document_id=job.document_id,
+                document_name=job.document_name,
+                progress=job.on_progress,
+                cancel=job.cancel_event,
+                session_id=job.session_id,
+            )
+        except IngestCancelled:
+            job.status = job.stage = "cancelled"
+            logger.info(f"INGEST JOB CANCELLED | job={job.id}")
+        except Exception as exc:
+            job.status = job.stage = "failed"
+            job.error = str(exc)
+            logger.exception(f"INGEST JOB FAILED | job={job.id}")
+        else:
+            if stats["chunks"]:
+                job.status = job.stage = "completed"
+                job.result = stats
+                if job.on_complete is not None:
+                    job.on_complete(job)
+            else:
+                job.status = job.stage = "failed"
+                job.error = "No text extracted"
+            logger.info(
+                f"INGEST JOB {job.status.upper()} | job={job.id} "
+                f"| file={job.document_name} | stats={stats} "
+                f"| embedding_cache={embedding_cache_stats()}"
+            )
+        finally:
+            job.finished_at = time.time()
+
+
+# Process-wide job manager used by the API
+ingest_jobs = IngestJobManager(
+    workers=settings.INGEST_WORKERS,
+    history=settings.INGEST_JOB_HISTORY,
+)
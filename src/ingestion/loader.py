@@ -75,71 +75,262 @@
 #     return "\n\n".join(text_runs)
 
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from datetime import date, datetime, time
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import csv
+import multiprocessing
+import os
 
-import docx
-import pdfplumber
-import pandas as pd
-from pptx import Presentation
-from bs4 import BeautifulSoup
+from src.app.config import settings
+from src.ingestion.chunker import estimate_tokens
+from src.ingestion.ocr import get_ocr_backend
+from src.utils.logger import logger
+from src.utils.metrics import metrics
 
+# Extension -> segment iterator. Each loader imports its parser library
+# on first use, so importing this module (and the API) stays cheap.
+Loader = Callable[[Path], Iterator[str]]
+_LOADERS: Dict[str, Loader] = {}
 
+
+def register_loader(*extensions: str):
+    """
+    Register a loader for one or more file extensions (".pdf", ...).
+    """
+    def decorator(fn: Loader) -> Loader:
+        for ext in extensions:
+            _LOADERS[ext.lower()] = fn
+        return fn
+    return decorator
+
+
+def supported_extensions() -> List[str]:
+    return sorted(_LOADERS)
+
+
+@metrics.timed("load_document")
 def load_document(file_path: str) -> str:
     """
     Load text from multiple document formats.
     """
+    return "\n\n".join(iter_document(file_path))
+
+
+def iter_document(file_path: str) -> Iterator[str]:
+    """
+    Stream a document as text segments (page / slide / sheet / block),
+    so callers never need the whole document text in memory.
+    """
 
     path = Path(file_path)
     ext = path.suffix.lower()
 
-    if ext in [".txt", ".md"]:
-        return path.read_text(encoding="utf-8", errors="ignore")
+    loader = _LOADERS.get(ext)
+    if loader is None:
+        raise ValueError(f"Unsupported file type: {ext}")
+    return loader(path)
 
-    elif ext == ".pdf":
-        return _load_pdf(path)
 
-    elif ext == ".docx":
-        return _load_docx(path)
+# ---------------- TXT / MD ----------------
+@register_loader(".txt", ".md")
+def _iter_text(path: Path) -> Iterator[str]:
+    # Yield blank-line separated blocks
+    block = []
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.strip():
+                block.append(line)
+            elif block:
+                yield "".join(block).rstrip("\n")
+                block = []
+    if block:
+        yield "".join(block).rstrip("\n")
 
-    elif ext == ".pptx":
-        return _load_pptx(path)
 
-    elif ext in [".xlsx", ".xls"]:
-        return _load_excel(path)
+# ---------------- PDF ----------------
+@register_loader(".pdf")
+def _iter_pdf(
+    path: Path,
+    workers: Optional[int] = None,
+    ocr_backend: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Yield `--- PAGE n ---` segments in page order.
+
+    Large PDFs are split into page ranges extracted by a process pool;
+    small ones (or workers <= 1) stay on the serial path. Pages that
+    PreOCR flags (image-covered, no text layer) are OCR'd in parallel.
+    """
+    import pdfplumber
 
-    elif ext == ".csv":
-        return _load_csv(path)
+    workers = settings.PDF_WORKERS if workers is None else workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
 
-    elif ext in [".html", ".htm"]:
-        return _load_html(path)
+    with pdfplumber.open(path) as pdf:
+        num_pages = len(pdf.pages)
 
+    ocr = set(_ocr_pages(path))
+    if workers == 1 or num_pages < settings.PDF_PARALLEL_MIN_PAGES:
+        pages = _iter_pdf_serial(path, ocr)
     else:
-        raise ValueError(f"Unsupported file type: {ext}")
+        pages = _iter_pdf_parallel(path, num_pages, workers, ocr)
 
+    if settings.ENABLE_PREOCR:
+        pages = _with_ocr(path, pages, ocr_backend)
+
+    for i, page_text, _ in pages:
+        if page_text.strip():
+            yield f"\n--- PAGE {i} ---\n{page_text}"
+
+
+def _ocr_pages(path: Path) -> List[int]:
+    if not settings.ENABLE_PREOCR:
+        return []
+    from src.ingestion.preocr import ocr_pages
+
+    # Profiled once, in this process; reuses the /ingest PreOCR result
+    return ocr_pages(path)
+
+
+def _iter_pdf_serial(path: Path, ocr: Set[int]) -> Iterator[Tuple[int, str, bool]]:
+    import pdfplumber
 
-# ---------------- PDF ----------------
-def _load_pdf(path: Path) -> str:
-    text = []
     with pdfplumber.open(path) as pdf:
         for i, page in enumerate(pdf.pages, start=1):
             page_text = page.extract_text() or ""
-            if page_text.strip():
-                text.append(f"\n--- PAGE {i} ---\n{page_text}")
-    return "\n\n".join(text)
+            # Drop parsed objects so memory stays flat on long PDFs
+            page.close()
+            yield i, page_text, i in ocr
+
+
+def _extract_pdf_pages(
+    path: str, start: int, end: int, ocr: Set[int]
+) -> List[Tuple[int, str, bool]]:
+    """
+    Worker: open the PDF independently and extract pages [start, end).
+    """
+    import pdfplumber
+
+    out = []
+    with pdfplumber.open(path) as pdf:
+        for index in range(start, end):
+            page = pdf.pages[index]
+            out.append((index + 1, page.extract_text() or "", index + 1 in ocr))
+            page.close()
+    return out
+
+
+def _iter_pdf_parallel(
+    path: Path,
+    num_pages: int,
+    workers: int,
+    ocr: Set[int],
+) -> Iterator[Tuple[int, str, bool]]:
+    step = max(1, settings.PDF_PAGES_PER_TASK)
+    ranges = [(s, min(s + step, num_pages)) for s in range(0, num_pages, step)]
+
+    def _submit(pool, s, e):
+        # Only the range's own flags are sent to the worker
+        return pool.submit(
+            _extract_pdf_pages, str(path), s, e, {p for p in ocr if s < p <= e}
+        )
+
+    # Spawned, not forked: the server is multi-threaded, and a forked child
+    # can deadlock on a lock another thread held at fork time
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(ranges)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        # Keep a bounded window of ranges in flight and yield in order
+        window = workers * 2
+        pending = [_submit(pool, s, e) for s, e in ranges[:window]]
+        next_range = len(pending)
+
+        while pending:
+            for page in pending.pop(0).result():
+                yield page
+            if next_range < len(ranges):
+                s, e = ranges[next_range]
+                pending.append(_submit(pool, s, e))
+                next_range += 1
+
+
+def _ocr_page(backend, backend_name: str, path: str, page: int, fallback: str) -> str:
+    try:
+        with metrics.track("ocr_page", backend=backend_name):
+            text = backend(path, page)
+    except Exception as exc:
+        logger.warning(f"OCR FAILED | page={page} | error={exc}")
+        return fallback
+    return text if text.strip() else fallback
+
+
+def _with_ocr(
+    path: Path,
+    pages: Iterable[Tuple[int, str, bool]],
+    backend_name: Optional[str] = None,
+) -> Iterator[Tuple[int, str, bool]]:
+    """
+    Replace the text of flagged pages with OCR output. OCR runs on a
+    thread pool while digital pages keep streaming; order is preserved
+    and at most `OCR_WORKERS * 2` pages are held back.
+    """
+    backend_name = backend_name or settings.OCR_BACKEND
+    backend = None
+    queue: Deque = deque()
+    window = max(1, settings.OCR_WORKERS) * 2
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, settings.OCR_WORKERS), thread_name_prefix="ocr"
+    ) as pool:
+        for i, page_text, needs_ocr in pages:
+            if needs_ocr and backend is None:
+                try:
+                    backend = get_ocr_backend(backend_name)
+                except (ImportError, OSError, ValueError) as exc:
+                    logger.error(f"OCR UNAVAILABLE | backend={backend_name} | error={exc}")
+                    backend = False
+            if needs_ocr and backend:
+                page_text = pool.submit(
+                    _ocr_page, backend, backend_name, str(path), i, page_text
+                )
+            queue.append((i, page_text, needs_ocr))
+
+            # Release finished pages at the head; block only when the window is full
+            while queue and (
+                isinstance(queue[0][1], str)
+                or queue[0][1].done()
+                or len(queue) > window
+            ):
+                i, text, flag = queue.popleft()
+                yield i, text if isinstance(text, str) else text.result(), flag
+
+        while queue:
+            i, text, flag = queue.popleft()
+            yield i, text if isinstance(text, str) else text.result(), flag
 
 
 # ---------------- DOCX ----------------
-def _load_docx(path: Path) -> str:
+@register_loader(".docx")
+def _iter_docx(path: Path) -> Iterator[str]:
+    import docx
+
     doc = docx.Document(path)
-    return "\n\n".join(p.text for p in doc.paragraphs if p.text.strip())
+    for p in doc.paragraphs:
+        if p.text.strip():
+            yield p.text
 
 
 # ---------------- PPTX ----------------
-def _load_pptx(path: Path) -> str:
+@register_loader(".pptx")
+def _iter_pptx(path: Path) -> Iterator[str]:
+    from pptx import Presentation
+
     prs = Presentation(path)
-    slides_text: List[str] = []
 
     for idx, slide in enumerate(prs.slides, start=1):
         slide_lines = []
@@ -150,44 +341,139 @@ def _load_pptx(path: Path) -> str:
                         slide_lines.append(p.text)
 
         if slide_lines:
-            slides_text.append(
-                f"\n--- SLIDE {idx} ---\n" + "\n".join(slide_lines)
-            )
+            yield f"\n--- SLIDE {idx} ---\n" + "\n".join(slide_lines)
+
+
+# ---------------- SPREADSHEETS (XLSX / CSV) ----------------
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    if isinstance(value, datetime) and value.time() == time(0):
+        return value.date().isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return str(value).strip()
 
-    return "\n\n".join(slides_text)
 
+def _cells(row: Iterable) -> List[str]:
+    cells = [_cell_text(v) for v in row]
+    # Drop trailing empty cells; inner ones keep columns aligned with the header
+    while cells and not cells[-1]:
+        cells.pop()
+    return cells
 
-# ---------------- EXCEL ----------------
-def _load_excel(path: Path) -> str:
-    sheets = pd.read_excel(path, sheet_name=None)
-    text = []
 
-    for sheet_name, df in sheets.items():
-        rows = df.astype(str).values.tolist()
-        row_text = [" | ".join(row) for row in rows if any(row)]
-        if row_text:
-            text.append(
-                f"\n--- SHEET: {sheet_name} ---\n" + "\n".join(row_text)
+# Rows inspected to find the header below any title / preamble rows
+HEADER_SCAN_ROWS = 20
+
+
+def _iter_table(title: str, rows: Iterable[Iterable]) -> Iterator[str]:
+    """
+    Group rows into segments that fit one chunk, each starting with the
+    title, any preamble rows and the header row, so it stands alone
+    after chunking. Rows are consumed lazily; only one segment is held
+    at a time.
+    """
+    rows = iter(rows)
+    scanned: List[List[str]] = []
+    for row in rows:
+        cells = _cells(row)
+        if any(cells):
+            scanned.append(cells)
+            if len(scanned) >= HEADER_SCAN_ROWS:
+                break
+    if not scanned:
+        return
+
+    # Header: first row at least half as wide as the widest scanned row;
+    # sheet titles and notes above it become part of the prefix
+    width = max(sum(1 for c in cells if c) for cells in scanned)
+    start = next(i for i, cells in enumerate(scanned) if sum(1 for c in cells if c) * 2 >= width)
+    # Skip empty leading columns (tables that start at column B, ...)
+    lead = min(next(i for i, c in enumerate(cells) if c) for cells in scanned)
+
+    prefix = "\n".join(
+        [title]
+        + [" ".join(c for c in cells if c) for cells in scanned[:start]]
+        + [" | ".join(scanned[start][lead:])]
+    )
+    prefix_tokens = estimate_tokens(prefix)
+    budget = min(settings.CHUNK_MAX_TOKENS, settings.EMBEDDING_MAX_TOKENS)
+
+    def _row_text(cells: List[str]) -> str:
+        # A later row may use a column left of the table: never slice
+        # away a non-empty cell
+        first = next(i for i, c in enumerate(cells) if c)
+        return " | ".join(cells[min(lead, first):])
+
+    def _texts() -> Iterator[str]:
+        for cells in scanned[start + 1:]:
+            yield _row_text(cells)
+        for row in rows:
+            cells = _cells(row)
+            if any(cells):
+                yield _row_text(cells)
+
+    lines: List[str] = []
+    tokens = prefix_tokens
+    for text in _texts():
+        row_tokens = estimate_tokens(text)
+        if lines and tokens + row_tokens > budget:
+            yield prefix + "\n" + "\n".join(lines)
+            lines, tokens = [], prefix_tokens
+        lines.append(text)
+        tokens += row_tokens
+
+    yield prefix + ("\n" + "\n".join(lines) if lines else "")
+
+
+@register_loader(".xlsx", ".xlsm")
+def _iter_excel(path: Path) -> Iterator[str]:
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the
+    # whole workbook in memory
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield from _iter_table(
+                f"--- SHEET: {sheet.title} ---",
+                sheet.iter_rows(values_only=True),
             )
+    finally:
+        workbook.close()
+
 
-    return "\n\n".join(text)
+@register_loader(".xls")
+def _iter_xls(path: Path) -> Iterator[str]:
+    # Legacy binary format: openpyxl cannot read it, fall back to pandas
+    import pandas as pd
 
+    for sheet_name, df in pd.read_excel(path, sheet_name=None, header=None).items():
+        yield from _iter_table(
+            f"--- SHEET: {sheet_name} ---",
+            df.itertuples(index=False, name=None),
+        )
 
-# ---------------- CSV ----------------
-def _load_csv(path: Path) -> str:
-    rows = []
+
+@register_loader(".csv")
+def _iter_csv(path: Path) -> Iterator[str]:
     with open(path, newline="", encoding="utf-8", errors="ignore") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if any(row):
-                rows.append(" | ".join(row))
-    return "\n".join(rows)
+        yield from _iter_table(f"--- TABLE: {path.name} ---", csv.reader(f))
 
 
 # ---------------- HTML ----------------
-def _load_html(path: Path) -> str:
+@register_loader(".html", ".htm")
+def _iter_html(path: Path) -> Iterator[str]:
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(
         path.read_text(encoding="utf-8", errors="ignore"),
         "lxml",
     )
-    return soup.get_text(separator="\n")
+    yield soup.get_text(separator="\n")
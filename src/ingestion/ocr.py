@@ -0,0 +1,101 @@
+from typing import Callable, Dict
+
+from src.app.config import settings
+from src.utils.logger import logger
+from src.ingestion.preocr import pdfium_lock
+
+# (pdf path, 1-based page number) -> page text
+OcrBackend = Callable[[str, int], str]
+
+# Name -> factory. Factories import their engine on first use, so an
+# unavailable engine fails once at lookup instead of once per page.
+_BACKENDS: Dict[str, Callable[[], OcrBackend]] = {}
+
+
+def register_ocr_backend(name: str):
+    """
+    Register an OCR backend factory under `name` (see OCR_BACKEND).
+    """
+    def decorator(factory: Callable[[], OcrBackend]):
+        _BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def get_ocr_backend(name: str | None = None) -> OcrBackend:
+    """
+    Build the configured backend. Raises ValueError for unknown names,
+    ImportError when the backend's engine is not installed and OSError
+    when its binary is missing.
+    """
+    name = name or settings.OCR_BACKEND
+    factory = _BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown OCR backend: {name} (available: {sorted(_BACKENDS)})")
+    return factory()
+
+
+def check_ocr_backend(name: str | None = None) -> bool:
+    """
+    Startup check: build the configured backend once and log an error
+    when it cannot run, since scanned pages would then be ingested
+    without text.
+    """
+    name = name or settings.OCR_BACKEND
+    try:
+        get_ocr_backend(name)
+    except (ImportError, OSError, ValueError) as exc:
+        logger.error(
+            f"OCR UNAVAILABLE | backend={name} | error={exc} | "
+            "scanned PDF pages will be ingested without text"
+        )
+        return False
+    return True
+
+
+def render_page(file_path: str, page: int, dpi: int | None = None):
+    """
+    Rasterize one PDF page to a PIL image.
+    """
+    import pypdfium2 as pdfium
+
+    scale = (dpi or settings.OCR_DPI) / 72
+    # Rendering is serialized with all other pdfium use; OCR is not
+    with pdfium_lock:
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            pdf_page = pdf[page - 1]
+            image = pdf_page.render(scale=scale).to_pil()
+            pdf_page.close()
+        finally:
+            pdf.close()
+    return image
+
+
+# -------------------------------------------------
+# Backends
+# -------------------------------------------------
+@register_ocr_backend("none")
+def _none_backend() -> OcrBackend:
+    # Keep whatever the text layer had
+    return lambda file_path, page: ""
+
+
+@register_ocr_backend("stub")
+def _stub_backend() -> OcrBackend:
+    # Deterministic output for offline runs and benchmarks
+    return lambda file_path, page: f"OCR text of page {page}"
+
+
+@register_ocr_backend("tesseract")
+def _tesseract_backend() -> OcrBackend:
+    import pytesseract
+
+    # Fails here (TesseractNotFoundError) when the binary is missing
+    pytesseract.get_tesseract_version()
+
+    def _ocr(file_path: str, page: int) -> str:
+        image = render_page(file_path, page)
+        return pytesseract.image_to_string(image, lang=settings.OCR_LANG)
+
+    return _ocr
@@ -0,0 +1,259 @@
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.app.config import settings
+from src.ingestion.chunker import iter_chunks
+from src.ingestion.loader import iter_document
+from src.llm.gemini_client import embed_texts
+from src.Query.semantic_cache import answer_cache
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.vectorstore.dedup import DedupStore
+from src.vectorstore.store import get_vector_store
+
+# Marks the end of the chunk stream
+_DONE = object()
+
+# progress(stage, count): stage is "parsed", "embedded" or "inserted"
+ProgressCallback = Callable[[str, int], None]
+
+
+class IngestCancelled(Exception):
+    """Raised inside the pipeline when its cancel event is set."""
+
+
+class _ProducerError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _count_segments(
+    segments: Iterable[str],
+    progress: Optional[ProgressCallback],
+) -> Iterator[str]:
+    for segment in segments:
+        if progress:
+            progress("parsed", 1)
+        yield segment
+
+
+def _produce_batches(
+    file_path: str,
+    batch_size: int,
+    out: "queue.Queue",
+    stop: threading.Event,
+    progress: Optional[ProgressCallback] = None,
+):
+    """
+    Extract + chunk in a background thread, handing off fixed-size
+    batches through a bounded queue (backpressure keeps memory flat).
+    """
+    try:
+        batch: List[str] = []
+        metrics.inc("rag_bytes_total", os.path.getsize(file_path), stage="load_document")
+        segments = metrics.timed_iter(
+            "load_document", _count_segments(iter_document(file_path), progress)
+        )
+        chunks = metrics.timed_iter("chunking", iter_chunks(segments), exclude=segments)
+        for chunk in chunks:
+            if stop.is_set():
+                return
+            metrics.inc("rag_chunks_total", stage="chunking")
+            metrics.inc("rag_tokens_total", chunk.tokens, stage="chunking")
+            batch.append(chunk.text)
+            if len(batch) >= batch_size:
+                out.put(batch)
+                batch = []
+        if batch:
+            out.put(batch)
+        out.put(_DONE)
+    except BaseException as exc:
+        out.put(_ProducerError(exc))
+
+
+def _embed_new(
+    store, texts: List[str], reset: bool = False
+) -> List[Optional[List[float]]]:
+    """
+    Embed `texts`, leaving None for chunks a dedup store already holds.
+    With `reset` the store is emptied before these chunks are inserted,
+    so the chunks it holds now must be embedded as well.
+    """
+    if not isinstance(store, DedupStore):
+        return embed_texts(texts)
+    embeddings: List[Optional[List[float]]] = [None] * len(texts)
+    pending = store.missing(texts, stored=not reset)
+    if pending:
+        for i, vector in zip(pending, embed_texts([texts[i] for i in pending])):
+            embeddings[i] = vector
+    return embeddings
+
+
+def _drop(store, document_id: str, ids: Iterable[int]):
+    ids = sorted(ids)
+    if isinstance(store, DedupStore):
+        # Shared rows stay for the other documents that contain them
+        store.release(document_id, ids)
+    else:
+        store.delete_ids(ids)
+
+
+def _invalidate_answers(mode: str, document_id: str, session_id: Optional[str] = None):
+    if answer_cache is not None:
+        answer_cache.invalidate(
+            document_id if mode == "incremental" else None, session=session_id
+        )
+
+
+def ingest_document(
+    file_path: str,
+    document_id: str,
+    document_name: str,
+    store=None,
+    mode: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    queue_size: Optional[int] = None,
+    progress: Optional[ProgressCallback] = None,
+    cancel: Optional[threading.Event] = None,
+    session_id: Optional[str] = None,
+) -> Dict:
+    """
+    Streaming ingestion: load → chunk → embed → insert.
+
+    Extraction and chunking run ahead in a producer thread while the
+    caller embeds and inserts bounded batches, so the stages overlap
+    and at most `queue_size` batches are buffered at any time.
+
+    Modes:
+    - "overwrite": the collection is reset right before the first
+      insert, so an empty document leaves the current one untouched.
+      A run that fails after the reset removes the rows it inserted,
+      leaving the store empty rather than holding a partial document.
+    - "incremental": other documents are kept; rows previously stored
+      under `document_id` are deleted only after the new version has
+      been inserted (add-or-replace, no rebuild).
+
+    `progress` is called as batches move through each stage, and
+    setting `cancel` aborts the run with `IngestCancelled`.
+    With `session_id`, the document goes into that session's store and
+    "overwrite" only replaces the session's own documents.
+
+    Returns ingestion stats; `chunks == 0` means no text was extracted.
+    """
+
+    store = store or get_vector_store(session_id)
+    mode = mode or settings.INGEST_MODE
+    if mode not in ("overwrite", "incremental"):
+        raise ValueError(f"Unknown ingest mode: {mode}")
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+
+    batches: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    producer = threading.Thread(
+        target=_produce_batches,
+        args=(file_path, batch_size, batches, stop, progress),
+        name="ingest-producer",
+        daemon=True,
+    )
+
+    start = time.perf_counter()
+    first_insert_s = None
+    replaced_ids: List[int] = []
+    inserted_ids: List[int] = []
+    total_chunks = 0
+    total_batches = 0
+    embedded_chunks = 0
+
+    producer.start()
+    try:
+        while True:
+            try:
+                # Wake up periodically so cancellation is noticed while
+                # the producer is still busy extracting
+                item = batches.get(timeout=0.25)
+            except queue.Empty:
+                item = None
+            if cancel is not None and cancel.is_set():
+                raise IngestCancelled(document_id)
+            if item is None:
+                continue
+            if item is _DONE:
+                break
+            if isinstance(item, _ProducerError):
+                raise item.exc
+
+            # Overwrite mode resets the store right before the first insert
+            reset = mode == "overwrite" and total_batches == 0
+            embeddings = _embed_new(store, item, reset=reset)
+            embedded_chunks += sum(e is not None for e in embeddings)
+            if progress:
+                progress("embedded", len(item))
+
+            if total_batches == 0:
+                _invalidate_answers(mode, document_id, session_id)
+                if mode == "overwrite":
+                    # 🔥 OVERWRITE MODE
+                    store.reset_collection()
+                else:
+                    replaced_ids = store.chunk_ids(document_id)
+
+            ids = store.insert(
+                embeddings=embeddings,
+                texts=item,
+                document_id=document_id,
+                document_name=document_name,
+                flush=False,
+            )
+            inserted_ids.extend(ids)
+            metrics.inc("rag_chunks_total", len(item), stage="vector_insert")
+            if progress:
+                progress("inserted", len(item))
+
+            for i, chunk in enumerate(item, start=total_chunks + 1):
+                logger.info(f"[INGESTED CHUNK {i}]\n{chunk}")
+
+            total_chunks += len(item)
+            total_batches += 1
+            if first_insert_s is None:
+                first_insert_s = time.perf_counter() - start
+    except BaseException:
+        # Roll back the partial new version. Incremental mode keeps the
+        # previous one (with dedup, rows it already had are kept too);
+        # overwrite mode has already reset the store and leaves it empty
+        # rather than holding half a document
+        if inserted_ids:
+            _drop(store, document_id, set(inserted_ids) - set(replaced_ids))
+            logger.warning(
+                f"INGEST ROLLED BACK | id={document_id} | mode={mode} | rows={len(inserted_ids)}"
+            )
+        raise
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue
+        while producer.is_alive():
+            try:
+                batches.get_nowait()
+            except queue.Empty:
+                producer.join(timeout=0.05)
+
+    if total_batches:
+        store.flush()
+        # Drop the previous version only once the new one is searchable
+        _drop(store, document_id, set(replaced_ids) - set(inserted_ids))
+        # Answers cached while the document was half-indexed are stale too
+        _invalidate_answers(mode, document_id, session_id)
+
+    return {
+        "mode": mode,
+        "chunks": total_chunks,
+        # Chunks already stored (identical content) are not embedded again
+        "embedded_chunks": embedded_chunks,
+        "replaced_chunks": len(replaced_ids),
+        "batches": total_batches,
+        "time_to_first_insert_s": round(first_insert_s or 0.0, 3),
+        "total_s": round(time.perf_counter() - start, 3),
+    }
@@ -1,47 +1,240 @@
 import os
-from typing import Dict
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 
+from src.app.config import settings
+from src.utils.metrics import metrics
 
+# 1 PDF point = 1/72 inch
+_POINTS_PER_SQ_INCH = 72.0 * 72.0
+
+# pdfium is not thread-safe: every pdfium call in the process (profiling
+# here, rendering in ocr.py) holds this lock
+pdfium_lock = threading.RLock()
+
+# (path, size, mtime) -> pages needing OCR, from full page-level profiles
+_OCR_PAGES: "OrderedDict[Tuple[str, int, float], List[int]]" = OrderedDict()
+_OCR_PAGES_SIZE = 64
+_ocr_pages_lock = threading.Lock()
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tiff", ".bmp"}
+TEXT_EXTENSIONS = {
+    ".txt", ".md", ".csv", ".html", ".htm",
+    ".docx", ".pptx", ".xlsx", ".xlsm", ".xls",
+}
+
+
+class PageProfile(NamedTuple):
+    page: int               # 1-based
+    chars: int              # characters in the text layer
+    text_density: float     # chars per square inch
+    image_coverage: float   # share of the page area covered by images (0-1)
+    needs_ocr: bool
+
+
+# -------------------------------------------------
+# Page-level PDF profiling
+# -------------------------------------------------
+def iter_page_profiles(
+    file_path,
+    start: int = 0,
+    end: Optional[int] = None,
+    min_text_density: Optional[float] = None,
+    min_image_coverage: Optional[float] = None,
+) -> Iterator[PageProfile]:
+    """
+    Profile pages [start, end) from the PDF's object tree with pdfium:
+    a text-layer character count and image bounding boxes per page.
+    No text is extracted and nothing is rendered.
+
+    A page needs OCR when images cover at least `min_image_coverage` of
+    it and its text layer is thinner than `min_text_density`.
+    """
+    import pypdfium2 as pdfium
+    import pypdfium2.raw as pdfium_c
+
+    if min_text_density is None:
+        min_text_density = settings.PREOCR_MIN_TEXT_DENSITY
+    if min_image_coverage is None:
+        min_image_coverage = settings.PREOCR_IMAGE_COVERAGE
+
+    with pdfium_lock:
+        pdf = pdfium.PdfDocument(str(file_path))
+    try:
+        with pdfium_lock:
+            end = len(pdf) if end is None else min(end, len(pdf))
+        for index in range(start, end):
+            # Locked per page, not across the yield
+            with pdfium_lock:
+                chars, coverage, density = _profile_page(pdf, index, pdfium_c)
+
+            yield PageProfile(
+                page=index + 1,
+                chars=chars,
+                text_density=round(density, 2),
+                image_coverage=round(coverage, 3),
+                needs_ocr=coverage >= min_image_coverage and density < min_text_density,
+            )
+    finally:
+        with pdfium_lock:
+            pdf.close()
+
+
+def _profile_page(pdf, index: int, pdfium_c) -> Tuple[int, float, float]:
+    """
+    (text-layer chars, image coverage, chars per square inch) of one page.
+    """
+    page = pdf[index]
+    try:
+        width, height = page.get_size()
+        area = max(width * height, 1.0)
+
+        textpage = page.get_textpage()
+        chars = textpage.count_chars()
+        textpage.close()
+
+        covered = 0.0
+        for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]):
+            # pypdfium2 >= 5 renamed get_pos() to get_bounds()
+            bounds = getattr(obj, "get_bounds", None) or obj.get_pos
+            left, bottom, right, top = bounds()
+            # Clip to the page; overlapping images may double count
+            w = min(right, width) - max(left, 0.0)
+            h = min(top, height) - max(bottom, 0.0)
+            if w > 0 and h > 0:
+                covered += w * h
+    finally:
+        page.close()
+
+    density = chars / (area / _POINTS_PER_SQ_INCH)
+    return chars, min(covered / area, 1.0), density
+
+
+def _file_key(file_path) -> Tuple[str, int, float]:
+    stat = os.stat(file_path)
+    return str(Path(file_path).resolve()), stat.st_size, stat.st_mtime
+
+
+def _remember_ocr_pages(file_path, pages: List[int]):
+    key = _file_key(file_path)
+    with _ocr_pages_lock:
+        _OCR_PAGES[key] = pages
+        _OCR_PAGES.move_to_end(key)
+        while len(_OCR_PAGES) > _OCR_PAGES_SIZE:
+            _OCR_PAGES.popitem(last=False)
+
+
+def ocr_pages(file_path) -> List[int]:
+    """
+    1-based pages of a PDF that need OCR. Each file is profiled once:
+    a page-level `analyze_document` result (e.g. from /ingest) is
+    reused by the loader instead of profiling the document again.
+    """
+    key = _file_key(file_path)
+    with _ocr_pages_lock:
+        pages = _OCR_PAGES.get(key)
+    if pages is None:
+        pages = [p.page for p in iter_page_profiles(file_path) if p.needs_ocr]
+        _remember_ocr_pages(file_path, pages)
+    return pages
+
+
+def _sample_indices(num_pages: int, limit: int) -> List[int]:
+    if num_pages <= limit:
+        return list(range(num_pages))
+    step = num_pages / limit
+    return sorted({int(i * step) for i in range(limit)})
+
+
+def _analyze_pdf(file_path: str, page_level: bool) -> Dict:
+    import pypdfium2 as pdfium
+
+    with pdfium_lock:
+        pdf = pdfium.PdfDocument(file_path)
+        num_pages = len(pdf)
+        pdf.close()
+
+    if page_level:
+        profiles = list(iter_page_profiles(file_path))
+    else:
+        # Document-level decision from an even sample of pages
+        profiles = [
+            profile
+            for i in _sample_indices(num_pages, settings.PREOCR_SAMPLE_PAGES)
+            for profile in iter_page_profiles(file_path, i, i + 1)
+        ]
+
+    ocr_pages = [p.page for p in profiles if p.needs_ocr]
+    if page_level:
+        _remember_ocr_pages(file_path, ocr_pages)
+    if not profiles:
+        reason, confidence = "PDF_EMPTY", 1.0
+    elif not ocr_pages:
+        reason, confidence = "PDF_DIGITAL", 0.95
+    elif len(ocr_pages) == len(profiles):
+        reason, confidence = "PDF_SCANNED", 0.95
+    else:
+        reason, confidence = "PDF_MIXED", 0.9
+
+    result = {
+        "needs_ocr": bool(ocr_pages),
+        "confidence": confidence if page_level else round(confidence * 0.9, 2),
+        "reason_code": reason,
+        "num_pages": num_pages,
+        "pages_analyzed": len(profiles),
+        "ocr_pages": ocr_pages,
+    }
+    if page_level:
+        result["pages"] = [p._asdict() for p in profiles]
+    return result
+
+
+# -------------------------------------------------
+# Document-level decision
+# -------------------------------------------------
+@metrics.timed("analyze_document")
 def analyze_document(
     file_path: str,
-    page_level: bool = True,
-    layout_aware: bool = True,
+    page_level: Optional[bool] = None,
+    layout_aware: Optional[bool] = None,
 ) -> Dict:
     """
     PreOCR decision layer (fallback implementation).
 
-    This function determines whether OCR is needed based on
-    lightweight heuristics when PreOCR is unavailable.
+    Images always need OCR and text-based formats never do. PDFs are
+    profiled page by page (`iter_page_profiles`); `ocr_pages` lists the
+    pages the loader will send to the OCR backend. With
+    `page_level=False` only an even sample of pages is profiled.
     """
 
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    ext = os.path.splitext(file_path)[1].lower()
+    if page_level is None:
+        page_level = settings.PREOCR_PAGE_LEVEL
+
+    ext = Path(file_path).suffix.lower()
 
     # Image files always need OCR
-    if ext in [".png", ".jpg", ".jpeg", ".tiff", ".bmp"]:
+    if ext in IMAGE_EXTENSIONS:
         return {
             "needs_ocr": True,
             "confidence": 1.0,
             "reason_code": "IMAGE_FILE",
         }
 
-    # Text-based formats usually don't need OCR
-    if ext in [".txt", ".docx", ".pptx", ".xlsx", ".xls"]:
+    # Text-based formats don't need OCR
+    if ext in TEXT_EXTENSIONS:
         return {
             "needs_ocr": False,
             "confidence": 0.95,
             "reason_code": "OFFICE_WITH_TEXT",
         }
 
-    # PDFs: conservative heuristic
     if ext == ".pdf":
-        return {
-            "needs_ocr": False,
-            "confidence": 0.8,
-            "reason_code": "PDF_ASSUMED_DIGITAL",
-        }
+        return _analyze_pdf(file_path, page_level)
 
     # Default fallback
     return {
@@ -0,0 +1,351 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from src.app.config import settings
+from src.utils.logger import logger
+
+_READ_BLOCK = 1024 * 1024
+# Upload ids become file names; accept nothing but our own uuid4 hex
+_UPLOAD_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class UploadNotFound(KeyError):
+    """Unknown or expired upload id."""
+
+
+class UploadConflict(Exception):
+    """Offset mismatch, concurrent append or incomplete upload."""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UploadTooLarge(Exception):
+    """The upload or one part exceeds its size limit."""
+
+
+class UploadSession:
+    """
+    One resumable upload. Bytes go straight to the final file while a
+    SHA-256 is updated incrementally, so finalizing never re-reads it.
+    """
+
+    def __init__(
+        self,
+        upload_id: str,
+        filename: str,
+        path: Path,
+        size: Optional[int],
+        document_id: Optional[str],
+        session_id: Optional[str] = None,
+    ):
+        self.id = upload_id
+        self.filename = filename
+        self.path = path
+        self.size = size  # declared total, if the client sent one
+        self.document_id = document_id
+        self.session_id = session_id  # ingest into this session's store
+        self.offset = 0
+        self.created_at = self.updated_at = time.time()
+        self._hasher = hashlib.sha256()
+        self._file = None
+        self.lock = threading.Lock()
+
+    @property
+    def max_bytes(self) -> int:
+        return self.size if self.size is not None else settings.UPLOAD_MAX_BYTES
+
+    def open(self):
+        if self._file is None:
+            self._file = open(self.path, "r+b" if self.path.exists() else "wb")
+            self._file.seek(self.offset)
+
+    def write(self, data: bytes):
+        if self.offset + len(data) > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+        self.open()
+        self._file.write(data)
+        self._hasher.update(data)
+        self.offset += len(data)
+        self.updated_at = time.time()
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            self._file.truncate(self.offset)
+            self._file.close()
+            self._file = None
+
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    def rehash(self):
+        """
+        Rebuild the running hash from the bytes already on disk (after a
+        restart), dropping anything past the recorded offset.
+        """
+        self._hasher = hashlib.sha256()
+        if not self.path.exists():
+            self.offset = 0
+            return
+        with open(self.path, "r+b") as f:
+            remaining = self.offset
+            while remaining:
+                block = f.read(min(_READ_BLOCK, remaining))
+                if not block:
+                    break
+                self._hasher.update(block)
+                remaining -= len(block)
+            self.offset -= remaining
+            f.truncate(self.offset)
+
+    def to_dict(self) -> Dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "document_id": self.document_id,
+            "session_id": self.session_id,
+            "offset": self.offset,
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+            "part_max_bytes": settings.UPLOAD_PART_MAX_BYTES,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class UploadManager:
+    """
+    Init / append part / finalize protocol for large uploads.
+
+    Session metadata is mirrored to `state_dir` so an interrupted upload
+    can resume from its last written offset even after a restart. SHA-256
+    digests of ingested files are kept (per session) so re-uploads can
+    skip ingestion.
+    """
+
+    def __init__(self, upload_dir: str, state_dir: str):
+        self.upload_dir = Path(upload_dir)
+        self.state_dir = Path(state_dir)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+        self._ingested_file = self.state_dir / "ingested.json"
+        self._ingested: Dict[str, Dict] = {}
+        if self._ingested_file.exists():
+            self._ingested = json.loads(self._ingested_file.read_text(encoding="utf-8"))
+
+    # -------------------------------------------------
+    # Sessions
+    # -------------------------------------------------
+    def _state_path(self, upload_id: str) -> Path:
+        if not _UPLOAD_ID.fullmatch(upload_id):
+            raise UploadNotFound(upload_id)
+        return self.state_dir / f"{upload_id}.json"
+
+    def _save_state(self, session: UploadSession):
+        tmp = self._state_path(session.id).with_suffix(".tmp")
+        tmp.write_text(json.dumps(session.to_dict()), encoding="utf-8")
+        os.replace(tmp, self._state_path(session.id))
+
+    def _restore(self, upload_id: str) -> Optional[UploadSession]:
+        state = self._state_path(upload_id)
+        if not state.exists():
+            return None
+        meta = json.loads(state.read_text(encoding="utf-8"))
+        session = UploadSession(
+            upload_id,
+            meta["filename"],
+            self.upload_dir / f"{upload_id}{Path(meta['filename']).suffix.lower()}",
+            meta["size"],
+            meta["document_id"],
+            meta.get("session_id"),
+        )
+        session.offset = meta["offset"]
+        session.created_at = meta["created_at"]
+        session.rehash()
+        return session
+
+    def create(
+        self,
+        filename: str,
+        size: Optional[int] = None,
+        document_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> UploadSession:
+        if size is not None and size > settings.UPLOAD_MAX_BYTES:
+            raise UploadTooLarge(f"Upload exceeds {settings.UPLOAD_MAX_BYTES} bytes")
+        if size is not None and size < 0:
+            raise ValueError("size must be >= 0")
+
+        self.expire()
+        upload_id = uuid.uuid4().hex
+        ext = Path(filename).suffix.lower()
+        session = UploadSession(
+            upload_id,
+            filename,
+            self.upload_dir / f"{upload_id}{ext}",
+            size,
+            document_id,
+            session_id,
+        )
+        session.path.touch()
+        with self._lock:
+            self._sessions[upload_id] = session
+        self._save_state(session)
+        logger.info(f"UPLOAD STARTED | id={upload_id} | file={filename} | size={size}")
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        """
+        The live session, restored from its state file after a restart
+        (blocking: rehashes the partial file).
+        """
+        with self._lock:
+            session = self._sessions.get(upload_id)
+        if session is not None:
+            return session
+        # Rehash outside the registry lock so other uploads are not held up
+        restored = self._restore(upload_id)
+        if restored is None:
+            raise UploadNotFound(upload_id)
+        with self._lock:
+            return self._sessions.setdefault(upload_id, restored)
+
+    def discard(self, upload_id: str, keep_file: bool = False):
+        with self._lock:
+            session = self._sessions.pop(upload_id, None) or self._restore(upload_id)
+        if session is None:
+            raise UploadNotFound(upload_id)
+        session.close()
+        self._state_path(upload_id).unlink(missing_ok=True)
+        if not keep_file:
+            session.path.unlink(missing_ok=True)
+
+    def expire(self):
+        """
+        Drop sessions idle for longer than UPLOAD_SESSION_TTL.
+        """
+        cutoff = time.time() - settings.UPLOAD_SESSION_TTL
+        for state in self.state_dir.glob("*.json"):
+            upload_id = state.stem
+            if not _UPLOAD_ID.fullmatch(upload_id) or state.stat().st_mtime >= cutoff:
+                continue
+            session = self._sessions.get(upload_id)
+            if session is not None and (session.updated_at >= cutoff or session.lock.locked()):
+                continue
+            try:
+                self.discard(upload_id)
+                logger.info(f"UPLOAD EXPIRED | id={upload_id}")
+            except UploadNotFound:
+                pass
+
+    # -------------------------------------------------
+    # Parts
+    # -------------------------------------------------
+    def begin_part(self, upload_id: str, offset: int) -> UploadSession:
+        """
+        Lock the session for one append starting at `offset`; write with
+        `session.write`, then always call `end_part`. Blocking (may
+        restore the session), so async callers run it in a thread.
+        """
+        session = self.get(upload_id)
+        if not session.lock.acquire(blocking=False):
+            raise UploadConflict("Another part is being written", session.offset)
+        if offset != session.offset:
+            session.lock.release()
+            raise UploadConflict(f"Expected offset {session.offset}", session.offset)
+        return session
+
+    def end_part(self, session: UploadSession):
+        """
+        Close the file and record the new offset. Bytes written before a
+        failure (dropped connection, size limit) are kept, so the client
+        resumes from the returned offset.
+        """
+        try:
+            session.close()
+            self._save_state(session)
+        finally:
+            session.lock.release()
+
+    @contextmanager
+    def part(self, upload_id: str, offset: int) -> Iterator[UploadSession]:
+        """
+        `begin_part` / `end_part` for synchronous callers.
+        """
+        session = self.begin_part(upload_id, offset)
+        try:
+            yield session
+        finally:
+            self.end_part(session)
+
+    # -------------------------------------------------
+    # Finalize
+    # -------------------------------------------------
+    def finalize(self, upload_id: str, sha256: Optional[str] = None) -> UploadSession:
+        """
+        Close the file once every byte has arrived and check the
+        client-side digest, if one was sent.
+        """
+        session = self.get(upload_id)
+        with session.lock:
+            if session.size is not None and session.offset != session.size:
+                raise UploadConflict(
+                    f"Upload incomplete: {session.offset} of {session.size} bytes",
+                    session.offset,
+                )
+            session.close()
+            if sha256 and sha256.lower() != session.sha256():
+                self.discard(upload_id)
+                raise ValueError("SHA-256 mismatch; upload discarded")
+
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+        self._state_path(upload_id).unlink(missing_ok=True)
+        logger.info(
+            f"UPLOAD FINALIZED | id={upload_id} | bytes={session.offset} "
+            f"| sha256={session.sha256()}"
+        )
+        return session
+
+    # -------------------------------------------------
+    # Already-ingested files
+    # -------------------------------------------------
+    @staticmethod
+    def _ingested_key(sha256: str, session_id: Optional[str]) -> str:
+        return f"{session_id}/{sha256}" if session_id else sha256
+
+    def ingested(self, sha256: str, session_id: Optional[str] = None) -> Optional[Dict]:
+        return self._ingested.get(self._ingested_key(sha256, session_id))
+
+    def mark_ingested(
+        self,
+        sha256: str,
+        document_id: str,
+        document_name: str,
+        session_id: Optional[str] = None,
+    ):
+        with self._lock:
+            self._ingested[self._ingested_key(sha256, session_id)] = {
+                "document_id": document_id,
+                "document_name": document_name,
+                "ingested_at": time.time(),
+            }
+            tmp = self._ingested_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._ingested), encoding="utf-8")
+            os.replace(tmp, self._ingested_file)
+
+
+# Process-wide upload manager used by the API
+uploads = UploadManager(settings.UPLOAD_DIR, settings.UPLOAD_STATE_DIR)
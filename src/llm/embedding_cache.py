@@ -0,0 +1,201 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+from src.utils.logger import logger
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse all whitespace runs so cosmetic differences hit the same key.
+    """
+    return " ".join(text.split())
+
+
+def cache_key(model: str, text: str) -> bytes:
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed, content-addressed embedding cache.
+
+    Keys are sha256(model, normalized text); vectors are stored as packed
+    float32 blobs in SQLite. Once the cache holds more than `max_entries`
+    rows, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 50_000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)"
+        )
+        self._conn.commit()
+        self._size = self._conn.execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()[0]
+
+    # -------------------------------------------------
+    # Lookup / compute-on-miss
+    # -------------------------------------------------
+    def get_or_compute(
+        self,
+        model: str,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], List[List[float]]],
+    ) -> List[List[float]]:
+        """
+        Return one vector per text, calling `compute` only for texts
+        that are not cached. Duplicate texts are embedded once.
+        """
+        keys = [cache_key(model, t) for t in texts]
+        found = self._get_many(keys)
+
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        with self._lock:
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = compute(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._put_many(fresh)
+            found.update(fresh)
+
+        return [list(found[key]) for key in keys]
+
+    def _get_many(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        unique = list(dict.fromkeys(keys))
+        found: Dict[bytes, List[float]] = {}
+        now = time.time()
+
+        with self._lock:
+            for i in range(0, len(unique), _SQL_BATCH):
+                part = unique[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})",
+                    part,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+                if rows:
+                    hit_keys = [key for key, _ in rows]
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? "
+                        f"WHERE key IN ({','.join('?' * len(hit_keys))})",
+                        [now, *hit_keys],
+                    )
+            self._conn.commit()
+
+        return found
+
+    def _put_many(self, entries: Dict[bytes, List[float]]):
+        now = time.time()
+        rows = [
+            (key, array("f", vector).tobytes(), now)
+            for key, vector in entries.items()
+        ]
+        with self._lock:
+            # Only new keys grow the cache; a key stored meanwhile by a
+            # concurrent miss is refreshed instead
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+            added = self._conn.total_changes - before
+            if added < len(rows):
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                    [(blob, used, key) for key, blob, used in rows],
+                )
+            self._conn.commit()
+            self._size += added
+            if self._size > self.max_entries:
+                self._evict()
+
+    # -------------------------------------------------
+    # LRU eviction
+    # -------------------------------------------------
+    def _evict(self):
+        # Evict down to 90% so we don't evict on every insert
+        target = int(self.max_entries * 0.9)
+        self._size = self._conn.execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()[0]
+        excess = self._size - target
+        if excess <= 0:
+            return
+
+        self._conn.execute(
+            """
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?
+            )
+            """,
+            (excess,),
+        )
+        self._conn.commit()
+        self._size -= excess
+        self.evictions += excess
+        logger.info(f"EMBED CACHE EVICT | removed={excess} | size={self._size}")
+
+    # -------------------------------------------------
+    # Stats
+    # -------------------------------------------------
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._size = 0
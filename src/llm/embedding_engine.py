@@ -0,0 +1,142 @@
+import hashlib
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+from src.utils.logger import logger
+
+
+# A backend embeds one batch of texts in a single request and returns
+# one vector per text, in the same order.
+EmbeddingBackend = Callable[[List[str]], List[List[float]]]
+
+
+class EmbeddingEngine:
+    """
+    Batched, concurrent embedding engine.
+
+    Texts are split into batches of `batch_size`, up to `max_workers`
+    batches are in flight at once, transient failures are retried with
+    exponential backoff, and vectors come back in input order.
+    """
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        batch_size: int = 100,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        is_transient: Optional[Callable[[Exception], bool]] = None,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.is_transient = is_transient or (lambda exc: True)
+
+    # -------------------------------------------------
+    # Public API
+    # -------------------------------------------------
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+
+        batches = [
+            texts[i:i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+
+        # Small inputs never pay for a thread pool
+        if len(batches) == 1 or self.max_workers == 1:
+            results = [self._embed_batch(batch) for batch in batches]
+        else:
+            workers = min(self.max_workers, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # map() preserves submission order
+                results = list(pool.map(self._embed_batch, batches))
+
+        return [vector for batch in results for vector in batch]
+
+    # -------------------------------------------------
+    # One batch with retry + backoff
+    # -------------------------------------------------
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                vectors = self.backend(batch)
+            except Exception as exc:
+                if attempt >= self.max_retries or not self.is_transient(exc):
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt)
+                delay += random.uniform(0, delay / 2)
+                attempt += 1
+                logger.warning(
+                    f"EMBED RETRY | attempt={attempt} | batch={len(batch)} "
+                    f"| sleep={delay:.2f}s | error={exc}"
+                )
+                time.sleep(delay)
+                continue
+
+            if len(vectors) != len(batch):
+                raise ValueError(
+                    f"Embedding backend returned {len(vectors)} vectors "
+                    f"for {len(batch)} texts"
+                )
+            return vectors
+
+
+# -------------------------------------------------
+# Offline backend for benchmarks and local runs
+# -------------------------------------------------
+class FakeEmbeddingBackend:
+    """
+    Deterministic embedder with simulated request latency.
+
+    Each call sleeps `latency_seconds + per_text_seconds * len(batch)`
+    and returns unit vectors derived from a hash of the text, so equal
+    texts always get equal vectors.
+    """
+
+    def __init__(
+        self,
+        dim: int = 768,
+        latency_seconds: float = 0.0,
+        per_text_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.dim = dim
+        self.latency_seconds = latency_seconds
+        self.per_text_seconds = per_text_seconds
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def __call__(self, batch: List[str]) -> List[List[float]]:
+        self.calls += 1
+        delay = self.latency_seconds + self.per_text_seconds * len(batch)
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise ConnectionError("simulated transient embedding failure")
+        return [self.vector(text) for text in batch]
+
+    def vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(
+            hashlib.sha256(text.encode("utf-8")).digest()[:8], "big"
+        )
+        rng = random.Random(seed)
+        values = [rng.gauss(0.0, 1.0) for _ in range(self.dim)]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
@@ -1,22 +1,163 @@
-from google import genai
+import threading
+
 from src.app.config import settings
+from src.llm.embedding_cache import EmbeddingCache
+from src.llm.embedding_engine import EmbeddingEngine
+from src.utils.metrics import metrics
+
+# The GenAI SDK is slow to import; client and cache are built on first use
+_client = None
+_cache = None
+_cache_ready = False
+_init_lock = threading.Lock()
+
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                settings.validate("embeddings")
+                from google import genai
+
+                _client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    return _client
+
+
+def _get_cache():
+    global _cache, _cache_ready
+    if not _cache_ready:
+        with _init_lock:
+            if not _cache_ready:
+                if settings.EMBEDDING_CACHE_ENABLED:
+                    _cache = EmbeddingCache(
+                        path=settings.EMBEDDING_CACHE_PATH,
+                        max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+                    )
+                _cache_ready = True
+    return _cache
+
+
+def _is_transient(exc: Exception) -> bool:
+    from google.genai import errors
 
-# Create Gemini client once
-_client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    if isinstance(exc, errors.APIError):
+        return exc.code in _TRANSIENT_STATUS
+    # Network-level failures (timeouts, resets) are worth retrying;
+    # ConnectionError and TimeoutError are OSError subclasses
+    return isinstance(exc, OSError)
 
 
+def _gemini_backend(batch: list[str]) -> list[list[float]]:
+    """
+    Embed a whole batch in a single embed_content request.
+    """
+    with metrics.track("embed_api"):
+        response = _get_client().models.embed_content(
+            model=settings.EMBEDDING_MODEL,
+            contents=batch,
+        )
+    return [e.values for e in response.embeddings]
+
+
+_engine = EmbeddingEngine(
+    backend=_gemini_backend,
+    batch_size=settings.EMBEDDING_BATCH_SIZE,
+    max_workers=settings.EMBEDDING_MAX_WORKERS,
+    max_retries=settings.EMBEDDING_MAX_RETRIES,
+    backoff_seconds=settings.EMBEDDING_RETRY_BACKOFF,
+    is_transient=_is_transient,
+)
+
+
+@metrics.timed("embed_texts")
 def embed_texts(texts: list[str]) -> list[list[float]]:
     """
     Generate embeddings using the new Google GenAI SDK.
-    Returns 768-dim vectors (compatible with Milvus schema).
+    Returns 768-dim vectors (compatible with Milvus schema),
+    in the same order as `texts`.
+    Cached vectors are reused; only unseen texts hit the API.
     """
-    embeddings = []
+    metrics.inc("rag_chunks_total", len(texts), stage="embed_texts")
+    metrics.inc("rag_bytes_total", sum(len(t) for t in texts), stage="embed_texts")
+    cache = _get_cache()
+    if cache is None:
+        return _engine.embed(texts)
 
-    for text in texts:
-        response = _client.models.embed_content(
-            model=settings.EMBEDDING_MODEL,
-            contents=text,
+    return cache.get_or_compute(settings.EMBEDDING_MODEL, texts, _engine.embed)
+
+
+# -------------------------------------------------
+# Generation (fallback provider of the LLM router)
+# -------------------------------------------------
+class GeminiProvider:
+    """
+    Async Gemini text generation over the shared HTTP pool.
+    """
+
+    name = "gemini"
+
+    def __init__(self, http_client):
+        from google import genai
+        from google.genai import types
+
+        self._client = genai.Client(
+            api_key=settings.GEMINI_API_KEY,
+            http_options=types.HttpOptions(httpx_async_client=http_client),
+        ).aio
+        self._types = types
+
+    def is_transient(self, exc: Exception) -> bool:
+        return _is_transient(exc)
+
+    def _config(self, temperature: float, max_tokens: int):
+        from src.llm.groq_client import SYSTEM_PROMPT
+
+        return self._types.GenerateContentConfig(
+            system_instruction=SYSTEM_PROMPT,
+            temperature=temperature,
+            max_output_tokens=max_tokens,
         )
-        embeddings.append(response.embeddings[0].values)
 
-    return embeddings
+    @staticmethod
+    def _count_usage(usage):
+        if usage is not None:
+            metrics.inc("rag_tokens_total", usage.prompt_token_count or 0, stage="llm_prompt")
+            metrics.inc(
+                "rag_tokens_total", usage.candidates_token_count or 0, stage="llm_completion"
+            )
+
+    async def complete(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        response = await self._client.models.generate_content(
+            model=settings.GEMINI_LLM_MODEL,
+            contents=prompt,
+            config=self._config(temperature, max_tokens),
+        )
+        self._count_usage(response.usage_metadata)
+        return (response.text or "").strip()
+
+    async def stream(self, prompt: str, temperature: float, max_tokens: int):
+        stream = await self._client.models.generate_content_stream(
+            model=settings.GEMINI_LLM_MODEL,
+            contents=prompt,
+            config=self._config(temperature, max_tokens),
+        )
+        usage = None
+        async for chunk in stream:
+            # Every chunk carries the running totals; count the last one
+            usage = chunk.usage_metadata or usage
+            if chunk.text:
+                yield chunk.text
+        self._count_usage(usage)
+
+
+def embedding_cache_stats() -> dict:
+    """
+    Hit/miss counters of the persistent embedding cache.
+    """
+    cache = _get_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
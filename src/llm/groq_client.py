@@ -1,23 +1,81 @@
-from groq import Groq
-from src.app.config import Settings
-
-_client = Groq(api_key=Settings.GROQ_API_KEY)
-
-
-def call_llm(
-    prompt: str,
-    temperature: float = 0.2,
-    max_tokens: int = 512
-) -> str:
-    
-    response = _client.chat.completions.create(
-        model=Settings.GROQ_MODEL,
-        messages=[
-            {"role": "system", "content": "You are a helpful AI assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
-
-    return response.choices[0].message.content.strip()
+from typing import AsyncIterator
+
+from src.app.config import Settings, settings
+from src.utils.metrics import metrics
+
+_TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+SYSTEM_PROMPT = "You are a helpful AI assistant."
+
+
+def _messages(prompt: str) -> list[dict]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _count_usage(usage):
+    if usage is not None:
+        metrics.inc("rag_tokens_total", usage.prompt_tokens or 0, stage="llm_prompt")
+        metrics.inc("rag_tokens_total", usage.completion_tokens or 0, stage="llm_completion")
+
+
+class GroqProvider:
+    """
+    Async Groq chat completions over the shared HTTP pool. Retries are
+    left to `LLMRouter`, so the SDK's own retries are off.
+    """
+
+    name = "groq"
+
+    def __init__(self, http_client):
+        settings.validate("llm")
+        from groq import AsyncGroq
+
+        self._client = AsyncGroq(
+            api_key=Settings.GROQ_API_KEY,
+            http_client=http_client,
+            max_retries=0,
+        )
+
+    def is_transient(self, exc: Exception) -> bool:
+        import groq
+
+        if isinstance(exc, (groq.APIConnectionError, groq.APITimeoutError)):
+            return True
+        if isinstance(exc, groq.APIStatusError):
+            return exc.status_code in _TRANSIENT_STATUS
+        return False
+
+    async def complete(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        response = await self._client.chat.completions.create(
+            model=Settings.GROQ_MODEL,
+            messages=_messages(prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        _count_usage(getattr(response, "usage", None))
+
+        return response.choices[0].message.content.strip()
+
+    async def stream(
+        self, prompt: str, temperature: float, max_tokens: int
+    ) -> AsyncIterator[str]:
+        stream = await self._client.chat.completions.create(
+            model=Settings.GROQ_MODEL,
+            messages=_messages(prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                # Groq reports usage on the final chunk
+                _count_usage(getattr(getattr(chunk, "x_groq", None), "usage", None))
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            await stream.close()
@@ -0,0 +1,595 @@
+import asyncio
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from src.app.config import settings
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+
+# Hedge delays come from a provider's recent latency only once it has
+# this many samples
+_MIN_SAMPLES = 20
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """No provider answered within the call's deadline."""
+
+
+# -------------------------------------------------
+# Offline provider for tests and benchmarks
+# -------------------------------------------------
+class FakeLLMProvider:
+    """
+    Deterministic provider with simulated latency and failures.
+
+    Answers with the start of the prompt's context after
+    `latency_seconds`; streams it word by word, `token_seconds` apart.
+    A share `failure_rate` of calls raises a transient ConnectionError.
+    """
+
+    def __init__(
+        self,
+        name: str = "fake",
+        latency_seconds: float = 0.0,
+        token_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.name = name
+        self.latency_seconds = latency_seconds
+        self.token_seconds = token_seconds
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def is_transient(self, exc: Exception) -> bool:
+        return isinstance(exc, ConnectionError)
+
+    @staticmethod
+    def answer(prompt: str) -> str:
+        context = prompt.split("Context:", 1)[-1].split("Question:", 1)[0]
+        return context.strip()[:200] or "I don't know."
+
+    async def _wait(self):
+        self.calls += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise ConnectionError(f"simulated {self.name} failure")
+
+    async def complete(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        await self._wait()
+        return self.answer(prompt)
+
+    async def stream(self, prompt: str, temperature: float, max_tokens: int):
+        await self._wait()
+        for i, word in enumerate(self.answer(prompt).split(" ")):
+            if i and self.token_seconds:
+                await asyncio.sleep(self.token_seconds)
+            yield word if i == 0 else " " + word
+
+
+# -------------------------------------------------
+# Provider latency / health
+# -------------------------------------------------
+class ProviderHealth:
+    """
+    Recent latencies of one provider (full answers and time to first
+    streamed token) plus its failure streak. After `failure_threshold`
+    failures in a row it is skipped for `cooldown_seconds`.
+    """
+
+    def __init__(self, window: int = 256):
+        self.latencies = {"complete": deque(maxlen=window), "ttft": deque(maxlen=window)}
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    def success(self, kind: str, seconds: float):
+        self.calls += 1
+        self.consecutive_failures = 0
+        self.latencies[kind].append(seconds)
+
+    def failure(self, threshold: int, cooldown_seconds: float):
+        self.calls += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        if threshold and self.consecutive_failures >= threshold:
+            self.down_until = time.monotonic() + cooldown_seconds
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def quantile(self, kind: str, q: float) -> Optional[float]:
+        samples = sorted(self.latencies[kind])
+        if len(samples) < _MIN_SAMPLES:
+            return None
+        return samples[round(q * (len(samples) - 1))]
+
+    def to_dict(self) -> Dict:
+        stats = {
+            "calls": self.calls,
+            "errors": self.errors,
+            "available": self.available,
+        }
+        for kind in self.latencies:
+            for q in (0.5, 0.95):
+                value = self.quantile(kind, q)
+                stats[f"{kind}_p{round(q * 100)}_ms"] = (
+                    round(value * 1000, 1) if value is not None else None
+                )
+        return stats
+
+
+# -------------------------------------------------
+# Router: deadlines, retries, failover, hedging
+# -------------------------------------------------
+class LLMRouter:
+    """
+    Sends each generation to the first available provider, within one
+    deadline for the whole call.
+
+    - Transient errors (connection, 429, 5xx) are retried on the same
+      provider with exponential backoff; an attempt that times out or
+      keeps failing moves on to the next provider (failover).
+    - With `hedge`, when the current provider has not answered (or, for
+      streams, produced its first token) within its recent p95 latency,
+      the same request is also sent to the next provider and the first
+      answer wins; the slower one is cancelled.
+    - Providers failing `failure_threshold` times in a row are tried
+      last for `cooldown_seconds`.
+    """
+
+    def __init__(
+        self,
+        providers: List,
+        deadline_seconds: float = 60.0,
+        attempt_timeout_seconds: float = 20.0,
+        max_retries: int = 2,
+        backoff_seconds: float = 0.5,
+        hedge: bool = True,
+        hedge_after_seconds: float = 0.0,
+        hedge_min_seconds: float = 1.0,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 30.0,
+    ):
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = providers
+        self.deadline_seconds = deadline_seconds
+        self.attempt_timeout_seconds = attempt_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.hedge = hedge
+        self.hedge_after_seconds = hedge_after_seconds
+        self.hedge_min_seconds = hedge_min_seconds
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.health = {p.name: ProviderHealth() for p in providers}
+        self.events: Dict[str, int] = {"retry": 0, "failover": 0, "hedge": 0, "hedge_win": 0}
+
+    # -------------------------------------------------
+    # Public API (run on the LLM event loop)
+    # -------------------------------------------------
+    async def generate(
+        self,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 512,
+        deadline: Optional[float] = None,
+    ) -> str:
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + (deadline or self.deadline_seconds)
+        with metrics.track("call_llm"):
+            return await self._race(
+                lambda p: p.complete(prompt, temperature, max_tokens),
+                "complete",
+                deadline_at,
+            )
+
+    async def stream(
+        self,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 512,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yields text deltas. Retries, failover and hedging apply until the
+        first token; after that the answer comes from that provider only.
+        """
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + (deadline or self.deadline_seconds)
+        with metrics.track("stream_llm"):
+            stream, first = await self._race(
+                lambda p: _open_stream(p, prompt, temperature, max_tokens),
+                "ttft",
+                deadline_at,
+                discard=lambda result: result[0].aclose(),
+            )
+            try:
+                if first is None:
+                    return
+                yield first
+                while True:
+                    remaining = deadline_at - loop.time()
+                    if remaining <= 0:
+                        raise LLMDeadlineExceeded("LLM stream exceeded its deadline")
+                    try:
+                        token = await asyncio.wait_for(stream.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        raise LLMDeadlineExceeded("LLM stream exceeded its deadline")
+                    yield token
+            finally:
+                await stream.aclose()
+
+    def stats(self) -> Dict:
+        return {
+            "providers": {p.name: self.health[p.name].to_dict() for p in self.providers},
+            "events": dict(self.events),
+        }
+
+    # -------------------------------------------------
+    # Internals
+    # -------------------------------------------------
+    def _order(self) -> List:
+        # Configured order, providers in cooldown last
+        return sorted(self.providers, key=lambda p: not self.health[p.name].available)
+
+    def _hedge_delay(self, provider, kind: str) -> float:
+        if self.hedge_after_seconds:
+            return self.hedge_after_seconds
+        p95 = self.health[provider.name].quantile(kind, 0.95)
+        if p95 is None:
+            # No history yet: only hedge requests that are clearly stuck
+            return max(self.hedge_min_seconds, self.attempt_timeout_seconds / 2)
+        return max(self.hedge_min_seconds, p95)
+
+    def _event(self, event: str, provider: str):
+        self.events[event] += 1
+        metrics.inc("rag_llm_events_total", event=event, provider=provider)
+
+    async def _attempt(self, provider, call: Callable, kind: str, deadline_at: float):
+        """
+        `call(provider)` with per-attempt timeouts and retries of
+        transient errors. Records the latency of a success, or one
+        failure once the call gives up (not one per retried attempt).
+        """
+        loop = asyncio.get_running_loop()
+        health = self.health[provider.name]
+        attempt = 0
+        while True:
+            timeout = min(self.attempt_timeout_seconds, deadline_at - loop.time())
+            if timeout <= 0:
+                raise LLMDeadlineExceeded(f"{provider.name}: deadline exceeded")
+            start = time.perf_counter()
+            try:
+                with metrics.track("llm_attempt", provider=provider.name):
+                    result = await asyncio.wait_for(call(provider), timeout)
+            except asyncio.TimeoutError:
+                # A slow provider is not retried; the next one takes over
+                health.failure(self.failure_threshold, self.cooldown_seconds)
+                raise LLMDeadlineExceeded(f"{provider.name}: no answer within {timeout:.1f}s")
+            except Exception as exc:
+                delay = self.backoff_seconds * (2 ** attempt)
+                delay += random.uniform(0, delay / 2)
+                if (
+                    attempt >= self.max_retries
+                    or not provider.is_transient(exc)
+                    or loop.time() + delay >= deadline_at
+                ):
+                    health.failure(self.failure_threshold, self.cooldown_seconds)
+                    raise
+                attempt += 1
+                self._event("retry", provider.name)
+                logger.warning(
+                    f"LLM RETRY | provider={provider.name} | attempt={attempt} "
+                    f"| sleep={delay:.2f}s | error={exc}"
+                )
+                await asyncio.sleep(delay)
+                continue
+            health.success(kind, time.perf_counter() - start)
+            return result
+
+    async def _race(
+        self,
+        call: Callable,
+        kind: str,
+        deadline_at: float,
+        discard: Optional[Callable] = None,
+    ):
+        """
+        Run `call` on the providers in order: the next one starts when
+        the current one fails, or (hedging) when it is slower than its
+        hedge delay. The first success wins and the rest are cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        waiting = self._order()
+        primary = waiting[0]
+        pending: Dict[asyncio.Task, object] = {}
+        errors: List[Exception] = []
+        hedge_at = None
+
+        def launch():
+            nonlocal hedge_at
+            provider = waiting.pop(0)
+            task = asyncio.ensure_future(self._attempt(provider, call, kind, deadline_at))
+            pending[task] = provider
+            hedge_at = (
+                loop.time() + self._hedge_delay(provider, kind)
+                if self.hedge and waiting
+                else None
+            )
+
+        launch()
+        try:
+            while pending:
+                wake_at = deadline_at if hedge_at is None else min(deadline_at, hedge_at)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=max(wake_at - loop.time(), 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if loop.time() >= deadline_at:
+                        break
+                    self._event("hedge", pending[next(iter(pending))].name)
+                    launch()
+                    continue
+
+                winner = None
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        logger.warning(
+                            f"LLM PROVIDER FAILED | provider={provider.name} "
+                            f"| error={task.exception()}"
+                        )
+                    elif winner is None:
+                        winner = (provider, task.result())
+                    elif discard is not None:
+                        await discard(task.result())
+                if winner is not None:
+                    provider, result = winner
+                    if provider is not primary:
+                        self._event("hedge_win" if pending else "failover", provider.name)
+                    return result
+                if not pending and waiting:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if errors and not all(isinstance(e, LLMDeadlineExceeded) for e in errors):
+            raise next(e for e in reversed(errors) if not isinstance(e, LLMDeadlineExceeded))
+        raise LLMDeadlineExceeded("No LLM provider answered within the deadline")
+
+
+async def _open_stream(provider, prompt: str, temperature: float, max_tokens: int):
+    """
+    Start a provider stream and wait for its first token.
+    Returns (stream, first token or None when it is empty).
+    """
+    stream = provider.stream(prompt, temperature, max_tokens)
+    try:
+        return stream, await stream.__anext__()
+    except StopAsyncIteration:
+        return stream, None
+    except BaseException:
+        await stream.aclose()
+        raise
+
+
+# -------------------------------------------------
+# Background event loop owning the shared HTTP pool
+# -------------------------------------------------
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_router: Optional[LLMRouter] = None
+_init_lock = threading.Lock()
+
+_END = object()
+
+
+class _Failure:
+    __slots__ = ("exc",)
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _provider_factories() -> Dict[str, Callable]:
+    from src.llm.gemini_client import GeminiProvider
+    from src.llm.groq_client import GroqProvider
+
+    return {
+        "groq": GroqProvider,
+        "gemini": GeminiProvider,
+        "fake": lambda http: FakeLLMProvider(
+            latency_seconds=settings.FAKE_LLM_LATENCY_SECONDS
+        ),
+    }
+
+
+def _build_router() -> LLMRouter:
+    import httpx
+
+    # One connection pool for every provider and every caller
+    http = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(settings.LLM_ATTEMPT_TIMEOUT_SECONDS, connect=10.0),
+    )
+    factories = _provider_factories()
+    primary = settings.LLM_PROVIDER.lower()
+    if primary not in factories:
+        raise ValueError(f"Unknown LLM provider: {primary} (use one of {sorted(factories)})")
+    providers = [factories[primary](http)]
+
+    fallback = settings.LLM_FALLBACK_PROVIDER
+    if fallback and fallback != primary:
+        try:
+            providers.append(factories[fallback](http))
+        except Exception as exc:
+            # Serve without failover rather than not at all
+            logger.warning(f"LLM FALLBACK DISABLED | provider={fallback} | error={exc}")
+
+    logger.info(f"LLM ROUTER | providers={[p.name for p in providers]} | hedge={settings.LLM_HEDGE}")
+    return LLMRouter(
+        providers,
+        deadline_seconds=settings.LLM_DEADLINE_SECONDS,
+        attempt_timeout_seconds=settings.LLM_ATTEMPT_TIMEOUT_SECONDS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        backoff_seconds=settings.LLM_RETRY_BACKOFF,
+        hedge=settings.LLM_HEDGE,
+        hedge_after_seconds=settings.LLM_HEDGE_AFTER_SECONDS,
+        hedge_min_seconds=settings.LLM_HEDGE_MIN_SECONDS,
+        failure_threshold=settings.LLM_FAILURE_THRESHOLD,
+        cooldown_seconds=settings.LLM_COOLDOWN_SECONDS,
+    )
+
+
+def get_llm() -> LLMRouter:
+    global _router
+    if _router is None:
+        with _init_lock:
+            if _router is None:
+                _router = _build_router()
+    return _router
+
+
+def set_llm(router: LLMRouter):
+    """
+    Replace the process-wide router (e.g. with fake providers).
+    """
+    global _router
+    with _init_lock:
+        _router = router
+
+
+def _submit(coro) -> Future:
+    """
+    Schedule `coro` on the LLM event loop thread, started on first use.
+    """
+    global _loop
+    if _loop is None:
+        with _init_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-io", daemon=True).start()
+                _loop = loop
+    return asyncio.run_coroutine_threadsafe(coro, _loop)
+
+
+async def _pump(stream: AsyncIterator[str], emit: Callable):
+    try:
+        async for token in stream:
+            emit(token)
+    except Exception as exc:
+        emit(_Failure(exc))
+    else:
+        emit(_END)
+
+
+# -------------------------------------------------
+# Entry points: async (event loop callers) and sync (threads)
+# -------------------------------------------------
+async def agenerate(
+    prompt: str,
+    temperature: float = 0.2,
+    max_tokens: int = 512,
+    deadline: Optional[float] = None,
+) -> str:
+    """
+    Generate an answer without blocking the caller's event loop.
+    """
+    return await asyncio.wrap_future(
+        _submit(get_llm().generate(prompt, temperature, max_tokens, deadline))
+    )
+
+
+async def astream(
+    prompt: str,
+    temperature: float = 0.2,
+    max_tokens: int = 512,
+    deadline: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """
+    Async iterator of answer text deltas.
+    """
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
+    future = _submit(
+        _pump(
+            get_llm().stream(prompt, temperature, max_tokens, deadline),
+            lambda item: loop.call_soon_threadsafe(tokens.put_nowait, item),
+        )
+    )
+    try:
+        while True:
+            item = await tokens.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        # Client went away: stop generating
+        future.cancel()
+
+
+def call_llm(
+    prompt: str,
+    temperature: float = 0.2,
+    max_tokens: int = 512,
+    deadline: Optional[float] = None,
+) -> str:
+    """
+    Blocking `agenerate` for worker threads.
+    """
+    return _submit(get_llm().generate(prompt, temperature, max_tokens, deadline)).result()
+
+
+def stream_llm(
+    prompt: str,
+    temperature: float = 0.2,
+    max_tokens: int = 512,
+    deadline: Optional[float] = None,
+) -> Iterator[str]:
+    """
+    Blocking `astream` for worker threads.
+    """
+    tokens: "queue.Queue" = queue.Queue()
+    future = _submit(
+        _pump(get_llm().stream(prompt, temperature, max_tokens, deadline), tokens.put)
+    )
+    try:
+        while True:
+            item = tokens.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        future.cancel()
+
+
+def llm_stats() -> Dict:
+    """
+    Per-provider latency / error stats and retry, failover and hedge counts.
+    """
+    if _router is None:
+        return {"providers": {}, "events": {}}
+    return _router.stats()
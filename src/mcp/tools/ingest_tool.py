@@ -1,27 +1,25 @@
-from src.ingestion.loader import load_document
-from src.ingestion.chunker import semantic_chunk_text
-from src.llm.gemini_client import embed_texts
-from src.vectorstore.milvus_client import MilvusClient
+import uuid
+from pathlib import Path
+
+from src.ingestion.pipeline import ingest_document
 
 
 def ingest_tool(file_path: str, document_name: str):
     """
     Ingest document into vector DB (overwrite mode).
     """
-    text = load_document(file_path)
+    stats = ingest_document(
+        file_path,
+        document_id=f"{uuid.uuid4()}{Path(file_path).suffix.lower()}",
+        document_name=document_name,
+        mode="overwrite",   # overwrite old document
+    )
 
-    if not text.strip():
+    if not stats["chunks"]:
         return {"status": "failed", "reason": "No text extracted"}
 
-    chunks = semantic_chunk_text(text)
-    embeddings = embed_texts(chunks)
-
-    milvus = MilvusClient()
-    milvus.reset_collection()   # overwrite old document
-    milvus.insert(embeddings, chunks)
-
     return {
         "status": "success",
         "document_name": document_name,
-        "chunks_ingested": len(chunks),
+        "chunks_ingested": stats["chunks"],
     }
@@ -1,11 +1,78 @@
-from src.vectorstore.milvus_client import MilvusClient
+from src.vectorstore.dedup import DedupStore
+from src.vectorstore.hybrid import HybridStore
+from src.vectorstore.store import use_vector_store
 from src.llm.gemini_client import embed_texts
 
 
-def vector_search_tool(query: str, top_k: int = 5):
+def vector_search_tool(
+    query: str,
+    top_k: int = 5,
+    document_id: str | None = None,
+    embedding: list[float] | None = None,
+    with_vectors: bool = False,
+    ef: int | None = None,
+    session_id: str | None = None,
+):
     """
     Search vector database for relevant chunks.
+    Pass `document_id` to search one document instead of the whole corpus,
+    and `embedding` when the query vector is already known.
+    `with_vectors` adds each chunk's stored vector as "embedding".
+    `ef` overrides the HNSW search beam (higher = better recall, slower).
+    `session_id` searches that session's documents only.
     """
-    embedding = embed_texts([query])[0]
-    milvus = MilvusClient()
-    return milvus.search(embedding, top_k)
+    if embedding is None:
+        embedding = embed_texts([query])[0]
+    with use_vector_store(session_id) as store:
+        return _search(store, query, embedding, top_k, document_id, with_vectors, ef)
+
+
+def _search(store, query, embedding, top_k, document_id, with_vectors, ef):
+    if isinstance(store, (HybridStore, DedupStore)):
+        # Hybrid store: fuse BM25 over the raw query with vector search
+        # (the dedup wrapper forwards the query text when it wraps one)
+        return store.search(
+            embedding,
+            top_k,
+            document_id=document_id,
+            query_text=query,
+            with_vectors=with_vectors,
+            ef=ef,
+        )
+    return store.search(
+        embedding, top_k, document_id=document_id, with_vectors=with_vectors, ef=ef
+    )
+
+
+def vector_search_batch_tool(
+    queries: list[str],
+    top_k: int = 5,
+    document_id: str | None = None,
+    embeddings: list[list[float]] | None = None,
+    with_vectors: bool = False,
+    ef: int | None = None,
+    session_id: str | None = None,
+):
+    """
+    Batched `vector_search_tool`: one embedding request and one
+    multi-vector search for all `queries`; results are in input order.
+    """
+    if embeddings is None:
+        embeddings = embed_texts(queries)
+    with use_vector_store(session_id) as store:
+        return _search_batch(store, queries, embeddings, top_k, document_id, with_vectors, ef)
+
+
+def _search_batch(store, queries, embeddings, top_k, document_id, with_vectors, ef):
+    if isinstance(store, (HybridStore, DedupStore)):
+        return store.search_batch(
+            embeddings,
+            top_k,
+            document_id=document_id,
+            query_texts=queries,
+            with_vectors=with_vectors,
+            ef=ef,
+        )
+    return store.search_batch(
+        embeddings, top_k, document_id=document_id, with_vectors=with_vectors, ef=ef
+    )
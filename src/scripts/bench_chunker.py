@@ -0,0 +1,84 @@
+import argparse
+import random
+import re
+import time
+
+from src.ingestion.chunker import iter_chunks
+from src.scripts.synthetic_docs import synthetic_sentence
+
+
+def synthetic_text(megabytes: float = 8, seed: int = 0) -> str:
+    """
+    Resume/report-like text: headings, bullets and paragraphs.
+    """
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < megabytes * 1024 * 1024:
+        kind = rng.random()
+        if kind < 0.1:
+            part = "\n" + " ".join(synthetic_sentence(rng, 3).upper().split()[:3]).rstrip(".")
+        elif kind < 0.5:
+            part = "● " + synthetic_sentence(rng, rng.randint(6, 20))
+        else:
+            part = " ".join(synthetic_sentence(rng) for _ in range(rng.randint(2, 6))) + "\n"
+        parts.append(part)
+        size += len(part) + 1
+    return "\n".join(parts)
+
+
+def _legacy_chunks(text, max_chars=800, overlap_chars=150):
+    # The previous char-budgeted chunker, kept here as a baseline
+    text = re.sub(r"\r", "", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    units = re.split(r"\n\n|(?=\n[A-Z][A-Z\s]{3,}\n)|(?=\n●)|(?=\n- )", text)
+    current, previous, chunks = "", None, []
+    for unit in (u.strip() for u in units if u.strip()):
+        if len(current) + len(unit) <= max_chars:
+            current += ("\n\n" if current else "") + unit
+        else:
+            if current:
+                chunks.append(current if previous is None else previous[-overlap_chars:] + "\n\n" + current)
+                previous = current
+            current = unit
+    if current:
+        chunks.append(current if previous is None else previous[-overlap_chars:] + "\n\n" + current)
+    return chunks
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench(megabytes=8, max_tokens=None, overlap_tokens=None, repeat=3):
+    text = synthetic_text(megabytes)
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    print(f"📝 Input: {mb:.1f} MB")
+
+    legacy_s = new_s = float("inf")
+    for _ in range(repeat):
+        legacy, elapsed = _timed(lambda: _legacy_chunks(text))
+        legacy_s = min(legacy_s, elapsed)
+        chunks, elapsed = _timed(lambda: list(iter_chunks([text], max_tokens, overlap_tokens)))
+        new_s = min(new_s, elapsed)
+
+    assert all(text[c.start:c.end] == c.text for c in chunks), "span mismatch"
+    emitted = sum(len(c) for c in legacy)
+    print(f"🐢 Legacy (chars):  {legacy_s:.2f}s | {mb / legacy_s:.1f} MB/s | "
+          f"{len(legacy)} chunks | {emitted / len(text):.2f}x text emitted")
+    emitted = sum(len(c.text) for c in chunks)
+    print(f"🚀 Spans (tokens):  {new_s:.2f}s | {mb / new_s:.1f} MB/s | "
+          f"{len(chunks)} chunks | {emitted / len(text):.2f}x text emitted | "
+          f"max {max(c.tokens for c in chunks)} tokens")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chunker throughput benchmark")
+    parser.add_argument("--mb", type=float, default=8)
+    parser.add_argument("--max-tokens", type=int)
+    parser.add_argument("--overlap-tokens", type=int)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    bench(args.mb, args.max_tokens, args.overlap_tokens, args.repeat)
@@ -0,0 +1,64 @@
+import argparse
+import time
+
+from src.llm.embedding_engine import EmbeddingEngine, FakeEmbeddingBackend
+
+
+def bench(
+    num_texts=300,
+    batch_size=100,
+    workers=4,
+    latency=0.2,
+    per_text=0.001,
+):
+    """
+    Compare the old one-request-per-text loop with the batched engine,
+    offline, against a fake embedder with simulated latency.
+    """
+    texts = [f"synthetic chunk {i} " * 20 for i in range(num_texts)]
+
+    # Sequential baseline: one round trip per chunk
+    sequential = FakeEmbeddingBackend(
+        latency_seconds=latency, per_text_seconds=per_text
+    )
+    start = time.perf_counter()
+    baseline = [sequential([t])[0] for t in texts]
+    sequential_s = time.perf_counter() - start
+
+    backend = FakeEmbeddingBackend(
+        latency_seconds=latency, per_text_seconds=per_text
+    )
+    engine = EmbeddingEngine(
+        backend=backend, batch_size=batch_size, max_workers=workers
+    )
+    start = time.perf_counter()
+    batched = engine.embed(texts)
+    batched_s = time.perf_counter() - start
+
+    assert batched == baseline, "batched vectors are out of order"
+
+    print(f"📄 Texts: {num_texts}")
+    print(f"🐢 Sequential: {sequential_s:.2f}s ({sequential.calls} calls)")
+    print(
+        f"🚀 Batched:    {batched_s:.2f}s ({backend.calls} calls, "
+        f"batch={batch_size}, workers={workers})"
+    )
+    print(f"⚡ Speedup: {sequential_s / batched_s:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding engine benchmark")
+    parser.add_argument("--texts", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--per-text", type=float, default=0.001)
+    args = parser.parse_args()
+
+    bench(
+        num_texts=args.texts,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        latency=args.latency,
+        per_text=args.per_text,
+    )
@@ -0,0 +1,45 @@
+import argparse
+import os
+import tempfile
+import time
+
+from src.ingestion.loader import _iter_pdf
+from src.scripts.synthetic_docs import write_text_pdf
+
+
+def bench(pdf_path=None, pages=400, workers=None):
+    """
+    Time serial vs parallel pdfplumber extraction on the same file and
+    check that both produce identical page segments.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    if pdf_path is None:
+        pdf_path = os.path.join(tempfile.mkdtemp(), "bench.pdf")
+        write_text_pdf(pdf_path, pages=pages)
+        print(f"📝 Generated {pages}-page PDF at {pdf_path}")
+
+    start = time.perf_counter()
+    serial = list(_iter_pdf(pdf_path, workers=1))
+    serial_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = list(_iter_pdf(pdf_path, workers=workers))
+    parallel_s = time.perf_counter() - start
+
+    assert serial == parallel, "parallel extraction changed the output"
+
+    print(f"📄 Pages with text: {len(serial)}")
+    print(f"🐢 Serial:   {serial_s:.2f}s")
+    print(f"🚀 Parallel: {parallel_s:.2f}s ({workers} workers)")
+    print(f"⚡ Speedup: {serial_s / parallel_s:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF loader benchmark")
+    parser.add_argument("--pdf", help="existing PDF (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    bench(pdf_path=args.pdf, pages=args.pages, workers=args.workers)
@@ -0,0 +1,114 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from src.app.config import Settings
+
+# Modules that should only be imported when their feature is first used
+HEAVY_MODULES = (
+    "pandas", "pdfplumber", "docx", "pptx", "bs4", "lxml",
+    "google.genai", "groq", "pymilvus",
+)
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{elapsed:.6f}}|{{','.join(heavy)}}")
+"""
+
+
+def _clean_env(keep_keys: bool) -> dict:
+    env = dict(os.environ)
+    if not keep_keys:
+        # Startup must not depend on any subsystem's credentials
+        for names in Settings.SUBSYSTEMS.values():
+            for name in names:
+                env.pop(name, None)
+    return env
+
+
+def measure(module: str, runs: int = 5, keep_keys: bool = False):
+    """
+    Import `module` in fresh interpreters and return
+    (median seconds, heavy modules loaded as a side effect).
+    """
+    env = _clean_env(keep_keys)
+    times, heavy = [], ""
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        ).stdout.strip().splitlines()[-1]
+        elapsed, heavy = out.split("|")
+        times.append(float(elapsed))
+    return statistics.median(times), [m for m in heavy.split(",") if m]
+
+
+def _importtime(code: str, keep_keys: bool):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=_clean_env(keep_keys),
+        check=True,
+    ).stderr
+
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:]
+        # importtime indents nested imports by two spaces per level
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(parts[1]), depth, name.strip()))
+    return rows
+
+
+def top_imports(module: str, limit: int = 10, keep_keys: bool = False):
+    """
+    Direct imports of `module` sorted by cumulative time, parsed from
+    `python -X importtime` (interpreter startup imports excluded).
+    """
+    startup = {name for _, _, name in _importtime("pass", keep_keys)}
+    rows = [
+        (us, name)
+        for us, depth, name in _importtime(f"import {module}", keep_keys)
+        if depth == 1 and name not in startup
+    ]
+    return sorted(rows, reverse=True)[:limit]
+
+
+def bench(modules, runs=5, keep_keys=False):
+    for module in modules:
+        seconds, heavy = measure(module, runs, keep_keys)
+        print(f"🚀 import {module}: {seconds * 1000:.0f} ms (median of {runs})")
+        print(f"   heavy modules loaded: {', '.join(heavy) or 'none'}")
+        for us, name in top_imports(module, keep_keys=keep_keys):
+            print(f"   {us / 1000:>8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark")
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=["src.api.main", "src.scripts.check_milvus", "src.ingestion.pipeline"],
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--keep-keys",
+        action="store_true",
+        help="keep API keys / Milvus settings in the child environment",
+    )
+    args = parser.parse_args()
+
+    bench(args.modules, args.runs, args.keep_keys)
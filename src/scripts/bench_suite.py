@@ -0,0 +1,339 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src.app.config import settings
+from src.ingestion.chunker import chunk_spans
+from src.ingestion.loader import load_document
+from src.llm.embedding_engine import EmbeddingEngine, FakeEmbeddingBackend
+from src.Query.query_engine import _build_prompt
+from src.scripts.synthetic_docs import (
+    write_csv,
+    write_text_file,
+    write_text_pdf,
+    write_xlsx,
+)
+from src.vectorstore.bm25 import BM25Index
+from src.vectorstore.hybrid import HybridStore
+from src.vectorstore.local_store import LocalVectorStore
+
+RESULTS_DIR = Path("data/bench")
+
+
+# -------------------------------------------------
+# Measurement helpers
+# -------------------------------------------------
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource  # not available on Windows
+
+        # Lifetime peak only (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == "Darwin" else peak * 1024
+    except ImportError:
+        return 0
+
+
+class _PeakRss:
+    """
+    Samples resident memory in a background thread while a stage runs.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+def _run_stage(fn, items=None, nbytes=None):
+    """
+    Run `fn` once and report wall time, throughput and peak RSS.
+    `items` / `nbytes` may be callables of the result.
+    """
+    with _PeakRss() as rss:
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+
+    report = {"seconds": round(seconds, 4), "peak_rss_mb": round(rss.peak / 2**20, 1)}
+    if items is not None:
+        count = items(result) if callable(items) else items
+        report["items"] = count
+        report["items_per_s"] = round(count / seconds, 1) if seconds else None
+    if nbytes is not None:
+        size = nbytes(result) if callable(nbytes) else nbytes
+        report["mb_per_s"] = round(size / 2**20 / seconds, 2) if seconds else None
+    return result, report
+
+
+def _run_latencies(fn, inputs):
+    latencies = []
+    with _PeakRss() as rss:
+        start = time.perf_counter()
+        for value in inputs:
+            t0 = time.perf_counter()
+            fn(value)
+            latencies.append(time.perf_counter() - t0)
+        seconds = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {
+        "seconds": round(seconds, 4),
+        "items": len(latencies),
+        "items_per_s": round(len(latencies) / seconds, 1) if seconds else None,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+    }
+
+
+class _FakeLLM:
+    """
+    Deterministic stand-in for `call_llm`: waits `latency_seconds`, then
+    echoes the start of the retrieved context.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    def __call__(self, prompt: str) -> str:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        context = prompt.split("Context:", 1)[-1]
+        return context.strip()[:200]
+
+
+# -------------------------------------------------
+# Corpus
+# -------------------------------------------------
+def build_corpus(workdir: Path, formats, txt_mb: float, rows: int, pages: int, seed: int):
+    writers = {
+        "txt": lambda p: write_text_file(p, megabytes=txt_mb, seed=seed),
+        "csv": lambda p: write_csv(p, rows=rows, seed=seed),
+        "xlsx": lambda p: write_xlsx(p, rows=rows, seed=seed),
+        "pdf": lambda p: write_text_pdf(p, pages=pages, seed=seed),
+    }
+    corpus = {}
+    for fmt in formats:
+        path = workdir / f"corpus.{fmt}"
+        writers[fmt](path)
+        corpus[fmt] = path
+        print(f"📝 {fmt}: {path.stat().st_size / 2**20:.1f} MB")
+    return corpus
+
+
+def _sample_queries(chunks, count: int, seed: int):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = rng.choice(chunks).text.split()
+        start = rng.randrange(max(len(words) - 8, 1))
+        queries.append(" ".join(words[start:start + 8]))
+    return queries
+
+
+# -------------------------------------------------
+# One format end to end
+# -------------------------------------------------
+def bench_file(path: Path, workdir: Path, engine, llm, hybrid: bool, queries: int, seed: int):
+    size = path.stat().st_size
+    stages = {}
+
+    text, stages["load"] = _run_stage(lambda: load_document(str(path)), nbytes=size)
+    chunks, stages["chunk"] = _run_stage(
+        lambda: chunk_spans(text),
+        items=len,
+        nbytes=len(text.encode("utf-8")),
+    )
+    texts = [c.text for c in chunks]
+    vectors, stages["embed"] = _run_stage(lambda: engine.embed(texts), items=len(texts))
+
+    store = LocalVectorStore(str(workdir / f"store-{path.suffix[1:]}"), dim=settings.EMBEDDING_DIM)
+    if hybrid:
+        store = HybridStore(store, BM25Index(str(workdir / f"bm25-{path.suffix[1:]}.npz")))
+
+    def _insert():
+        batch = settings.INGEST_BATCH_SIZE
+        for i in range(0, len(texts), batch):
+            store.insert(vectors[i:i + batch], texts[i:i + batch], "bench", path.name, flush=False)
+        store.flush()
+
+    _, stages["store"] = _run_stage(_insert, items=len(texts))
+
+    def _search(question):
+        embedding = engine.embed([question])[0]
+        if hybrid:
+            return store.search(embedding, 5, query_text=question)
+        return store.search(embedding, 5)
+
+    questions = _sample_queries(chunks, queries, seed)
+    stages["search"] = _run_latencies(_search, questions)
+    stages["answer"] = _run_latencies(
+        lambda q: llm(_build_prompt(q, _search(q))), questions
+    )
+
+    return {
+        "file_bytes": size,
+        "chunks": len(chunks),
+        "tokens": sum(c.tokens for c in chunks),
+        "stages": stages,
+    }
+
+
+# -------------------------------------------------
+# Results
+# -------------------------------------------------
+def _git(*args) -> str:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _print_report(results):
+    for fmt, result in results["formats"].items():
+        print(f"\n📄 {fmt.upper()} ({result['chunks']} chunks, {result['tokens']} tokens)")
+        for stage, r in result["stages"].items():
+            line = f"  {stage:<7} {r['seconds']:>8.3f}s"
+            if r.get("items_per_s") is not None:
+                line += f" | {r['items_per_s']:>10.1f} items/s"
+            if r.get("mb_per_s") is not None:
+                line += f" | {r['mb_per_s']:>7.2f} MB/s"
+            if "p95_ms" in r:
+                line += f" | p50 {r['p50_ms']:.2f} p95 {r['p95_ms']:.2f} p99 {r['p99_ms']:.2f} ms"
+            line += f" | peak RSS {r['peak_rss_mb']:.0f} MB"
+            print(line)
+
+
+def compare(baseline_path: str, results):
+    """
+    Print per-stage change vs. a previous results file
+    (throughput: higher is better, p95: lower is better).
+    """
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    print(f"\n📊 vs {baseline['meta'].get('commit', '?')[:10]} ({baseline_path})")
+    for fmt, result in results["formats"].items():
+        old = baseline["formats"].get(fmt)
+        if not old:
+            continue
+        for stage, new in result["stages"].items():
+            prev = old["stages"].get(stage)
+            if not prev:
+                continue
+            parts = []
+            if new.get("items_per_s") and prev.get("items_per_s"):
+                change = new["items_per_s"] / prev["items_per_s"] - 1
+                parts.append(f"throughput {change:+.1%}")
+            elif new.get("mb_per_s") and prev.get("mb_per_s"):
+                change = new["mb_per_s"] / prev["mb_per_s"] - 1
+                parts.append(f"throughput {change:+.1%}")
+            if new.get("p95_ms") and prev.get("p95_ms"):
+                parts.append(f"p95 {new['p95_ms'] / prev['p95_ms'] - 1:+.1%}")
+            parts.append(f"peak RSS {new['peak_rss_mb'] - prev['peak_rss_mb']:+.0f} MB")
+            print(f"  {fmt:<5} {stage:<7} " + " | ".join(parts))
+
+
+def run(args):
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="rag-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    corpus = build_corpus(workdir, args.formats, args.txt_mb, args.rows, args.pages, args.seed)
+    engine = EmbeddingEngine(
+        backend=FakeEmbeddingBackend(
+            dim=settings.EMBEDDING_DIM,
+            latency_seconds=args.embed_latency,
+            seed=args.seed,
+        ),
+        batch_size=settings.EMBEDDING_BATCH_SIZE,
+        max_workers=settings.EMBEDDING_MAX_WORKERS,
+    )
+    llm = _FakeLLM(args.llm_latency)
+
+    results = {
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "formats": {},
+    }
+    for fmt, path in corpus.items():
+        results["formats"][fmt] = bench_file(
+            path, workdir, engine, llm, args.hybrid, args.queries, args.seed
+        )
+
+    _print_report(results)
+
+    out = Path(args.out) if args.out else RESULTS_DIR / (
+        f"bench-{results['meta']['commit'][:10] or 'nogit'}-"
+        f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\n💾 Saved {out}")
+
+    if args.compare:
+        compare(args.compare, results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Offline ingestion + query benchmark (fake embedder and LLM)"
+    )
+    parser.add_argument("--formats", nargs="+", default=["txt", "csv", "xlsx", "pdf"],
+                        choices=["txt", "csv", "xlsx", "pdf"])
+    parser.add_argument("--txt-mb", type=float, default=2)
+    parser.add_argument("--rows", type=int, default=20000, help="CSV/XLSX rows")
+    parser.add_argument("--pages", type=int, default=100, help="PDF pages")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--embed-latency", type=float, default=0.0,
+                        help="simulated seconds per embedding request")
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="simulated seconds per LLM call")
+    parser.add_argument("--no-hybrid", dest="hybrid", action="store_false",
+                        help="vector search only (skip BM25 fusion)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="where to write the corpus and indexes")
+    parser.add_argument("--out", help="results JSON (default: data/bench/bench-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    parser.set_defaults(hybrid=settings.HYBRID_SEARCH)
+
+    run(parser.parse_args())
@@ -3,6 +3,8 @@ from src.app.config import settings
 
 
 def check_collection():
+    settings.validate("milvus")
+
     # 🔑 IMPORTANT: bind to alias="default"
     connections.connect(
         alias="default",
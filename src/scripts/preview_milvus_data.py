@@ -3,6 +3,8 @@ from src.app.config import settings
 
 
 def preview(limit=5):
+    settings.validate("milvus")
+
     connections.connect(
         alias="default",
         uri=settings.MILVUS_URI,
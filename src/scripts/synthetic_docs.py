@@ -0,0 +1,158 @@
+import csv
+import random
+from pathlib import Path
+
+_WORDS = (
+    "revenue pipeline latency vector index embedding cluster invoice "
+    "customer shipment contract warranty region quarter forecast budget "
+    "engineer manager analyst python milvus retrieval document policy "
+    "approval deadline inventory supplier margin growth report summary"
+).split()
+
+
+def synthetic_sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_text_pdf(
+    path: str,
+    pages: int = 300,
+    lines_per_page: int = 40,
+    seed: int = 0,
+    scanned_pages=(),
+) -> Path:
+    """
+    Write a plain multi-page text PDF (Helvetica, one text object per
+    page) without any PDF library, for loader benchmarks.
+    Pages listed in `scanned_pages` (1-based) hold only a full-page
+    image, like a scan without a text layer.
+    """
+    rng = random.Random(seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    scanned_pages = set(scanned_pages)
+
+    # Object numbers: 1 catalog, 2 pages, 3 font, 4 image, then (page, content) pairs
+    pixels = bytes(rng.randrange(256) for _ in range(64 * 64))
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        4: (
+            b"<< /Type /XObject /Subtype /Image /Width 64 /Height 64 "
+            b"/ColorSpace /DeviceGray /BitsPerComponent 8 /Length 4096 >>\nstream\n"
+            + pixels
+            + b"\nendstream"
+        ),
+    }
+    kids = []
+
+    for p in range(pages):
+        page_obj = 5 + 2 * p
+        content_obj = page_obj + 1
+        kids.append(f"{page_obj} 0 R")
+
+        if p + 1 in scanned_pages:
+            lines = ["q 612 0 0 792 0 0 cm /Im1 Do Q"]
+        else:
+            lines = [f"BT /F1 10 Tf 14 TL 50 760 Td (Page {p + 1} heading) Tj"]
+            for _ in range(lines_per_page):
+                lines.append(f"T* ({_pdf_escape(synthetic_sentence(rng))}) Tj")
+            lines.append("ET")
+        stream = "\n".join(lines).encode("latin-1")
+
+        objects[page_obj] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> /XObject << /Im1 4 0 R >> >> "
+            f"/Contents {content_obj} 0 R >>"
+        ).encode("latin-1")
+        objects[content_obj] = (
+            f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1")
+            + stream
+            + b"\nendstream"
+        )
+
+    objects[2] = (
+        f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+    ).encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += f"{num} 0 obj\n".encode("latin-1") + objects[num] + b"\nendobj\n"
+
+    xref_at = len(out)
+    count = max(objects) + 1
+    out += f"xref\n0 {count}\n0000000000 65535 f \n".encode("latin-1")
+    for num in range(1, count):
+        out += f"{offsets[num]:010d} 00000 n \n".encode("latin-1")
+    out += (
+        f"trailer\n<< /Size {count} /Root 1 0 R >>\n"
+        f"startxref\n{xref_at}\n%%EOF\n"
+    ).encode("latin-1")
+
+    path.write_bytes(bytes(out))
+    return path
+
+
+def write_text_file(path: str, megabytes: float = 2, seed: int = 0) -> Path:
+    """
+    Plain-text report: headings, bullet lists and paragraphs.
+    """
+    rng = random.Random(seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    target = int(megabytes * 1024 * 1024)
+    size = 0
+    with path.open("w", encoding="utf-8") as f:
+        while size < target:
+            heading = " ".join(rng.choice(_WORDS) for _ in range(2)).upper()
+            bullets = "\n".join(
+                "● " + synthetic_sentence(rng, rng.randint(6, 16))
+                for _ in range(rng.randint(2, 5))
+            )
+            paragraph = " ".join(synthetic_sentence(rng) for _ in range(rng.randint(3, 8)))
+            block = f"{heading}\n{bullets}\n\n{paragraph}\n\n"
+            f.write(block)
+            size += len(block)
+    return path
+
+
+def _table_rows(rows: int, seed: int):
+    rng = random.Random(seed)
+    yield ["id", "customer", "region", "amount", "status", "notes"]
+    for i in range(rows):
+        yield [
+            i + 1,
+            f"{rng.choice(_WORDS).title()} {rng.choice(_WORDS).title()}",
+            rng.choice(["north", "south", "east", "west"]),
+            round(rng.uniform(10, 10000), 2),
+            rng.choice(["open", "paid", "overdue"]),
+            synthetic_sentence(rng, rng.randint(4, 10)),
+        ]
+
+
+def write_csv(path: str, rows: int = 20000, seed: int = 0) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(_table_rows(rows, seed))
+    return path
+
+
+def write_xlsx(path: str, rows: int = 20000, seed: int = 0) -> Path:
+    from openpyxl import Workbook
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("data")
+    for row in _table_rows(rows, seed):
+        sheet.append(row)
+    workbook.save(path)
+    return path
@@ -0,0 +1,225 @@
+import argparse
+import time
+
+import numpy as np
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+
+from src.app.config import settings
+from src.vectorstore.hnsw import load_hnsw_params, save_hnsw_params
+from src.vectorstore.milvus_client import _VECTOR_TYPES, get_milvus_client
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _build(client, name, vectors, M, efConstruction):
+    """
+    Temporary collection holding the sample, indexed with (M, efConstruction).
+    """
+    if utility.has_collection(name):
+        utility.drop_collection(name)
+    schema = CollectionSchema(
+        fields=[
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True),
+            FieldSchema(
+                name="embedding",
+                dtype=_VECTOR_TYPES[client.precision],
+                dim=vectors.shape[1],
+            ),
+        ],
+        description="HNSW tuning sample",
+    )
+    collection = Collection(name=name, schema=schema, using="default")
+    for start in range(0, len(vectors), 1000):
+        batch = vectors[start:start + 1000]
+        collection.insert(
+            [list(range(start, start + len(batch))), client._encode(batch)]
+        )
+    collection.flush()
+
+    start = time.perf_counter()
+    collection.create_index(
+        field_name="embedding",
+        index_params={
+            "index_type": "HNSW",
+            "metric_type": "COSINE",
+            "params": {"M": M, "efConstruction": efConstruction},
+        },
+    )
+    collection.load()
+    return collection, time.perf_counter() - start
+
+
+def _measure(client, collection, queries, truth, top_k, ef):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = collection.search(
+            data=client._encode(query[None, :]),
+            anns_field="embedding",
+            param={"metric_type": "COSINE", "params": {"ef": ef}},
+            limit=top_k,
+        )[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({h.id for h in hits} & set(expected.tolist())) / top_k)
+    return float(np.mean(recalls)), float(np.percentile(latencies, 50)), float(
+        np.percentile(latencies, 95)
+    )
+
+
+def _frontier(points):
+    """
+    Points not beaten on both recall and p50 latency by another point.
+    """
+    best = []
+    for p in sorted(points, key=lambda p: (p["p50_ms"], -p["recall"])):
+        if not best or p["recall"] > best[-1]["recall"]:
+            best.append(p)
+    return best
+
+
+def tune(
+    sample=20000,
+    num_queries=200,
+    top_k=10,
+    ms=(8, 16, 32),
+    ef_constructions=(64, 128, 256),
+    efs=(16, 32, 64, 128, 256),
+    target_recall=0.95,
+    write=False,
+    apply=False,
+    seed=0,
+):
+    """
+    Sweep M / efConstruction / ef on a sample of the live collection
+    against brute-force ground truth, print the recall-latency frontier,
+    and pick the fastest setting that reaches `target_recall`.
+    """
+    if settings.VECTOR_DB != "milvus":
+        print("ℹ️ VECTOR_DB=local searches exactly; there is no HNSW index to tune.")
+        return None
+
+    # HNSW needs ef >= limit; smaller values cannot be measured
+    skipped = sorted(ef for ef in efs if ef < top_k)
+    efs = [ef for ef in efs if ef >= top_k]
+    if skipped:
+        print(f"⚠️ Skipping ef {skipped}: below top_k={top_k}")
+    if not (efs and ms and ef_constructions):
+        print(f"❌ Nothing to sweep: pass at least one M, one efConstruction and one ef >= {top_k}")
+        return None
+
+    client = get_milvus_client()
+    current = load_hnsw_params()
+    print(f"⚙️ Current: {current} | live index: {client.index_params()}")
+
+    vectors = np.asarray(client.sample_vectors(sample + num_queries), dtype=np.float32)
+    if len(vectors) < num_queries + top_k:
+        print(f"❌ Collection too small to tune ({len(vectors)} vectors)")
+        return None
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    # Held-out stored chunks act as queries against the rest
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(vectors))
+    queries, base = vectors[order[:num_queries]], vectors[order[num_queries:]]
+    exact = queries @ base.T
+    truth = np.argpartition(-exact, top_k - 1, axis=1)[:, :top_k]
+    print(f"📄 Sample: {len(base)} vectors, {len(queries)} queries, k={top_k}")
+
+    name = f"{settings.MILVUS_COLLECTION}_hnsw_tune"
+    points = []
+    try:
+        for M in ms:
+            for efc in ef_constructions:
+                collection, build_s = _build(client, name, base, M, efc)
+                for ef in efs:
+                    recall, p50, p95 = _measure(client, collection, queries, truth, top_k, ef)
+                    points.append(
+                        {
+                            "M": M,
+                            "efConstruction": efc,
+                            "ef": ef,
+                            "recall": round(recall, 4),
+                            "p50_ms": round(p50, 2),
+                            "p95_ms": round(p95, 2),
+                            "build_s": round(build_s, 2),
+                        }
+                    )
+                    print(
+                        f"   M={M:<3} efC={efc:<4} ef={ef:<4} recall={recall:.3f} "
+                        f"p50={p50:.2f}ms p95={p95:.2f}ms build={build_s:.1f}s"
+                    )
+                collection.drop()
+    finally:
+        if utility.has_collection(name):
+            utility.drop_collection(name)
+
+    frontier = _frontier(points)
+    print("📈 Recall-latency frontier:")
+    for p in frontier:
+        print(
+            f"   recall={p['recall']:.3f} p50={p['p50_ms']:.2f}ms "
+            f"(M={p['M']}, efConstruction={p['efConstruction']}, ef={p['ef']})"
+        )
+
+    # Fastest point reaching the target; smaller graphs break ties
+    eligible = [p for p in points if p["recall"] >= target_recall]
+    if eligible:
+        chosen = min(eligible, key=lambda p: (p["p50_ms"], p["M"], p["efConstruction"]))
+    else:
+        chosen = max(points, key=lambda p: (p["recall"], -p["p50_ms"]))
+        print(f"⚠️ No setting reached recall {target_recall}; using the best one")
+    print(f"✅ Chosen: {chosen}")
+
+    if write or apply:
+        path = save_hnsw_params(
+            chosen["M"],
+            chosen["efConstruction"],
+            chosen["ef"],
+            report={
+                "target_recall": target_recall,
+                "top_k": top_k,
+                "sample": len(base),
+                "queries": len(queries),
+                "chosen": chosen,
+                "frontier": frontier,
+            },
+        )
+        print(f"💾 Saved to {path} (ef applies on the next start)")
+    if apply:
+        client.rebuild_index(chosen["M"], chosen["efConstruction"])
+        client.hnsw.update(ef=chosen["ef"], source=f"tuned:{path}")
+        print("🔁 Live index rebuilt")
+
+    return {"chosen": chosen, "frontier": frontier, "points": points}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HNSW recall/latency tuner")
+    parser.add_argument("--sample", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--m", default="8,16,32")
+    parser.add_argument("--ef-construction", default="64,128,256")
+    parser.add_argument("--ef", default="16,32,64,128,256")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--write", action="store_true", help="save the chosen parameters")
+    parser.add_argument(
+        "--apply", action="store_true", help="also rebuild the live index with them"
+    )
+    args = parser.parse_args()
+    if not any(ef >= args.top_k for ef in _ints(args.ef)):
+        parser.error(f"--ef needs at least one value >= --top-k ({args.top_k})")
+
+    tune(
+        sample=args.sample,
+        num_queries=args.queries,
+        top_k=args.top_k,
+        ms=_ints(args.m),
+        ef_constructions=_ints(args.ef_construction),
+        efs=_ints(args.ef),
+        target_recall=args.target_recall,
+        write=args.write,
+        apply=args.apply,
+    )
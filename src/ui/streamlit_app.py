@@ -1,7 +1,54 @@
+import json
+import time
+
 import streamlit as st
 import requests
 
 API_URL = "http://localhost:8000"
+FINAL_JOB_STATES = {"completed", "failed", "cancelled"}
+INGEST_POLL_TIMEOUT = 600  # seconds before the UI stops waiting for a job
+
+
+def iter_sse(resp):
+    """
+    Parse a Server-Sent Events response into (event, data) pairs.
+    """
+    event, data = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def backend_session():
+    """
+    Id of this browser session's backend session (its own document
+    index), created on first use.
+    """
+    if st.session_state.get("session_id") is None:
+        try:
+            resp = requests.post(f"{API_URL}/sessions", timeout=10)
+            resp.raise_for_status()
+            st.session_state.session_id = resp.json()["session_id"]
+        except Exception:
+            return None
+    return st.session_state.session_id
+
+
+def session_expired():
+    # The backend dropped the session (idle TTL): its documents are gone
+    st.session_state.session_id = None
+    st.session_state.document_uploaded = False
+    st.session_state.uploaded_filename = None
+    st.session_state.ingested_key = None
+
 
 # --------------------------------------------------
 # PAGE CONFIG
@@ -25,6 +72,12 @@ if "document_uploaded" not in st.session_state:
 if "uploaded_filename" not in st.session_state:
     st.session_state.uploaded_filename = None
 
+if "ingested_key" not in st.session_state:
+    st.session_state.ingested_key = None
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None
+
 # --------------------------------------------------
 # SIDEBAR – FILE UPLOAD
 # --------------------------------------------------
@@ -36,24 +89,81 @@ with st.sidebar:
         type=["pdf", "txt", "docx", "pptx", "md", "csv", "xlsx", "xls"],
     )
 
-    if uploaded_file is not None:
-        with st.spinner("Ingesting document..."):
-            try:
+    # Upload each file once; reruns keep the same uploader value
+    upload_key = (
+        (uploaded_file.name, uploaded_file.size) if uploaded_file else None
+    )
+
+    if uploaded_file is not None and upload_key != st.session_state.ingested_key:
+        job_id = None
+        try:
+            resp = requests.post(
+                f"{API_URL}/ingest",
+                files={"file": (uploaded_file.name, uploaded_file.getvalue())},
+                data={"session_id": backend_session()},
+                timeout=30
+            )
+            if resp.status_code == 404:
+                # Expired session: start a fresh one and upload again
+                session_expired()
                 resp = requests.post(
                     f"{API_URL}/ingest",
                     files={"file": (uploaded_file.name, uploaded_file.getvalue())},
+                    data={"session_id": backend_session()},
                     timeout=30
                 )
+            if resp.status_code == 202:
+                job_id = resp.json()["job_id"]
+            else:
+                st.error("❌ Failed to ingest document")
+        except Exception:
+            st.error("❌ Backend not reachable")
 
-                if resp.status_code == 200:
-                    st.success("✅ Document ingested successfully")
-                    st.session_state.document_uploaded = True
-                    st.session_state.uploaded_filename = uploaded_file.name
-                else:
-                    st.error("❌ Failed to ingest document")
+        if job_id:
+            status = {}
+            progress_box = st.empty()
+            deadline = time.monotonic() + INGEST_POLL_TIMEOUT
+            with st.spinner("Ingesting document..."):
+                while status.get("status") not in FINAL_JOB_STATES:
+                    if time.monotonic() > deadline:
+                        status = {
+                            "status": "timed out",
+                            "error": f"no result after {INGEST_POLL_TIMEOUT}s",
+                        }
+                        break
+                    time.sleep(1)
+                    try:
+                        resp = requests.get(
+                            f"{API_URL}/ingest/jobs/{job_id}", timeout=10
+                        )
+                    except requests.RequestException:
+                        continue
+                    if resp.status_code != 200:
+                        # e.g. 404 once the backend restarted: the job is gone
+                        status = {
+                            "status": "failed",
+                            "error": f"job status unavailable (HTTP {resp.status_code})",
+                        }
+                        break
+                    status = resp.json()
+                    progress = status.get("progress", {})
+                    progress_box.caption(
+                        f"Parsed {progress.get('parsed_segments', 0)} sections · "
+                        f"embedded {progress.get('chunks_embedded', 0)} chunks · "
+                        f"inserted {progress.get('rows_inserted', 0)} rows"
+                    )
+            progress_box.empty()
 
-            except Exception:
-                st.error("❌ Backend not reachable")
+            st.session_state.ingested_key = upload_key
+            if status.get("status") == "completed":
+                st.success("✅ Document ingested successfully")
+                st.session_state.document_uploaded = True
+                st.session_state.uploaded_filename = uploaded_file.name
+            else:
+                st.error(
+                    f"❌ Failed to ingest document: "
+                    f"{status.get('error') or status.get('status')}"
+                )
 
     if st.session_state.document_uploaded:
         st.divider()
@@ -95,25 +205,44 @@ else:
         with st.chat_message("user"):
             st.markdown(user_input)
 
-        # Assistant message
+        # Assistant message (streamed token by token)
         with st.chat_message("assistant"):
-            with st.spinner("Agent is thinking..."):
-                try:
-                    resp = requests.post(
-                        f"{API_URL}/query",
-                        json={"question": user_input},
-                        timeout=60
-                    )
+            placeholder = st.empty()
+            placeholder.markdown("_Agent is thinking..._")
+            answer = ""
+            done = {}
 
-                    if resp.status_code == 200:
-                        answer = resp.json().get("answer", "No answer found.")
-                    else:
+            try:
+                with requests.post(
+                    f"{API_URL}/query/stream",
+                    json={"question": user_input, "session_id": backend_session()},
+                    stream=True,
+                    timeout=60
+                ) as resp:
+                    if resp.status_code == 404:
+                        session_expired()
+                        answer = "Your session expired. Please upload the document again."
+                    elif resp.status_code != 200:
                         answer = "Something went wrong. Please try again."
+                    else:
+                        for event, data in iter_sse(resp):
+                            if event == "token":
+                                answer += data["text"]
+                                placeholder.markdown(answer + "▌")
+                            elif event == "done":
+                                done = data
+                            elif event == "error":
+                                answer = "Something went wrong. Please try again."
 
-                except Exception:
-                    answer = "Backend not reachable."
+            except Exception:
+                answer = "Backend not reachable."
 
-                st.markdown(answer)
+            placeholder.markdown(answer or "No answer found.")
+            if done:
+                st.caption(
+                    f"⏱️ first token {done['ttft_ms']:.0f} ms · "
+                    f"total {done['total_ms']:.0f} ms"
+                )
 
         st.session_state.messages.append(
             {"role": "assistant", "content": answer}
@@ -0,0 +1,292 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from src.app.config import settings
+
+# name -> (prometheus type, help)
+_FAMILIES = {
+    "rag_stage_duration_seconds": ("histogram", "Wall time per pipeline stage call"),
+    "rag_stage_calls_total": ("counter", "Pipeline stage calls"),
+    "rag_stage_errors_total": ("counter", "Pipeline stage calls that raised"),
+    "rag_stage_in_flight": ("gauge", "Pipeline stage calls currently running"),
+    "rag_chunks_total": ("counter", "Chunks produced / embedded / inserted"),
+    "rag_tokens_total": ("counter", "Tokens processed (estimated for chunks, reported for LLM)"),
+    "rag_bytes_total": ("counter", "Bytes processed"),
+    "rag_llm_events_total": ("counter", "LLM client retries, failovers and hedged requests"),
+    "rag_answer_cache_lookups_total": ("counter", "Semantic answer cache lookups by result"),
+    "rag_answer_cache_saved_seconds_total": (
+        "counter", "Generation time saved by answer cache hits (latency of the cached answers)"
+    ),
+    "rag_answer_cache_invalidations_total": ("counter", "Answer cache invalidations"),
+}
+
+_QUANTILES = (0.5, 0.95, 0.99)
+
+# Default histogram bucket upper bounds, in seconds
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Window:
+    """
+    Running count/sum and per-bucket counts (exported as a Prometheus
+    histogram), plus a fixed-size ring of the latest samples from which
+    the /stats quantiles are computed.
+    Observing is O(log buckets) and allocation-free.
+    """
+
+    __slots__ = ("count", "sum", "buckets", "_bounds", "_ring", "_pos")
+
+    def __init__(self, size: int, bounds: Tuple[float, ...]):
+        self.count = 0
+        self.sum = 0.0
+        self._bounds = bounds
+        # Non-cumulative; the last slot counts values above every bound
+        self.buckets = array("q", bytes(8 * (len(bounds) + 1)))
+        self._ring = array("d", bytes(8 * size))
+        self._pos = 0
+
+    def observe(self, value: float):
+        self._ring[self._pos] = value
+        self._pos = (self._pos + 1) % len(self._ring)
+        self.count += 1
+        self.sum += value
+        # Bounds are inclusive upper limits ("le")
+        self.buckets[bisect_left(self._bounds, value)] += 1
+
+    def quantiles(self) -> Dict[float, float]:
+        samples = sorted(self._ring[:min(self.count, len(self._ring))])
+        if not samples:
+            return {q: 0.0 for q in _QUANTILES}
+        last = len(samples) - 1
+        return {q: samples[round(q * last)] for q in _QUANTILES}
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics (histograms, counters, gauges) rendered
+    in Prometheus text format. Every update is one dict lookup and a few
+    arithmetic ops under a lock, so it stays on in production.
+    """
+
+    def __init__(
+        self, window: int = 2048, enabled: bool = True, buckets: Iterable[float] = _BUCKETS
+    ):
+        self.window = window
+        self.enabled = enabled
+        self.buckets = tuple(sorted(set(float(b) for b in buckets)))
+        self._summaries: Dict[Tuple[str, LabelKey], _Window] = {}
+        self._values: Dict[Tuple[str, LabelKey], float] = {}
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------
+    # Primitives
+    # -------------------------------------------------
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = _Window(self.window, self.buckets)
+            summary.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """
+        Add to a counter (or to a gauge, with a negative value).
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    # -------------------------------------------------
+    # Stage instrumentation
+    # -------------------------------------------------
+    @contextmanager
+    def track(self, stage: str, **labels):
+        """
+        Time a block as one call of `stage`, counting it in flight
+        while it runs and as an error if it raises.
+        """
+        if not self.enabled:
+            yield
+            return
+        key = tuple(sorted({**labels, "stage": stage}.items()))
+        values = self._values
+        with self._lock:
+            gauge = ("rag_stage_in_flight", key)
+            values[gauge] = values.get(gauge, 0) + 1
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            # One lock round-trip for all of the stage's series
+            with self._lock:
+                summary = self._summaries.get(("rag_stage_duration_seconds", key))
+                if summary is None:
+                    summary = self._summaries[("rag_stage_duration_seconds", key)] = _Window(
+                        self.window, self.buckets
+                    )
+                summary.observe(elapsed)
+                values[gauge] -= 1
+                calls = ("rag_stage_calls_total", key)
+                values[calls] = values.get(calls, 0) + 1
+                if failed:
+                    errors = ("rag_stage_errors_total", key)
+                    values[errors] = values.get(errors, 0) + 1
+
+    def timed(self, stage: str, **labels):
+        """
+        Decorator form of `track`.
+        """
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.track(stage, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def timed_iter(
+        self,
+        stage: str,
+        iterable: Iterable,
+        exclude: Optional["TimedIterator"] = None,
+    ) -> "TimedIterator":
+        """
+        Wrap a lazy iterator so the time spent producing its items is
+        recorded as one call of `stage` once it is exhausted. Pass the
+        upstream iterator as `exclude` to record only this stage's own time.
+        """
+        return TimedIterator(self, stage, iterable, exclude)
+
+    # -------------------------------------------------
+    # Export
+    # -------------------------------------------------
+    def snapshot(self) -> Dict:
+        """
+        Per-stage call counts and p50/p95/p99 latency in milliseconds.
+        """
+        with self._lock:
+            summaries = list(self._summaries.items())
+            values = dict(self._values)
+
+        stages = {}
+        for (name, labels), summary in summaries:
+            if name != "rag_stage_duration_seconds":
+                continue
+            label = dict(labels).pop("stage", "")
+            extra = [f"{k}={v}" for k, v in labels if k != "stage"]
+            if extra:
+                label += "{" + ",".join(extra) + "}"
+            q = summary.quantiles()
+            stages[label] = {
+                "calls": summary.count,
+                "errors": int(values.get(("rag_stage_errors_total", labels), 0)),
+                "in_flight": int(values.get(("rag_stage_in_flight", labels), 0)),
+                "p50_ms": round(q[0.5] * 1000, 2),
+                "p95_ms": round(q[0.95] * 1000, 2),
+                "p99_ms": round(q[0.99] * 1000, 2),
+            }
+        return stages
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            summaries = {
+                key: (list(w.buckets), w.sum, w.count) for key, w in self._summaries.items()
+            }
+            values = dict(self._values)
+
+        lines = []
+        for name, (kind, help_text) in _FAMILIES.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), (buckets, total, count) in sorted(summaries.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, n in zip(self.buckets, buckets):
+                        cumulative += n
+                        le = _number(bound)
+                        lines.append(f"{name}_bucket{_labels(labels, le=le)} {cumulative}")
+                    lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {count}')
+                    lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class TimedIterator:
+    def __init__(self, registry, stage, iterable, exclude=None):
+        self._registry = registry
+        self._stage = stage
+        self._iterator = iter(iterable)
+        self._exclude = exclude
+        self.elapsed = 0.0
+        self._done = False
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            self._finish()
+            raise
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def _finish(self):
+        if self._done:
+            return
+        self._done = True
+        own = self.elapsed - (self._exclude.elapsed if self._exclude else 0.0)
+        self._registry.observe("rag_stage_duration_seconds", max(own, 0.0), stage=self._stage)
+        self._registry.inc("rag_stage_calls_total", 1, stage=self._stage)
+
+
+def _labels(labels: LabelKey, **extra) -> str:
+    pairs = list(labels) + [(k, str(v)) for k, v in extra.items()]
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Process-wide registry
+metrics = MetricsRegistry(
+    window=settings.METRICS_WINDOW,
+    enabled=settings.METRICS_ENABLED,
+    buckets=settings.METRICS_BUCKETS,
+)
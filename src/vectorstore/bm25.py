@@ -0,0 +1,271 @@
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.metrics import metrics
+
+_TOKEN = re.compile(r"[\w@.+\-]+")
+_PART = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens. Compound tokens such as emails, phone numbers
+    and SKUs are kept whole *and* split into their alphanumeric parts, so
+    both exact and partial matches score.
+    """
+    tokens = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group().strip(".-+")
+        if not token:
+            continue
+        parts = _PART.findall(token)
+        if len(parts) != 1 or parts[0] != token:
+            tokens.append(token)
+        tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Compact inverted index for lexical (BM25) retrieval.
+
+    Terms and documents are integer-coded; each term's postings are two
+    typed arrays (internal doc number, term frequency). Rows are keyed by
+    the vector store's primary key so results can be fused with vector
+    search. Deleted rows are tombstoned and compacted lazily.
+    Persisted as a single .npz file (CSR postings + JSON metadata).
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.clear(save=False)
+        if self.path and self.path.exists():
+            self._load()
+
+    # -------------------------------------------------
+    # State
+    # -------------------------------------------------
+    def clear(self, save: bool = True):
+        with self._lock:
+            self._vocab: Dict[str, int] = {}
+            self._post_docs: List[array] = []   # term -> array('I') of doc numbers
+            self._post_tfs: List[array] = []    # term -> array('H') of tf
+            self._row_ids = array("q")          # doc number -> store primary key
+            self._doc_lens = array("I")
+            self._doc_codes = array("i")        # doc number -> document code
+            self._alive = bytearray()
+            self._documents: List[str] = []
+            self._doc_index: Dict[str, int] = {}
+            self._row_lookup: Dict[int, int] = {}
+            self._total_len = 0
+            self._dead = 0
+            if save:
+                self.save()
+
+    @property
+    def size(self) -> int:
+        return len(self._row_ids) - self._dead
+
+    # -------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------
+    def add(self, ids: List[int], texts: List[str], document_id: str):
+        with self._lock:
+            code = self._doc_index.get(document_id)
+            if code is None:
+                code = self._doc_index[document_id] = len(self._documents)
+                self._documents.append(document_id)
+
+            for row_id, text in zip(ids, texts):
+                doc = len(self._row_ids)
+                counts: Dict[int, int] = {}
+                tokens = tokenize(text)
+                for token in tokens:
+                    term = self._vocab.get(token)
+                    if term is None:
+                        term = self._vocab[token] = len(self._post_docs)
+                        self._post_docs.append(array("I"))
+                        self._post_tfs.append(array("H"))
+                    counts[term] = counts.get(term, 0) + 1
+
+                for term, tf in counts.items():
+                    self._post_docs[term].append(doc)
+                    self._post_tfs[term].append(min(tf, 65535))
+
+                self._row_ids.append(int(row_id))
+                self._doc_lens.append(len(tokens))
+                self._doc_codes.append(code)
+                self._alive.append(1)
+                self._row_lookup[int(row_id)] = doc
+                self._total_len += len(tokens)
+
+    def remove(self, ids: List[int]):
+        with self._lock:
+            for row_id in ids:
+                doc = self._row_lookup.pop(int(row_id), None)
+                if doc is None or not self._alive[doc]:
+                    continue
+                self._alive[doc] = 0
+                self._total_len -= self._doc_lens[doc]
+                self._dead += 1
+
+            # Rebuild once a quarter of the rows are tombstones
+            if self._dead and self._dead * 4 >= len(self._row_ids):
+                self._compact()
+
+    def _compact(self):
+        remap = array("i", [-1]) * len(self._row_ids)
+        row_ids, doc_lens, doc_codes = array("q"), array("I"), array("i")
+        for doc, alive in enumerate(self._alive):
+            if alive:
+                remap[doc] = len(row_ids)
+                row_ids.append(self._row_ids[doc])
+                doc_lens.append(self._doc_lens[doc])
+                doc_codes.append(self._doc_codes[doc])
+
+        vocab, post_docs, post_tfs = {}, [], []
+        for token, term in self._vocab.items():
+            docs, tfs = array("I"), array("H")
+            for doc, tf in zip(self._post_docs[term], self._post_tfs[term]):
+                if remap[doc] >= 0:
+                    docs.append(remap[doc])
+                    tfs.append(tf)
+            if docs:
+                vocab[token] = len(post_docs)
+                post_docs.append(docs)
+                post_tfs.append(tfs)
+
+        self._vocab, self._post_docs, self._post_tfs = vocab, post_docs, post_tfs
+        self._row_ids, self._doc_lens, self._doc_codes = row_ids, doc_lens, doc_codes
+        self._alive = bytearray([1]) * len(row_ids)
+        self._row_lookup = {row_id: doc for doc, row_id in enumerate(row_ids)}
+        self._dead = 0
+
+    # -------------------------------------------------
+    # Search
+    # -------------------------------------------------
+    @metrics.timed("bm25_search")
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        document_id: Optional[str] = None,
+        ids: Optional[List[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Return up to `top_k` (row id, BM25 score) pairs, best first,
+        optionally restricted to one document or to the row ids `ids`.
+        """
+        with self._lock:
+            n_docs = len(self._row_ids)
+            if not n_docs or not self.size:
+                return []
+
+            terms = {self._vocab[t] for t in tokenize(query) if t in self._vocab}
+            if not terms:
+                return []
+
+            doc_lens = np.frombuffer(self._doc_lens, dtype=np.uint32).astype(np.float32)
+            avgdl = self._total_len / self.size or 1.0
+            norm = self.k1 * (1 - self.b + self.b * doc_lens / avgdl)
+
+            scores = np.zeros(n_docs, dtype=np.float32)
+            for term in terms:
+                docs = np.frombuffer(self._post_docs[term], dtype=np.uint32)
+                tfs = np.frombuffer(self._post_tfs[term], dtype=np.uint16).astype(np.float32)
+                df = len(docs)
+                idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm[docs])
+
+            mask = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+            if document_id is not None:
+                code = self._doc_index.get(document_id)
+                if code is None:
+                    return []
+                mask &= np.frombuffer(self._doc_codes, dtype=np.int32) == code
+            if ids is not None:
+                mask &= np.isin(np.frombuffer(self._row_ids, dtype=np.int64), ids)
+            scores[~mask] = 0.0
+
+            candidates = np.flatnonzero(scores > 0)
+            if not len(candidates):
+                return []
+            k = min(top_k, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top])]
+
+            return [(int(self._row_ids[d]), float(scores[d])) for d in top]
+
+    # -------------------------------------------------
+    # Persistence
+    # -------------------------------------------------
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            if self._dead:
+                self._compact()
+
+            lengths = np.array([len(p) for p in self._post_docs], dtype=np.int64)
+            offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            docs = np.concatenate(
+                [np.frombuffer(p, dtype=np.uint32) for p in self._post_docs]
+                or [np.empty(0, dtype=np.uint32)]
+            )
+            tfs = np.concatenate(
+                [np.frombuffer(p, dtype=np.uint16) for p in self._post_tfs]
+                or [np.empty(0, dtype=np.uint16)]
+            )
+            terms = sorted(self._vocab, key=self._vocab.get)
+            meta = json.dumps({"terms": terms, "documents": self._documents})
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp.npz")
+            np.savez(
+                tmp,
+                offsets=offsets,
+                post_docs=docs,
+                post_tfs=tfs,
+                row_ids=np.frombuffer(self._row_ids, dtype=np.int64),
+                doc_lens=np.frombuffer(self._doc_lens, dtype=np.uint32),
+                doc_codes=np.frombuffer(self._doc_codes, dtype=np.int32),
+                meta=np.frombuffer(meta.encode("utf-8"), dtype=np.uint8),
+            )
+            os.replace(tmp, self.path)
+
+    def _load(self):
+        with np.load(self.path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            offsets = data["offsets"]
+            docs, tfs = data["post_docs"], data["post_tfs"]
+
+            self._vocab = {t: i for i, t in enumerate(meta["terms"])}
+            self._post_docs = [
+                array("I", docs[offsets[i]:offsets[i + 1]].tobytes())
+                for i in range(len(offsets) - 1)
+            ]
+            self._post_tfs = [
+                array("H", tfs[offsets[i]:offsets[i + 1]].tobytes())
+                for i in range(len(offsets) - 1)
+            ]
+            self._row_ids = array("q", data["row_ids"].tobytes())
+            self._doc_lens = array("I", data["doc_lens"].tobytes())
+            self._doc_codes = array("i", data["doc_codes"].tobytes())
+
+        self._documents = meta["documents"]
+        self._doc_index = {d: i for i, d in enumerate(self._documents)}
+        self._alive = bytearray([1]) * len(self._row_ids)
+        self._row_lookup = {row_id: doc for doc, row_id in enumerate(self._row_ids)}
+        self._total_len = int(sum(self._doc_lens))
+        self._dead = 0
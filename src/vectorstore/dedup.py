@@ -0,0 +1,362 @@
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.utils.metrics import metrics
+from src.vectorstore.hybrid import HybridStore
+
+_HASH_BYTES = 16
+
+
+def content_hash(text: str) -> bytes:
+    """
+    Hash of the chunk text after Unicode (NFKC) and whitespace
+    normalization, so re-extracted copies of the same text collide.
+    """
+    normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=_HASH_BYTES).digest()
+
+
+class ChunkMap:
+    """
+    Content hash -> stored row, and row -> owning documents
+    (many-to-many). Documents are integer-coded; persisted as one .npz
+    file (hash matrix + CSR owner lists + JSON document table).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.RLock()
+        self.clear(save=False)
+        if self.path and self.path.exists():
+            self._load()
+
+    # -------------------------------------------------
+    # State
+    # -------------------------------------------------
+    def clear(self, save: bool = True):
+        with self._lock:
+            self._by_hash: Dict[bytes, int] = {}
+            self._hash_of: Dict[int, bytes] = {}
+            self._owners: Dict[int, List[int]] = {}     # row id -> document codes
+            self._documents: List[Tuple[str, str]] = []  # code -> (id, name)
+            self._doc_index: Dict[Tuple[str, str], int] = {}
+            self._doc_rows: Dict[str, Set[int]] = {}     # document id -> row ids
+            if save:
+                self.save()
+
+    @property
+    def size(self) -> int:
+        return len(self._owners)
+
+    def _code(self, document_id: str, document_name: str) -> int:
+        key = (document_id, document_name)
+        code = self._doc_index.get(key)
+        if code is None:
+            code = self._doc_index[key] = len(self._documents)
+            self._documents.append(key)
+        return code
+
+    # -------------------------------------------------
+    # Lookups
+    # -------------------------------------------------
+    def lookup(self, digest: bytes) -> Optional[int]:
+        return self._by_hash.get(digest)
+
+    def knows(self, document_id: str) -> bool:
+        """
+        True for every document ingested with dedup on, even once it no
+        longer owns any row (its stored rows may now belong to others).
+        """
+        return any(doc_id == document_id for doc_id, _ in self._doc_index)
+
+    def ids(self, document_id: str) -> List[int]:
+        with self._lock:
+            return sorted(self._doc_rows.get(document_id, ()))
+
+    def owners(self, row_id: int) -> List[Tuple[str, str]]:
+        return [self._documents[c] for c in self._owners.get(row_id, ())]
+
+    # -------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------
+    def add(self, digest: bytes, row_id: int, document_id: str, document_name: str):
+        """
+        Record a newly stored row and its first owner.
+        """
+        with self._lock:
+            self._by_hash[digest] = row_id
+            self._hash_of[row_id] = digest
+            self._owners[row_id] = []
+            self.own(row_id, document_id, document_name)
+
+    def own(self, row_id: int, document_id: str, document_name: str):
+        with self._lock:
+            code = self._code(document_id, document_name)
+            owners = self._owners[row_id]
+            if code not in owners:
+                owners.append(code)
+            self._doc_rows.setdefault(document_id, set()).add(row_id)
+
+    def release(self, row_id: int, document_id: Optional[str] = None) -> bool:
+        """
+        Drop `document_id`'s ownership of a row (every owner when None).
+        Returns True once the row has no owners left and is forgotten.
+        """
+        with self._lock:
+            owners = self._owners.get(row_id)
+            if owners is None:
+                return True
+            keep, dropped = [], set()
+            for code in owners:
+                doc_id = self._documents[code][0]
+                if document_id is None or doc_id == document_id:
+                    dropped.add(doc_id)
+                else:
+                    keep.append(code)
+            for doc_id in dropped:
+                rows = self._doc_rows.get(doc_id)
+                if rows is not None:
+                    rows.discard(row_id)
+                    if not rows:
+                        del self._doc_rows[doc_id]
+            if keep:
+                self._owners[row_id] = keep
+                return False
+            del self._owners[row_id]
+            self._by_hash.pop(self._hash_of.pop(row_id), None)
+            return True
+
+    # -------------------------------------------------
+    # Persistence
+    # -------------------------------------------------
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            row_ids = np.array(sorted(self._owners), dtype=np.int64)
+            hashes = np.frombuffer(
+                b"".join(self._hash_of[r] for r in row_ids.tolist()), dtype=np.uint8
+            ).reshape(-1, _HASH_BYTES)
+            owner_lists = [self._owners[r] for r in row_ids.tolist()]
+            offsets = np.concatenate(
+                [[0], np.cumsum([len(o) for o in owner_lists], dtype=np.int64)]
+            ).astype(np.int64)
+            codes = np.array([c for o in owner_lists for c in o], dtype=np.int32)
+            meta = json.dumps({"documents": self._documents})
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp.npz")
+            np.savez(
+                tmp,
+                row_ids=row_ids,
+                hashes=hashes,
+                owner_offsets=offsets,
+                owner_codes=codes,
+                meta=np.frombuffer(meta.encode("utf-8"), dtype=np.uint8),
+            )
+            os.replace(tmp, self.path)
+
+    def _load(self):
+        with np.load(self.path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            row_ids = data["row_ids"].tolist()
+            hashes = data["hashes"]
+            offsets = data["owner_offsets"].tolist()
+            codes = data["owner_codes"].tolist()
+
+        self._documents = [tuple(d) for d in meta["documents"]]
+        self._doc_index = {d: i for i, d in enumerate(self._documents)}
+        for i, row_id in enumerate(row_ids):
+            digest = hashes[i].tobytes()
+            owners = codes[offsets[i]:offsets[i + 1]]
+            self._by_hash[digest] = row_id
+            self._hash_of[row_id] = digest
+            self._owners[row_id] = owners
+            for c in owners:
+                self._doc_rows.setdefault(self._documents[c][0], set()).add(row_id)
+
+
+class DedupStore:
+    """
+    Wraps a vector store (optionally hybrid) so identical chunks are
+    embedded and stored once. A `ChunkMap` tracks which documents own
+    each stored row; document-scoped searches filter on owned row ids,
+    and every hit lists all of its owning documents.
+
+    Rows stored before dedup was enabled have no map entry and keep
+    their own document fields.
+    """
+
+    def __init__(self, store, chunk_map: ChunkMap):
+        self.store = store
+        self.chunk_map = chunk_map
+        self._lock = threading.RLock()
+
+    # -------------------------------------------------
+    # Writes
+    # -------------------------------------------------
+    def reset_collection(self):
+        with self._lock:
+            self.store.reset_collection()
+            self.chunk_map.clear()
+
+    def missing(self, texts: List[str], stored: bool = True) -> List[int]:
+        """
+        Indexes of `texts` that are not stored yet (the ones to embed);
+        repeats within `texts` are listed once. With `stored=False` the
+        current rows are ignored, e.g. right before a reset.
+        """
+        pending, seen = [], set()
+        for i, text in enumerate(texts):
+            digest = content_hash(text)
+            if digest not in seen and (not stored or self.chunk_map.lookup(digest) is None):
+                pending.append(i)
+            seen.add(digest)
+        return pending
+
+    def insert(self, embeddings, texts, document_id, document_name, flush=True):
+        """
+        Store the chunks that are new and take ownership of the rest.
+        `embeddings[i]` may be None when `texts[i]` is already stored.
+        Returns one row id per text, in order.
+        """
+        if len(embeddings) != len(texts):
+            raise ValueError("Embeddings and texts length mismatch")
+
+        digests = [content_hash(t) for t in texts]
+        # Held across the insert so concurrent ingests cannot store the
+        # same new chunk twice
+        with self._lock:
+            ids: List[Optional[int]] = [self.chunk_map.lookup(d) for d in digests]
+            new: Dict[bytes, int] = {}
+            for i, (digest, row_id) in enumerate(zip(digests, ids)):
+                if row_id is None and digest not in new:
+                    if embeddings[i] is None:
+                        raise ValueError("Missing embedding for a chunk that is not stored")
+                    new[digest] = i
+
+            if new:
+                stored = self.store.insert(
+                    embeddings=[embeddings[i] for i in new.values()],
+                    texts=[texts[i] for i in new.values()],
+                    document_id=document_id,
+                    document_name=document_name,
+                    flush=flush,
+                )
+                for digest, row_id in zip(new, stored):
+                    self.chunk_map.add(digest, row_id, document_id, document_name)
+
+            ids = [self.chunk_map.lookup(d) for d in digests]
+            for row_id in ids:
+                self.chunk_map.own(row_id, document_id, document_name)
+
+        metrics.inc("rag_chunks_total", len(texts) - len(new), stage="dedup_hit")
+        if flush:
+            self.chunk_map.save()
+        return ids
+
+    def flush(self):
+        self.store.flush()
+        self.chunk_map.save()
+
+    def chunk_ids(self, document_id: str) -> List[int]:
+        if self.chunk_map.knows(document_id):
+            return self.chunk_map.ids(document_id)
+        return self.store.chunk_ids(document_id)
+
+    def release(self, document_id: str, ids: List[int]):
+        """
+        Drop `document_id`'s ownership of `ids`; rows left without any
+        owner are deleted from the store.
+        """
+        if not ids:
+            return
+        with self._lock:
+            orphaned = [r for r in set(ids) if self.chunk_map.release(r, document_id)]
+            self.store.delete_ids(orphaned)
+            self.chunk_map.save()
+
+    def delete_ids(self, ids: List[int]):
+        if not ids:
+            return
+        with self._lock:
+            for row_id in ids:
+                self.chunk_map.release(row_id)
+            self.store.delete_ids(ids)
+            self.chunk_map.save()
+
+    def delete_document(self, document_id: str) -> int:
+        ids = self.chunk_ids(document_id)
+        self.release(document_id, ids)
+        return len(ids)
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def _scope(self, document_id: Optional[str]) -> Dict:
+        if document_id is None:
+            return {}
+        if self.chunk_map.knows(document_id):
+            return {"ids": self.chunk_map.ids(document_id)}
+        return {"document_id": document_id}
+
+    def _annotate(self, hit: Dict, document_id: Optional[str]) -> Dict:
+        owners = self.chunk_map.owners(hit["id"])
+        if not owners:
+            return hit
+        hit = dict(hit)
+        hit["documents"] = [{"document_id": i, "document": n} for i, n in owners]
+        primary = next((o for o in owners if o[0] == document_id), owners[0])
+        hit["document_id"], hit["document"] = primary
+        return hit
+
+    def fetch(self, ids: List[int], with_vectors: bool = False) -> List[Dict]:
+        return [
+            self._annotate(hit, None)
+            for hit in self.store.fetch(ids, with_vectors=with_vectors)
+        ]
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        document_id: Optional[str] = None,
+        query_text: Optional[str] = None,
+        with_vectors: bool = False,
+        ef: Optional[int] = None,
+    ):
+        scope = self._scope(document_id)
+        if scope.get("ids") == []:
+            return []
+        if isinstance(self.store, HybridStore):
+            scope["query_text"] = query_text
+        hits = self.store.search(
+            query_embedding, top_k, with_vectors=with_vectors, ef=ef, **scope
+        )
+        return [self._annotate(hit, document_id) for hit in hits]
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        document_id: Optional[str] = None,
+        query_texts: Optional[List[str]] = None,
+        with_vectors: bool = False,
+        ef: Optional[int] = None,
+    ) -> List[List[Dict]]:
+        scope = self._scope(document_id)
+        if scope.get("ids") == []:
+            return [[] for _ in query_embeddings]
+        if isinstance(self.store, HybridStore):
+            scope["query_texts"] = query_texts
+        batches = self.store.search_batch(
+            query_embeddings, top_k, with_vectors=with_vectors, ef=ef, **scope
+        )
+        return [[self._annotate(hit, document_id) for hit in hits] for hits in batches]
@@ -0,0 +1,73 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.app.config import settings
+
+# M: graph degree (memory, recall); efConstruction: build-time beam;
+# ef: search-time beam (latency vs recall, can change per query)
+HNSW_PROFILES: Dict[str, Dict[str, int]] = {
+    # Default: the parameters every collection was built with before profiles
+    "latency": {"M": 8, "efConstruction": 64, "ef": 64},
+    "balanced": {"M": 16, "efConstruction": 128, "ef": 64},
+    "recall": {"M": 32, "efConstruction": 256, "ef": 200},
+}
+
+# Milvus accepts ef in [top_k, 32768]
+MAX_EF = 32768
+
+
+def hnsw_params_path() -> Path:
+    if settings.HNSW_PARAMS_PATH:
+        return Path(settings.HNSW_PARAMS_PATH)
+    return Path(f"data/index/{settings.MILVUS_COLLECTION}.hnsw.json")
+
+
+def load_hnsw_params() -> Dict:
+    """
+    HNSW parameters for the collection, later sources winning:
+    the HNSW_PROFILE profile, parameters written by the tuner
+    (`python -m src.scripts.tune_hnsw --write`), then explicit
+    HNSW_M / HNSW_EF_CONSTRUCTION / HNSW_EF.
+    """
+    profile = settings.HNSW_PROFILE
+    if profile not in HNSW_PROFILES:
+        raise ValueError(f"Unknown HNSW profile: {profile} (use one of {sorted(HNSW_PROFILES)})")
+    params = {**HNSW_PROFILES[profile], "source": f"profile:{profile}"}
+
+    path = hnsw_params_path()
+    if path.exists():
+        tuned = json.loads(path.read_text(encoding="utf-8"))
+        params.update({k: int(tuned[k]) for k in ("M", "efConstruction", "ef")})
+        params["source"] = f"tuned:{path}"
+
+    for key, value in (
+        ("M", settings.HNSW_M),
+        ("efConstruction", settings.HNSW_EF_CONSTRUCTION),
+        ("ef", settings.HNSW_EF),
+    ):
+        if value:
+            params[key] = value
+            params["source"] = "env"
+    return params
+
+
+def save_hnsw_params(M: int, efConstruction: int, ef: int, report: Optional[Dict] = None) -> Path:
+    """
+    Persist tuned parameters; picked up by `load_hnsw_params()`.
+    """
+    path = hnsw_params_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "M": M,
+        "efConstruction": efConstruction,
+        "ef": ef,
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "report": report or {},
+    }
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,156 @@
+from typing import Optional
+
+from src.vectorstore.bm25 import BM25Index
+
+
+class HybridStore:
+    """
+    Wraps a vector store (Milvus or local) with a BM25 index over the
+    same chunks and fuses both rankings with reciprocal rank fusion.
+
+    Exposes the same interface as the wrapped store, so ingestion keeps
+    the lexical index in sync without knowing it exists.
+    """
+
+    def __init__(
+        self,
+        store,
+        bm25: BM25Index,
+        rrf_k: int = 60,
+        candidates: int = 4,
+    ):
+        self.store = store
+        self.bm25 = bm25
+        self.rrf_k = rrf_k
+        # Each retriever contributes `candidates * top_k` hits to fusion
+        self.candidates = candidates
+
+    # -------------------------------------------------
+    # Writes: keep BM25 in sync with the vector store
+    # -------------------------------------------------
+    def reset_collection(self):
+        self.store.reset_collection()
+        self.bm25.clear()
+
+    def insert(self, embeddings, texts, document_id, document_name, flush=True):
+        ids = self.store.insert(
+            embeddings=embeddings,
+            texts=texts,
+            document_id=document_id,
+            document_name=document_name,
+            flush=flush,
+        )
+        self.bm25.add(ids, texts, document_id)
+        if flush:
+            self.bm25.save()
+        return ids
+
+    def flush(self):
+        self.store.flush()
+        self.bm25.save()
+
+    def chunk_ids(self, document_id: str) -> list[int]:
+        return self.store.chunk_ids(document_id)
+
+    def fetch(self, ids: list[int], with_vectors: bool = False) -> list[dict]:
+        return self.store.fetch(ids, with_vectors=with_vectors)
+
+    def delete_ids(self, ids: list[int]):
+        if not ids:
+            return
+        self.store.delete_ids(ids)
+        self.bm25.remove(ids)
+        self.bm25.save()
+
+    def delete_document(self, document_id: str) -> int:
+        ids = self.chunk_ids(document_id)
+        self.delete_ids(ids)
+        return len(ids)
+
+    # -------------------------------------------------
+    # Hybrid search
+    # -------------------------------------------------
+    def search(
+        self,
+        query_embedding: list[float],
+        top_k: int,
+        document_id: Optional[str] = None,
+        query_text: Optional[str] = None,
+        with_vectors: bool = False,
+        ids: Optional[list[int]] = None,
+        ef: Optional[int] = None,
+    ):
+        pool = top_k * self.candidates
+        dense = self.store.search(
+            query_embedding,
+            pool,
+            document_id=document_id,
+            with_vectors=with_vectors,
+            ids=ids,
+            ef=ef,
+        )
+        return self._fuse(dense, query_text, top_k, document_id, with_vectors, ids)
+
+    def search_batch(
+        self,
+        query_embeddings: list[list[float]],
+        top_k: int,
+        document_id: Optional[str] = None,
+        query_texts: Optional[list[str]] = None,
+        with_vectors: bool = False,
+        ids: Optional[list[int]] = None,
+        ef: Optional[int] = None,
+    ) -> list[list[dict]]:
+        """
+        One batched vector search, then BM25 + fusion per query.
+        """
+        pool = top_k * self.candidates
+        dense = self.store.search_batch(
+            query_embeddings,
+            pool,
+            document_id=document_id,
+            with_vectors=with_vectors,
+            ids=ids,
+            ef=ef,
+        )
+        query_texts = query_texts or [None] * len(dense)
+        return [
+            self._fuse(hits, text, top_k, document_id, with_vectors, ids)
+            for hits, text in zip(dense, query_texts)
+        ]
+
+    def _fuse(self, dense, query_text, top_k, document_id, with_vectors, ids=None):
+        if not query_text:
+            return dense[:top_k]
+
+        pool = top_k * self.candidates
+        lexical = self.bm25.search(query_text, pool, document_id=document_id, ids=ids)
+
+        # Reciprocal rank fusion: score = Σ 1 / (k + rank)
+        fused: dict[int, float] = {}
+        for rank, hit in enumerate(dense, start=1):
+            fused[hit["id"]] = fused.get(hit["id"], 0.0) + 1.0 / (self.rrf_k + rank)
+        for rank, (row_id, _) in enumerate(lexical, start=1):
+            fused[row_id] = fused.get(row_id, 0.0) + 1.0 / (self.rrf_k + rank)
+
+        best = sorted(fused, key=fused.get, reverse=True)[:top_k]
+
+        hits = {hit["id"]: hit for hit in dense}
+        lexical_scores = dict(lexical)
+        missing = [row_id for row_id in best if row_id not in hits]
+        for row in self.store.fetch(missing, with_vectors=with_vectors):
+            hits[row["id"]] = row
+
+        matches = []
+        for row_id in best:
+            if row_id not in hits:
+                continue  # deleted between the two lookups
+            hit = dict(hits[row_id])
+            # "score" stays the vector similarity (None for keyword-only
+            # hits); results are ordered by the fused value
+            hit.setdefault("score", None)
+            hit["bm25_score"] = lexical_scores.get(row_id)
+            hit["rrf_score"] = fused[row_id]
+            matches.append(hit)
+
+        return matches
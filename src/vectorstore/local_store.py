@@ -0,0 +1,357 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.app.config import settings
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.vectorstore.quantized import (
+    check_precision,
+    dequantize,
+    normalize_rows,
+    quantize,
+    quantized_scores,
+)
+
+
+class LocalVectorStore:
+    """
+    In-process vector store with the same surface as `MilvusClient`.
+
+    Vectors live in one contiguous, L2-normalized float32 matrix, so
+    cosine search is a single matrix-vector product plus argpartition.
+    `flush()` persists the matrix as .npy files that are memory-mapped
+    (read-only) on the next start; the first write copies them to RAM.
+
+    With `precision` "float16" or "int8" (per-row scale) the matrix is
+    stored compactly and scores are approximate; see `RescoringStore`.
+    """
+
+    def __init__(self, path: str, dim: int = 768, precision: str = "float32"):
+        self.path = Path(path)
+        self.dim = dim
+        self.precision = self._configured_precision = check_precision(precision)
+        self._lock = threading.RLock()
+        self._clear()
+        self._load()
+
+    # -------------------------------------------------
+    # State
+    # -------------------------------------------------
+    def _clear(self):
+        # Row buffers grow geometrically; only the first `_size` rows are live
+        self._size = 0
+        self._vectors = np.empty((0, self.dim), dtype=self._dtype)
+        # Per-row int8 scales; None for float precisions
+        self._scales = np.empty(0, dtype=np.float32) if self.precision == "int8" else None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._doc_codes = np.empty(0, dtype=np.int32)
+        self._texts: list[str] = []
+        # code -> (document_id, document_name)
+        self._documents: list[tuple[str, str]] = []
+        self._doc_index: dict[tuple[str, str], int] = {}
+        self._next_id = 1
+
+    def _load(self):
+        meta_file = self.path / "meta.json"
+        if not meta_file.exists():
+            return
+
+        meta = json.loads(meta_file.read_text(encoding="utf-8"))
+        stored = meta.get("precision", "float32")
+        if stored != self.precision:
+            # The matrix on disk wins until the next reset_collection()
+            logger.warning(
+                f"LOCAL STORE PRECISION | configured={self.precision} | stored={stored}"
+            )
+            self.precision = stored
+        self._scales = (
+            np.load(self.path / "scales.npy", mmap_mode="r")
+            if self.precision == "int8" else None
+        )
+        self._vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self._ids = np.load(self.path / "ids.npy", mmap_mode="r")
+        self._doc_codes = np.load(self.path / "doc_codes.npy", mmap_mode="r")
+        self._texts = meta["texts"]
+        self._size = len(self._ids)
+        self._documents = [tuple(d) for d in meta["documents"]]
+        self._doc_index = {d: i for i, d in enumerate(self._documents)}
+        self._next_id = meta["next_id"]
+
+    def flush(self):
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            # Write to temp files, then swap in atomically
+            arrays = [
+                ("vectors", self._vectors[:self._size]),
+                ("ids", self._ids[:self._size]),
+                ("doc_codes", self._doc_codes[:self._size]),
+            ]
+            if self._scales is not None:
+                arrays.append(("scales", self._scales[:self._size]))
+            for name, array in arrays:
+                tmp = self.path / f"{name}.tmp.npy"
+                np.save(tmp, np.ascontiguousarray(array))
+                os.replace(tmp, self.path / f"{name}.npy")
+
+            tmp = self.path / "meta.json.tmp"
+            tmp.write_text(
+                json.dumps(
+                    {
+                        "next_id": self._next_id,
+                        "precision": self.precision,
+                        "documents": self._documents,
+                        "texts": self._texts,
+                    }
+                ),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.path / "meta.json")
+
+    # -------------------------------------------------
+    # 🔥 OVERWRITE MODE: reset collection
+    # -------------------------------------------------
+    def reset_collection(self):
+        with self._lock:
+            self.precision = self._configured_precision
+            self._clear()
+            self.flush()
+
+    # -------------------------------------------------
+    # Insert
+    # -------------------------------------------------
+    @metrics.timed("vector_insert", backend="local")
+    def insert(
+        self,
+        embeddings: list[list[float]],
+        texts: list[str],
+        document_id: str,
+        document_name: str,
+        flush: bool = True,
+    ) -> list[int]:
+        if len(embeddings) != len(texts):
+            raise ValueError("Embeddings and texts length mismatch")
+
+        vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        if vectors.size and vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim embeddings")
+        vectors, scales = quantize(vectors, self.precision)
+
+        with self._lock:
+            key = (document_id, document_name)
+            code = self._doc_index.get(key)
+            if code is None:
+                code = self._doc_index[key] = len(self._documents)
+                self._documents.append(key)
+
+            n = len(texts)
+            ids = np.arange(self._next_id, self._next_id + n, dtype=np.int64)
+            self._next_id += n
+
+            self._reserve(n)
+            end = self._size + n
+            self._vectors[self._size:end] = vectors
+            if scales is not None:
+                self._scales[self._size:end] = scales
+            self._ids[self._size:end] = ids
+            self._doc_codes[self._size:end] = code
+            self._texts.extend(texts)
+            self._size = end
+
+            if flush:
+                self.flush()
+
+        return ids.tolist()
+
+    def _reserve(self, extra: int):
+        """
+        Make room for `extra` rows. Growing also turns memory-mapped
+        arrays into writable RAM copies.
+        """
+        needed = self._size + extra
+        if needed <= len(self._ids) and self._ids.flags.writeable:
+            return
+        capacity = max(needed, 2 * len(self._ids), 1024)
+
+        vectors = np.empty((capacity, self.dim), dtype=self._dtype)
+        ids = np.empty(capacity, dtype=np.int64)
+        codes = np.empty(capacity, dtype=np.int32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids[:self._size] = self._ids[:self._size]
+        codes[:self._size] = self._doc_codes[:self._size]
+        self._vectors, self._ids, self._doc_codes = vectors, ids, codes
+        if self._scales is not None:
+            scales = np.empty(capacity, dtype=np.float32)
+            scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+
+    @property
+    def _dtype(self):
+        return {"float32": np.float32, "float16": np.float16, "int8": np.int8}[self.precision]
+
+    def _dequantize(self, rows) -> np.ndarray:
+        scales = self._scales[rows] if self._scales is not None else None
+        return dequantize(self._vectors[rows], scales)
+
+    # -------------------------------------------------
+    # Incremental mode: per-document maintenance
+    # -------------------------------------------------
+    def _document_mask(self, document_id: str) -> np.ndarray:
+        codes = [i for i, (doc_id, _) in enumerate(self._documents) if doc_id == document_id]
+        return np.isin(self._doc_codes[:self._size], codes)
+
+    def chunk_ids(self, document_id: str) -> list[int]:
+        with self._lock:
+            return self._ids[:self._size][self._document_mask(document_id)].tolist()
+
+    def fetch(self, ids: list[int], with_vectors: bool = False) -> list[dict]:
+        with self._lock:
+            # Primary keys are assigned in increasing order and rows are
+            # never reordered, so the id column stays sorted
+            live = self._ids[:self._size]
+            rows = np.searchsorted(live, ids)
+            out = []
+            for row_id, row in zip(ids, rows):
+                if row < self._size and live[row] == row_id:
+                    doc_id, doc_name = self._documents[self._doc_codes[row]]
+                    match = {
+                        "id": int(row_id),
+                        "text": self._texts[row],
+                        "document": doc_name,
+                        "document_id": doc_id,
+                    }
+                    if with_vectors:
+                        match["embedding"] = self._dequantize([row])[0].tolist()
+                    out.append(match)
+            return out
+
+    def delete_ids(self, ids: list[int]):
+        if not ids:
+            return
+        with self._lock:
+            keep = ~np.isin(self._ids[:self._size], ids)
+            self._vectors = self._vectors[:self._size][keep]
+            self._ids = self._ids[:self._size][keep]
+            self._doc_codes = self._doc_codes[:self._size][keep]
+            if self._scales is not None:
+                self._scales = self._scales[:self._size][keep]
+            self._texts = [t for t, k in zip(self._texts, keep) if k]
+            self._size = len(self._ids)
+            self.flush()
+
+    def delete_document(self, document_id: str) -> int:
+        ids = self.chunk_ids(document_id)
+        self.delete_ids(ids)
+        return len(ids)
+
+    # -------------------------------------------------
+    # Search: vectorized top-k cosine
+    # -------------------------------------------------
+    @metrics.timed("vector_search", backend="local")
+    def search(
+        self,
+        query_embedding: list[float],
+        top_k: int,
+        document_id: Optional[str] = None,
+        with_vectors: bool = False,
+        ids: Optional[list[int]] = None,
+        ef: Optional[int] = None,
+    ):
+        """
+        `ids` restricts the search to those primary keys. `ef` is accepted
+        for API parity with Milvus; the search is exact.
+        """
+        return self._search_many(
+            [query_embedding], top_k, document_id, with_vectors, ids
+        )[0]
+
+    @metrics.timed("vector_search_batch", backend="local")
+    def search_batch(
+        self,
+        query_embeddings: list[list[float]],
+        top_k: int,
+        document_id: Optional[str] = None,
+        with_vectors: bool = False,
+        ids: Optional[list[int]] = None,
+        ef: Optional[int] = None,
+    ) -> list[list[dict]]:
+        """
+        Top-k for several queries with one matrix-matrix product.
+        """
+        return self._search_many(query_embeddings, top_k, document_id, with_vectors, ids)
+
+    def _search_many(self, query_embeddings, top_k, document_id, with_vectors, ids=None):
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+
+        with self._lock:
+            size = self._size
+            vectors, live_ids, codes = self._vectors[:size], self._ids, self._doc_codes
+            scales = self._scales[:size] if self._scales is not None else None
+            texts, documents = self._texts, self._documents
+
+            rows = None
+            if document_id is not None or ids is not None:
+                mask = np.ones(size, dtype=bool)
+                if document_id is not None:
+                    mask &= self._document_mask(document_id)
+                if ids is not None:
+                    mask &= np.isin(live_ids[:size], ids)
+                rows = np.flatnonzero(mask)
+                vectors = vectors[rows]
+                if scales is not None:
+                    scales = scales[rows]
+
+        if not len(vectors) or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        all_scores = quantized_scores(queries, vectors, scales)
+        k = min(top_k, vectors.shape[0])
+
+        results = []
+        for scores in all_scores:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches = []
+            for i in top:
+                row = int(rows[i]) if rows is not None else int(i)
+                doc_id, doc_name = documents[codes[row]]
+                match = {
+                    "id": int(live_ids[row]),
+                    "text": texts[row],
+                    "score": float(scores[i]),
+                    "document": doc_name,
+                    "document_id": doc_id,
+                }
+                if with_vectors:
+                    match["embedding"] = dequantize(
+                        vectors[i:i + 1], scales[i:i + 1] if scales is not None else None
+                    )[0].tolist()
+                matches.append(match)
+            results.append(matches)
+
+        return results
+
+
+# -------------------------------------------------
+# Process-wide shared store
+# -------------------------------------------------
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_local_store() -> LocalVectorStore:
+    global _shared_store
+    if _shared_store is None:
+        with _shared_lock:
+            if _shared_store is None:
+                _shared_store = LocalVectorStore(
+                    settings.LOCAL_STORE_PATH,
+                    dim=settings.EMBEDDING_DIM,
+                    precision=settings.VECTOR_PRECISION,
+                )
+    return _shared_store
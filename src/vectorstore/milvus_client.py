@@ -1,18 +1,98 @@
+import random
+import threading
+import time
+
+import grpc
+import numpy as np
 from pymilvus import (
     connections,
     FieldSchema,
     CollectionSchema,
     DataType,
     Collection,
+    MilvusException,
+    Partition,
     utility,
 )
 
 from src.app.config import settings
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.vectorstore.hnsw import load_hnsw_params
+from src.vectorstore.quantized import check_precision, quantize
+
+# Stored vector type per VECTOR_PRECISION. FLOAT16/INT8 fields need a
+# Milvus server that supports them (INT8_VECTOR: 2.6+)
+_VECTOR_TYPES = {
+    "float32": DataType.FLOAT_VECTOR,
+    "float16": DataType.FLOAT16_VECTOR,
+    "int8": DataType.INT8_VECTOR,
+}
+
+# Rows written without a partition (everything outside sessions)
+DEFAULT_PARTITION = "_default"
+# Primary keys per delete request
+_DELETE_BATCH = 10000
+# Primary keys per `id in [...]` filter; larger id scopes are split
+_ID_FILTER_BATCH = 4096
+
+
+# -------------------------------------------------
+# Client-side primary keys
+# -------------------------------------------------
+class _KeyAllocator:
+    """
+    Unique int64 primary keys, assigned before insert so a retried
+    insert can upsert the same rows instead of adding them twice.
+
+    Layout (snowflake-style): milliseconds since 2024-01-01 in the high
+    bits, then a random per-process tag (10 bits) and a counter (12 bits).
+    """
+
+    _EPOCH_MS = 1_704_067_200_000
+
+    def __init__(self):
+        self._tag = random.getrandbits(10)
+        self._last_ms = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def take(self, n: int) -> list[int]:
+        keys = []
+        with self._lock:
+            for _ in range(n):
+                now = int(time.time() * 1000) - self._EPOCH_MS
+                if now > self._last_ms:
+                    self._last_ms, self._seq = now, 0
+                elif self._seq == 4095:
+                    # Counter exhausted within one millisecond: borrow the next
+                    self._last_ms, self._seq = self._last_ms + 1, 0
+                else:
+                    self._seq += 1
+                keys.append((self._last_ms << 22) | (self._tag << 12) | self._seq)
+        return keys
+
+
+_keys = _KeyAllocator()
 
 
 class MilvusClient:
     def __init__(self):
+        settings.validate("milvus")
         self.collection_name = settings.MILVUS_COLLECTION
+        self.collection = None
+        # True for collections created before client-side primary keys
+        self.auto_id = False
+        self.precision = check_precision(settings.VECTOR_PRECISION)
+        self.hnsw = load_hnsw_params()
+        # Partitions loaded for search in the current collection
+        self._loaded: set[str] = set()
+        # Partitions known to exist
+        self._partitions: set[str] = set()
+        # False once the server rejects partition-level load/release
+        # (milvus-lite); the whole collection is then loaded instead
+        self._partition_loading = True
+        self._lock = threading.RLock()
         self._connect()
         self._ensure_collection()
 
@@ -30,23 +110,31 @@ class MilvusClient:
     # Create collection if not exists
     # -------------------------------------------------
     def _ensure_collection(self):
+        # A new or re-opened collection must be loaded before searching
+        self._loaded = set()
+        self._partitions = {DEFAULT_PARTITION}
+
         if utility.has_collection(self.collection_name):
             self.collection = Collection(
                 name=self.collection_name,
                 using="default",
             )
+            self._detect_precision()
+            self.auto_id = self.collection.schema.auto_id
             return
 
+        self.precision = check_precision(settings.VECTOR_PRECISION)
+
         fields = [
             FieldSchema(
                 name="id",
                 dtype=DataType.INT64,
                 is_primary=True,
-                auto_id=True,
+                auto_id=False,
             ),
             FieldSchema(
                 name="embedding",
-                dtype=DataType.FLOAT_VECTOR,
+                dtype=_VECTOR_TYPES[self.precision],
                 dim=768,
             ),
             FieldSchema(
@@ -68,7 +156,7 @@ class MilvusClient:
 
         schema = CollectionSchema(
             fields=fields,
-            description="Agentic RAG (overwrite-mode, single document)",
+            description="Agentic RAG document chunks",
         )
 
         self.collection = Collection(
@@ -76,11 +164,15 @@ class MilvusClient:
             schema=schema,
             using="default",
         )
+        self.auto_id = False
 
+        self._create_index(self.hnsw["M"], self.hnsw["efConstruction"])
+
+    def _create_index(self, M: int, efConstruction: int):
         index_params = {
             "index_type": "HNSW",
             "metric_type": "COSINE",
-            "params": {"efConstruction": 64, "M": 8},
+            "params": {"efConstruction": efConstruction, "M": M},
         }
 
         self.collection.create_index(
@@ -88,70 +180,543 @@ class MilvusClient:
             index_params=index_params,
         )
 
+    def index_params(self) -> dict:
+        """
+        Build parameters of the live index (they may predate the config).
+        """
+        for index in self.collection.indexes:
+            if index.field_name == "embedding":
+                return dict(index.params.get("params", index.params))
+        return {}
+
+    def rebuild_index(self, M: int, efConstruction: int):
+        """
+        Drop and rebuild the HNSW index with new build parameters
+        (searches wait until the collection is loaded again).
+        """
+        with self._lock:
+            self.collection.release()
+            self._loaded = set()
+            self.collection.drop_index()
+            self._create_index(M, efConstruction)
+            self.hnsw.update(M=M, efConstruction=efConstruction)
+        logger.info(f"MILVUS INDEX REBUILT | M={M} | efConstruction={efConstruction}")
+
+    def sample_vectors(self, limit: int) -> list[list[float]]:
+        """
+        Up to `limit` stored vectors (in primary key order), for tuning.
+        """
+        def _sample():
+            self._ensure_loaded()
+            iterator = self.collection.query_iterator(
+                batch_size=min(limit, 1000),
+                limit=limit,
+                expr="id >= 0",
+                output_fields=["embedding"],
+                partition_names=[DEFAULT_PARTITION],
+            )
+            vectors = []
+            try:
+                while True:
+                    batch = iterator.next()
+                    if not batch:
+                        break
+                    vectors.extend(self._decode(row["embedding"]) for row in batch)
+            finally:
+                iterator.close()
+            return vectors[:limit]
+
+        return self._with_reconnect(_sample)
+
+    def _detect_precision(self):
+        """
+        Follow the stored field type of an existing collection; the
+        configured precision applies from the next reset_collection().
+        """
+        for field in self.collection.schema.fields:
+            if field.name != "embedding":
+                continue
+            for precision, dtype in _VECTOR_TYPES.items():
+                if field.dtype == dtype and precision != self.precision:
+                    logger.warning(
+                        f"MILVUS PRECISION | configured={self.precision} | stored={precision}"
+                    )
+                    self.precision = precision
+
+    def _encode(self, embeddings) -> list:
+        """
+        Vectors in the stored type. int8 codes use a per-row scale that
+        is not stored; COSINE scores are unaffected by it.
+        """
+        if self.precision == "float32":
+            return list(embeddings)
+        codes, _ = quantize(np.asarray(embeddings, dtype=np.float32), self.precision)
+        return list(codes)
+
+    def _decode(self, vector) -> list[float]:
+        if isinstance(vector, (bytes, bytearray)):
+            dtype = np.float16 if self.precision == "float16" else np.int8
+            vector = np.frombuffer(vector, dtype=dtype)
+        return np.asarray(vector, dtype=np.float32).tolist()
+
+    # -------------------------------------------------
+    # Partitions: load on demand, release when idle
+    # -------------------------------------------------
+    def _ensure_partition(self, partition: str | None):
+        partition = partition or DEFAULT_PARTITION
+        if partition in self._partitions:
+            return
+        with self._lock:
+            if not self.collection.has_partition(partition):
+                self.collection.create_partition(partition)
+            self._partitions.add(partition)
+
+    def _ensure_loaded(self, partition: str | None = None):
+        """
+        Load one partition (default: rows outside sessions) for search.
+        """
+        partition = partition or DEFAULT_PARTITION
+        if partition in self._loaded:
+            return
+        with self._lock:
+            if partition in self._loaded:
+                return
+            self._ensure_partition(partition)
+            if self._partition_loading:
+                try:
+                    self.collection.load(partition_names=[partition])
+                    self._loaded.add(partition)
+                    return
+                except (grpc.RpcError, MilvusException) as exc:
+                    logger.warning(f"MILVUS PARTITION LOAD UNSUPPORTED | error={exc}")
+                    self._partition_loading = False
+            # Loads every partition, including ones created later
+            self.collection.load()
+            self._loaded.add(partition)
+
+    def release_partition(self, partition: str) -> bool:
+        """
+        Free a partition's memory; it is reloaded on its next search.
+        Returns False when the server only supports collection-level load.
+        """
+        with self._lock:
+            if not self._partition_loading or partition not in self._loaded:
+                return False
+            Partition(self.collection, partition).release()
+            self._loaded.discard(partition)
+        logger.info(f"MILVUS PARTITION RELEASED | partition={partition}")
+        return True
+
+    def drop_partition(self, partition: str):
+        """
+        Delete a partition and all of its rows.
+        """
+        with self._lock:
+            if not self.collection.has_partition(partition):
+                self._partitions.discard(partition)
+                return
+            if partition in self._loaded and self._partition_loading:
+                Partition(self.collection, partition).release()
+            self._loaded.discard(partition)
+            self.collection.drop_partition(partition)
+            self._partitions.discard(partition)
+
+    # -------------------------------------------------
+    # Reconnect + retry once on failure
+    # -------------------------------------------------
+    def _reconnect(self):
+        with self._lock:
+            try:
+                connections.disconnect("default")
+            except MilvusException:
+                pass
+            self._connect()
+            self._ensure_collection()
+
+    def _with_reconnect(self, operation):
+        try:
+            return operation()
+        except MilvusException as exc:
+            logger.warning(f"MILVUS RECONNECT | error={exc}")
+            self._reconnect()
+            return operation()
+
     # -------------------------------------------------
     # 🔥 OVERWRITE MODE: reset collection
     # -------------------------------------------------
     def reset_collection(self):
         """
         Drop old document data and recreate collection.
+        Session partitions are kept: while any exist, only the default
+        partition is emptied.
         """
-        if utility.has_collection(self.collection_name):
-            utility.drop_collection(self.collection_name)
+        with self._lock:
+            sessions = [
+                p.name for p in self.collection.partitions if p.name != DEFAULT_PARTITION
+            ]
+            if sessions:
+                ids = self._query_ids("id >= 0", DEFAULT_PARTITION)
+                # By primary key: milvus-lite applies expression deletes
+                # to every partition, whatever partition_name says
+                self.delete_ids(ids)
+                logger.info(
+                    f"MILVUS DEFAULT PARTITION RESET | rows={len(ids)} | sessions={len(sessions)}"
+                )
+                return
 
-        self._ensure_collection()
+            if utility.has_collection(self.collection_name):
+                utility.drop_collection(self.collection_name)
+
+            self._ensure_collection()
+
+    def _query_ids(self, expr: str, partition: str) -> list[int]:
+        """
+        Every primary key matching `expr`, paged through a query
+        iterator (a plain query is capped at 16384 rows).
+        """
+        self._ensure_loaded(partition)
+        iterator = self.collection.query_iterator(
+            batch_size=_DELETE_BATCH,
+            expr=expr,
+            output_fields=["id"],
+            partition_names=[partition],
+        )
+        ids = []
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                ids.extend(row["id"] for row in batch)
+        finally:
+            iterator.close()
+        return ids
 
     # -------------------------------------------------
     # Insert new document
     # -------------------------------------------------
+    @metrics.timed("vector_insert", backend="milvus")
     def insert(
         self,
         embeddings: list[list[float]],
         texts: list[str],
         document_id: str,
         document_name: str,
+        flush: bool = True,
+        partition: str | None = None,
     ):
+        """
+        Insert one batch of chunks and return their primary keys.
+        Streaming callers pass flush=False and call `flush()` once after
+        the last batch.
+
+        Keys are assigned here, so the retry after a reconnect upserts
+        them: a first attempt that reached the server before failing
+        does not leave the batch stored twice.
+        """
         if len(embeddings) != len(texts):
             raise ValueError("Embeddings and texts length mismatch")
 
         n = len(texts)
+        columns = [
+            self._encode(embeddings),
+            texts,
+            [document_id] * n,
+            [document_name] * n,
+        ]
+        keys = _keys.take(n)
+        state = {"sent": False, "written": False}
 
-        self.collection.insert(
-            [
-                embeddings,
-                texts,
-                [document_id] * n,
-                [document_name] * n,
-            ]
+        def _insert():
+            self._ensure_partition(partition)
+            target = partition or DEFAULT_PARTITION
+            if not state["written"]:
+                if not self.auto_id:
+                    write = self.collection.upsert if state["sent"] else self.collection.insert
+                    state["sent"] = True
+                    write([keys, *columns], partition_name=target)
+                elif state["sent"]:
+                    # Server-assigned keys: a replay could store the batch twice
+                    raise MilvusException(
+                        message="insert not retried on an auto_id collection; "
+                        "reset the collection to switch to client-side keys"
+                    )
+                else:
+                    state["sent"] = True
+                    result = self.collection.insert(columns, partition_name=target)
+                    keys[:] = result.primary_keys
+                state["written"] = True
+            if flush:
+                self.collection.flush()
+            return list(keys)
+
+        return self._with_reconnect(_insert)
+
+    def flush(self):
+        self._with_reconnect(lambda: self.collection.flush())
+
+    # -------------------------------------------------
+    # Incremental mode: per-document maintenance
+    # -------------------------------------------------
+    def chunk_ids(self, document_id: str, partition: str | None = None) -> list[int]:
+        """
+        Primary keys of all chunks stored for `document_id`.
+        """
+        return self._with_reconnect(
+            lambda: self._query_ids(
+                _document_filter(document_id), partition or DEFAULT_PARTITION
+            )
         )
 
-        self.collection.flush()
+    def fetch(
+        self, ids: list[int], with_vectors: bool = False, partition: str | None = None
+    ) -> list[dict]:
+        """
+        Look up chunks by primary key (used for lexical-only hits).
+        """
+        if not ids:
+            return []
+
+        fields = ["id", "text", "document_id", "document_name"]
+        if with_vectors:
+            fields.append("embedding")
+
+        ids = [int(i) for i in ids]
+
+        def _query(batch):
+            self._ensure_loaded(partition)
+            return self.collection.query(
+                expr=f"id in {batch}",
+                output_fields=fields,
+                partition_names=[partition or DEFAULT_PARTITION],
+            )
+
+        found = []
+        for start in range(0, len(ids), _ID_FILTER_BATCH):
+            batch = ids[start:start + _ID_FILTER_BATCH]
+            found.extend(self._with_reconnect(lambda: _query(batch)))
+
+        rows = []
+        for row in found:
+            match = {
+                "id": row["id"],
+                "text": row["text"],
+                "document": row["document_name"],
+                "document_id": row["document_id"],
+            }
+            if with_vectors:
+                match["embedding"] = self._decode(row["embedding"])
+            rows.append(match)
+        return rows
+
+    def delete_ids(self, ids: list[int], partition: str | None = None):
+        ids = [int(i) for i in ids]
+        for start in range(0, len(ids), _DELETE_BATCH):
+            batch = ids[start:start + _DELETE_BATCH]
+            self._with_reconnect(
+                lambda: self.collection.delete(
+                    expr=f"id in {batch}",
+                    partition_name=partition or DEFAULT_PARTITION,
+                )
+            )
+
+    def delete_document(self, document_id: str, partition: str | None = None) -> int:
+        """
+        Remove every chunk of one document. Returns the number of rows.
+        """
+        ids = self.chunk_ids(document_id, partition)
+        self.delete_ids(ids, partition)
+        return len(ids)
 
     # -------------------------------------------------
-    # Search (no filtering needed in overwrite mode)
+    # Search (optionally scoped to one document)
     # -------------------------------------------------
+    @metrics.timed("vector_search", backend="milvus")
     def search(
         self,
         query_embedding: list[float],
         top_k: int,
+        document_id: str | None = None,
+        with_vectors: bool = False,
+        ids: list[int] | None = None,
+        ef: int | None = None,
+        partition: str | None = None,
     ):
-        self.collection.load()
-
-        results = self.collection.search(
-            data=[query_embedding],
-            anns_field="embedding",
-            param={"metric_type": "COSINE", "params": {"ef": 64}},
-            limit=top_k,
-            output_fields=["text", "document_name"],
+        """
+        `ids` restricts the search to those primary keys; `ef` overrides
+        the configured HNSW search beam for this query; `partition`
+        selects a session's partition instead of the default one.
+        """
+        return self._search_many(
+            [query_embedding], top_k, document_id, with_vectors, ids, ef, partition
+        )[0]
+
+    @metrics.timed("vector_search_batch", backend="milvus")
+    def search_batch(
+        self,
+        query_embeddings: list[list[float]],
+        top_k: int,
+        document_id: str | None = None,
+        with_vectors: bool = False,
+        ids: list[int] | None = None,
+        ef: int | None = None,
+        partition: str | None = None,
+    ) -> list[list[dict]]:
+        """
+        Top-k for several queries in one multi-vector search request.
+        """
+        if not query_embeddings:
+            return []
+        return self._search_many(
+            query_embeddings, top_k, document_id, with_vectors, ids, ef, partition
         )
 
-        matches = []
-        for hit in results[0]:
-            matches.append(
-                {
-                    "text": hit.entity.get("text"),
-                    "score": hit.score,
-                    "document": hit.entity.get("document_name"),
-                }
+    def _search_many(
+        self,
+        query_embeddings,
+        top_k,
+        document_id,
+        with_vectors,
+        ids=None,
+        ef=None,
+        partition=None,
+    ):
+        base = [_document_filter(document_id)] if document_id else []
+        if ids is None:
+            scopes = [base]
+        else:
+            # Bounded filters: a large id scope is searched slice by slice
+            ids = [int(i) for i in ids]
+            scopes = [
+                base + [f"id in {ids[start:start + _ID_FILTER_BATCH]}"]
+                for start in range(0, len(ids), _ID_FILTER_BATCH)
+            ]
+
+        fields = ["text", "document_id", "document_name"]
+        if with_vectors:
+            fields.append("embedding")
+
+        # HNSW needs ef >= limit
+        search_ef = max(ef or self.hnsw["ef"], top_k)
+
+        def _search(filters):
+            self._ensure_loaded(partition)
+            return self.collection.search(
+                data=self._encode(query_embeddings),
+                anns_field="embedding",
+                param={"metric_type": "COSINE", "params": {"ef": search_ef}},
+                limit=top_k,
+                expr=" and ".join(filters) or None,
+                output_fields=fields,
+                partition_names=[partition or DEFAULT_PARTITION],
             )
 
-        return matches
+        batches = [[] for _ in query_embeddings]
+        for filters in scopes:
+            results = self._with_reconnect(lambda: _search(filters))
+            for matches, hits in zip(batches, results):
+                matches.extend(self._match(hit, with_vectors) for hit in hits)
+
+        if len(scopes) > 1:
+            batches = [
+                sorted(matches, key=lambda m: m["score"], reverse=True)[:top_k]
+                for matches in batches
+            ]
+        return batches
+
+    def _match(self, hit, with_vectors: bool) -> dict:
+        match = {
+            "id": hit.id,
+            "text": hit.entity.get("text"),
+            "score": hit.score,
+            "document": hit.entity.get("document_name"),
+            "document_id": hit.entity.get("document_id"),
+        }
+        if with_vectors:
+            match["embedding"] = self._decode(hit.entity.get("embedding"))
+        return match
+
+
+# -------------------------------------------------
+# One partition seen as a store
+# -------------------------------------------------
+class MilvusPartition:
+    """
+    Store view over one partition of the shared collection; every read
+    and write is scoped to it. Used for per-session indexes.
+    """
+
+    def __init__(self, client: MilvusClient, name: str):
+        self.client = client
+        self.name = name
+
+    @property
+    def precision(self) -> str:
+        return self.client.precision
+
+    def reset_collection(self):
+        self.client.drop_partition(self.name)
+
+    def release(self) -> bool:
+        return self.client.release_partition(self.name)
+
+    def insert(self, embeddings, texts, document_id, document_name, flush=True):
+        return self.client.insert(
+            embeddings=embeddings,
+            texts=texts,
+            document_id=document_id,
+            document_name=document_name,
+            flush=flush,
+            partition=self.name,
+        )
+
+    def flush(self):
+        self.client.flush()
+
+    def chunk_ids(self, document_id: str) -> list[int]:
+        return self.client.chunk_ids(document_id, partition=self.name)
+
+    def fetch(self, ids: list[int], with_vectors: bool = False) -> list[dict]:
+        return self.client.fetch(ids, with_vectors=with_vectors, partition=self.name)
+
+    def delete_ids(self, ids: list[int]):
+        self.client.delete_ids(ids, partition=self.name)
+
+    def delete_document(self, document_id: str) -> int:
+        return self.client.delete_document(document_id, partition=self.name)
+
+    def search(self, query_embedding, top_k, document_id=None, with_vectors=False, ids=None, ef=None):
+        return self.client.search(
+            query_embedding, top_k, document_id, with_vectors, ids, ef, partition=self.name
+        )
+
+    def search_batch(
+        self, query_embeddings, top_k, document_id=None, with_vectors=False, ids=None, ef=None
+    ):
+        return self.client.search_batch(
+            query_embeddings, top_k, document_id, with_vectors, ids, ef, partition=self.name
+        )
+
+
+def _document_filter(document_id: str) -> str:
+    escaped = document_id.replace("\\", "\\\\").replace('"', '\\"')
+    return f'document_id == "{escaped}"'
+
+
+# -------------------------------------------------
+# Process-wide shared client
+# -------------------------------------------------
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_milvus_client() -> MilvusClient:
+    """
+    Return the process-wide MilvusClient, connecting on first use.
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = MilvusClient()
+    return _shared_client
@@ -0,0 +1,357 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils.metrics import metrics
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Rows upcast and scored per block: keeps the float32 copy in cache and
+# never materializes the whole float16/int8 matrix
+_SCORE_BLOCK = 4096
+
+
+# -------------------------------------------------
+# Quantization
+# -------------------------------------------------
+def check_precision(precision: str) -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown vector precision: {precision} (use one of {PRECISIONS})")
+    return precision
+
+
+def bytes_per_vector(precision: str, dim: int) -> int:
+    """
+    Stored bytes per vector (int8 adds one float32 scale per row).
+    """
+    return {"float32": 4 * dim, "float16": 2 * dim, "int8": dim + 4}[check_precision(precision)]
+
+
+def quantize(vectors: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Encode float32 rows as (codes, scales). int8 uses a symmetric
+    per-row scale (max |x| / 127); other precisions have no scales.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if check_precision(precision) == "float32":
+        return vectors, None
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.empty(0)
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    vectors = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        vectors = vectors * np.asarray(scales, dtype=np.float32)[:, None]
+    return vectors
+
+
+def quantized_scores(
+    queries: np.ndarray,
+    codes: np.ndarray,
+    scales: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    `queries @ dequantize(codes, scales).T`, computed block by block.
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+    if codes.dtype == np.float32:
+        return queries @ codes.T
+
+    out = np.empty((len(queries), len(codes)), dtype=np.float32)
+    for start in range(0, len(codes), _SCORE_BLOCK):
+        block = slice(start, start + _SCORE_BLOCK)
+        out[:, block] = queries @ codes[block].astype(np.float32).T
+    if scales is not None:
+        out *= scales
+    return out
+
+
+# -------------------------------------------------
+# Full-precision side store
+# -------------------------------------------------
+class FullPrecisionVectors:
+    """
+    Disk-backed float32 copies of stored vectors, keyed by row id.
+
+    Vectors are appended to one raw file that is memory-mapped for
+    reads, so only the rows being re-scored are paged in; the sorted
+    id -> file row index (12 bytes per vector) is the only part kept
+    in RAM. Deleted rows are reclaimed when `flush()` finds more dead
+    rows than live ones.
+    """
+
+    def __init__(self, path: str, dim: int = 768):
+        self.path = Path(path)
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._data_file = self.path / "vectors.f32"
+        self._index_file = self.path / "index.npz"
+        self._clear()
+        self._load()
+
+    def _clear(self):
+        self._ids = np.empty(0, dtype=np.int64)   # sorted
+        self._rows = np.empty(0, dtype=np.int32)  # file row of each id
+        self._file_rows = 0
+        self._mmap = None
+
+    def _load(self):
+        if not self._index_file.exists():
+            return
+        with np.load(self._index_file) as data:
+            self._ids = data["ids"]
+            self._rows = data["rows"]
+            self._file_rows = int(data["file_rows"])
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self._file_rows * self.dim * 4
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+            self._data_file.unlink(missing_ok=True)
+            self.flush()
+
+    # -------------------------------------------------
+    # Writes
+    # -------------------------------------------------
+    def add(self, ids: List[int], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(ids) != len(vectors):
+            raise ValueError("Ids and vectors length mismatch")
+        if not len(ids):
+            return
+
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(self._data_file, "ab") as f:
+                f.seek(self._file_rows * self.dim * 4)
+                f.truncate()  # drop rows a crash left past the index
+                f.write(vectors.tobytes())
+            self._mmap = None
+
+            new_ids = np.asarray(ids, dtype=np.int64)
+            new_rows = np.arange(
+                self._file_rows, self._file_rows + len(ids), dtype=np.int32
+            )
+            self._file_rows += len(ids)
+
+            if len(self._ids) and new_ids.min() <= self._ids[-1]:
+                ids_all = np.concatenate([self._ids, new_ids])
+                rows_all = np.concatenate([self._rows, new_rows])
+                order = np.argsort(ids_all, kind="stable")
+                self._ids, self._rows = ids_all[order], rows_all[order]
+            else:
+                # Auto-increment ids arrive in order: plain append
+                order = np.argsort(new_ids, kind="stable")
+                self._ids = np.concatenate([self._ids, new_ids[order]])
+                self._rows = np.concatenate([self._rows, new_rows[order]])
+
+    def remove(self, ids: List[int]):
+        if not ids:
+            return
+        with self._lock:
+            keep = ~np.isin(self._ids, np.asarray(ids, dtype=np.int64))
+            self._ids, self._rows = self._ids[keep], self._rows[keep]
+
+    def flush(self):
+        with self._lock:
+            if self._file_rows > 2 * len(self._ids):
+                self._compact()
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp = self.path / "index.tmp.npz"
+            np.savez(tmp, ids=self._ids, rows=self._rows, file_rows=self._file_rows)
+            os.replace(tmp, self._index_file)
+
+    def _compact(self):
+        vectors = self._read(self._rows) if len(self._rows) else np.empty((0, self.dim))
+        tmp = self.path / "vectors.tmp.f32"
+        tmp.write_bytes(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        os.replace(tmp, self._data_file)
+        self._rows = np.arange(len(self._ids), dtype=np.int32)
+        self._file_rows = len(self._ids)
+        self._mmap = None
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def _read(self, rows: np.ndarray) -> np.ndarray:
+        if self._mmap is None:
+            self._mmap = np.memmap(
+                self._data_file, dtype=np.float32, mode="r",
+                shape=(self._file_rows, self.dim),
+            )
+        return np.asarray(self._mmap[rows])
+
+    def get(self, ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (found mask, vectors of the found ids in order).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            pos = np.searchsorted(self._ids, ids)
+            pos = np.minimum(pos, max(len(self._ids) - 1, 0))
+            found = (
+                self._ids[pos] == ids if len(self._ids) else np.zeros(len(ids), dtype=bool)
+            )
+            if not found.any():
+                return found, np.empty((0, self.dim), dtype=np.float32)
+            return found, self._read(self._rows[pos[found]])
+
+
+# -------------------------------------------------
+# Re-scoring wrapper
+# -------------------------------------------------
+class RescoringStore:
+    """
+    Wraps a store that indexes compact (float16 / int8) vectors: each
+    search fetches `candidates * top_k` approximate hits, re-scores them
+    exactly against the full-precision side store and keeps the top_k.
+    Vectors returned with `with_vectors=True` are the full-precision ones.
+
+    Rows without a side-store copy (stored before quantization was
+    enabled) keep their approximate score.
+    """
+
+    def __init__(self, store, full_vectors: FullPrecisionVectors, candidates: int = 4):
+        self.store = store
+        self.full_vectors = full_vectors
+        self.candidates = max(1, candidates)
+
+    # -------------------------------------------------
+    # Writes
+    # -------------------------------------------------
+    def reset_collection(self):
+        self.store.reset_collection()
+        self.full_vectors.clear()
+
+    def insert(self, embeddings, texts, document_id, document_name, flush=True):
+        if not len(embeddings):
+            return []
+        ids = self.store.insert(
+            embeddings=embeddings,
+            texts=texts,
+            document_id=document_id,
+            document_name=document_name,
+            flush=flush,
+        )
+        self.full_vectors.add(ids, normalize_rows(np.asarray(embeddings, dtype=np.float32)))
+        if flush:
+            self.full_vectors.flush()
+        return ids
+
+    def flush(self):
+        self.store.flush()
+        self.full_vectors.flush()
+
+    def chunk_ids(self, document_id: str) -> List[int]:
+        return self.store.chunk_ids(document_id)
+
+    def delete_ids(self, ids: List[int]):
+        self.store.delete_ids(ids)
+        self.full_vectors.remove(ids)
+        self.full_vectors.flush()
+
+    def delete_document(self, document_id: str) -> int:
+        ids = self.chunk_ids(document_id)
+        self.delete_ids(ids)
+        return len(ids)
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    def fetch(self, ids: List[int], with_vectors: bool = False) -> List[Dict]:
+        hits = self.store.fetch(ids, with_vectors=False)
+        if with_vectors:
+            self._attach_vectors(hits)
+        return hits
+
+    def _attach_vectors(self, hits: List[Dict]):
+        found, vectors = self.full_vectors.get([h["id"] for h in hits])
+        full = iter(vectors)
+        for hit, ok in zip(hits, found):
+            if ok:
+                hit["embedding"] = next(full).tolist()
+        missing = [h["id"] for h, ok in zip(hits, found) if not ok]
+        if missing:
+            # Legacy rows: fall back to the compact copy
+            stored = {h["id"]: h["embedding"] for h in self.store.fetch(missing, with_vectors=True)}
+            for hit in hits:
+                if "embedding" not in hit and hit["id"] in stored:
+                    hit["embedding"] = stored[hit["id"]]
+
+    @metrics.timed("vector_rescore")
+    def _rescore(self, query_embedding, hits: List[Dict], top_k: int, with_vectors: bool):
+        if not hits:
+            return hits
+        query = normalize_rows(np.asarray([query_embedding], dtype=np.float32))[0]
+        found, vectors = self.full_vectors.get([h["id"] for h in hits])
+        exact = iter((vectors @ query).tolist())
+        for hit, ok in zip(hits, found):
+            if ok:
+                hit["score"] = next(exact)
+        hits = sorted(hits, key=lambda h: -h["score"])[:top_k]
+        if with_vectors:
+            self._attach_vectors(hits)
+        return hits
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        document_id: Optional[str] = None,
+        with_vectors: bool = False,
+        ids: Optional[List[int]] = None,
+        ef: Optional[int] = None,
+    ):
+        hits = self.store.search(
+            query_embedding,
+            top_k * self.candidates,
+            document_id=document_id,
+            ids=ids,
+            ef=ef,
+        )
+        return self._rescore(query_embedding, hits, top_k, with_vectors)
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        top_k: int,
+        document_id: Optional[str] = None,
+        with_vectors: bool = False,
+        ids: Optional[List[int]] = None,
+        ef: Optional[int] = None,
+    ) -> List[List[Dict]]:
+        batches = self.store.search_batch(
+            query_embeddings,
+            top_k * self.candidates,
+            document_id=document_id,
+            ids=ids,
+            ef=ef,
+        )
+        return [
+            self._rescore(query, hits, top_k, with_vectors)
+            for query, hits in zip(query_embeddings, batches)
+        ]
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Unit-length rows; zero rows are left as they are.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
@@ -0,0 +1,300 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from src.app.config import settings
+from src.utils.logger import logger
+
+# Session ids become partition and directory names; accept only our own
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class SessionNotFound(KeyError):
+    """Unknown, deleted or expired session id."""
+
+
+class SessionBusy(Exception):
+    """The session is in use (ingesting or searching)."""
+
+
+class Session:
+    """
+    One tenant: its own documents in its own partition (Milvus) or
+    directory (local store), plus its own BM25 / dedup / rescoring
+    side indexes. The store stack is built on first use and dropped
+    again when the session goes idle.
+    """
+
+    def __init__(self, session_id: str, created_at: float, last_used: float):
+        self.id = session_id
+        self.created_at = created_at
+        self.last_used = last_used
+        self.store = None
+        self.active = 0
+        self.lock = threading.RLock()
+
+    @property
+    def partition(self) -> str:
+        return f"s_{self.id}"
+
+    @property
+    def loaded(self) -> bool:
+        return self.store is not None
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.id,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+            "loaded": self.loaded,
+            "active": self.active,
+        }
+
+
+class SessionManager:
+    """
+    Session registry for multi-tenant serving.
+
+    Sessions idle for `idle_seconds` are released: their stores are
+    flushed and dropped, and their Milvus partition is released from
+    memory; the next request loads them again. Sessions unused for
+    `ttl_seconds` are deleted with their data. Ids and timestamps are
+    kept in `state_dir/sessions.json` so sessions survive a restart.
+    """
+
+    def __init__(
+        self,
+        state_dir: str,
+        idle_seconds: float = 300,
+        ttl_seconds: float = 86400,
+        sweep_seconds: float = 30,
+    ):
+        self.state_dir = Path(state_dir)
+        self.idle_seconds = idle_seconds
+        self.ttl_seconds = ttl_seconds
+        self.sweep_seconds = sweep_seconds
+        self._state_file = self.state_dir / "sessions.json"
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self.releases = 0
+        self.loads = 0
+
+        if self._state_file.exists():
+            state = json.loads(self._state_file.read_text(encoding="utf-8"))
+            for session_id, meta in state.items():
+                self._sessions[session_id] = Session(
+                    session_id, meta["created_at"], meta["last_used"]
+                )
+
+    # -------------------------------------------------
+    # Registry
+    # -------------------------------------------------
+    def _save(self):
+        with self._lock:
+            state = {
+                s.id: {"created_at": s.created_at, "last_used": s.last_used}
+                for s in self._sessions.values()
+            }
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._state_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, self._state_file)
+
+    def create(self) -> Session:
+        self._start_reaper()
+        now = time.time()
+        session = Session(uuid.uuid4().hex, now, now)
+        with self._lock:
+            self._sessions[session.id] = session
+        self._save()
+        logger.info(f"SESSION CREATED | id={session.id}")
+        return session
+
+    def _lookup(self, session_id: str) -> Session:
+        if not isinstance(session_id, str) or not _SESSION_ID.fullmatch(session_id):
+            raise SessionNotFound(session_id)
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFound(session_id)
+        return session
+
+    def get(self, session_id: str) -> Session:
+        self._start_reaper()
+        session = self._lookup(session_id)
+        if self._expired(session):
+            self.expire()
+            raise SessionNotFound(session_id)
+        return session
+
+    def list(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    # -------------------------------------------------
+    # Stores
+    # -------------------------------------------------
+    def store(self, session_id: str):
+        """
+        The session's store stack, built (and loaded) on demand.
+        """
+        session = self.get(session_id)
+        with session.lock:
+            session.last_used = time.time()
+            if session.store is None:
+                from src.vectorstore.store import build_store
+
+                session.store = build_store(session.id)
+                self.loads += 1
+                logger.info(f"SESSION LOADED | id={session.id}")
+            return session.store
+
+    @contextmanager
+    def use(self, session_id: str) -> Iterator:
+        """
+        Hold the session's store for one request; it is not released
+        or deleted while in use.
+        """
+        session = self.get(session_id)
+        with session.lock:
+            store = self.store(session_id)
+            session.active += 1
+        try:
+            yield store
+        finally:
+            with session.lock:
+                session.active -= 1
+                session.last_used = time.time()
+
+    def release(self, session_id: str) -> bool:
+        """
+        Flush and drop the session's in-memory stores and release its
+        Milvus partition. Returns False if it was not loaded or is busy.
+        """
+        session = self._lookup(session_id)
+        with session.lock:
+            if session.store is None or session.active:
+                return False
+            store = session.store
+            store.flush()
+            # Walk the wrapper stack down to the base store
+            while hasattr(store, "store"):
+                store = store.store
+            if hasattr(store, "release"):
+                store.release()
+            session.store = None
+            self.releases += 1
+        logger.info(f"SESSION RELEASED | id={session.id}")
+        return True
+
+    def release_idle(self) -> int:
+        cutoff = time.time() - self.idle_seconds
+        released = 0
+        for session in self.list():
+            if session.loaded and not session.active and session.last_used < cutoff:
+                try:
+                    released += self.release(session.id)
+                except SessionNotFound:
+                    pass
+        if released:
+            self._save()
+        return released
+
+    # -------------------------------------------------
+    # Deletion
+    # -------------------------------------------------
+    def delete(self, session_id: str):
+        """
+        Drop the session with its partition, side indexes and cached answers.
+        """
+        session = self._lookup(session_id)
+        with session.lock:
+            if session.active:
+                raise SessionBusy(session_id)
+            from src.vectorstore.store import build_store, session_dir
+
+            store = session.store or build_store(session.id)
+            store.reset_collection()
+            session.store = None
+            with self._lock:
+                self._sessions.pop(session.id, None)
+        shutil.rmtree(session_dir(session.id), ignore_errors=True)
+        self._save()
+
+        from src.Query.semantic_cache import answer_cache
+
+        if answer_cache is not None:
+            answer_cache.invalidate(session=session.id)
+        logger.info(f"SESSION DELETED | id={session.id}")
+
+    def _expired(self, session: Session) -> bool:
+        return (
+            bool(self.ttl_seconds)
+            and not session.active
+            and session.last_used < time.time() - self.ttl_seconds
+        )
+
+    def expire(self) -> int:
+        """
+        Delete sessions unused for longer than `ttl_seconds`.
+        """
+        expired = 0
+        for session in self.list():
+            if not self._expired(session):
+                continue
+            try:
+                self.delete(session.id)
+                expired += 1
+                logger.info(f"SESSION EXPIRED | id={session.id}")
+            except (SessionNotFound, SessionBusy):
+                pass
+        return expired
+
+    # -------------------------------------------------
+    # Background reaper
+    # -------------------------------------------------
+    def _start_reaper(self):
+        if self._reaper is not None or not self.sweep_seconds:
+            return
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._reap, name="session-reaper", daemon=True
+                )
+                self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(self.sweep_seconds)
+            try:
+                self.release_idle()
+                self.expire()
+            except Exception:
+                logger.exception("SESSION SWEEP FAILED")
+
+    def stats(self) -> Dict:
+        sessions = self.list()
+        return {
+            "sessions": len(sessions),
+            "loaded": sum(s.loaded for s in sessions),
+            "active": sum(s.active for s in sessions),
+            "loads": self.loads,
+            "releases": self.releases,
+        }
+
+
+# Process-wide session registry
+sessions = SessionManager(
+    settings.SESSION_INDEX_DIR,
+    idle_seconds=settings.SESSION_IDLE_SECONDS,
+    ttl_seconds=settings.SESSION_TTL,
+    sweep_seconds=settings.SESSION_SWEEP_SECONDS,
+)
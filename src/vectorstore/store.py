@@ -0,0 +1,136 @@
+import threading
+from contextlib import nullcontext
+
+from src.app.config import settings
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def session_dir(session_id: str) -> str:
+    return f"{settings.SESSION_INDEX_DIR}/{session_id}"
+
+
+def _base_store(session_id=None):
+    if settings.VECTOR_DB == "local":
+        from src.vectorstore.local_store import LocalVectorStore, get_local_store
+
+        if session_id:
+            return LocalVectorStore(
+                f"{session_dir(session_id)}/local",
+                dim=settings.EMBEDDING_DIM,
+                precision=settings.VECTOR_PRECISION,
+            )
+        return get_local_store()
+
+    from src.vectorstore.milvus_client import MilvusPartition, get_milvus_client
+
+    if session_id:
+        # One partition per session in the shared collection
+        return MilvusPartition(get_milvus_client(), f"s_{session_id}")
+    return get_milvus_client()
+
+
+def _bm25_path(session_id=None) -> str:
+    # Persist the lexical index next to the collection it mirrors
+    if session_id:
+        return f"{session_dir(session_id)}/bm25.npz"
+    if settings.BM25_INDEX_PATH:
+        return settings.BM25_INDEX_PATH
+    if settings.VECTOR_DB == "local":
+        return f"{settings.LOCAL_STORE_PATH}/bm25.npz"
+    return f"data/index/{settings.MILVUS_COLLECTION}.bm25.npz"
+
+
+def _chunk_map_path(session_id=None) -> str:
+    if session_id:
+        return f"{session_dir(session_id)}/chunk_map.npz"
+    if settings.CHUNK_MAP_PATH:
+        return settings.CHUNK_MAP_PATH
+    if settings.VECTOR_DB == "local":
+        return f"{settings.LOCAL_STORE_PATH}/chunk_map.npz"
+    return f"data/index/{settings.MILVUS_COLLECTION}.chunks.npz"
+
+
+def _full_vectors_path(session_id=None) -> str:
+    if session_id:
+        return f"{session_dir(session_id)}/full"
+    if settings.FULL_VECTORS_PATH:
+        return settings.FULL_VECTORS_PATH
+    if settings.VECTOR_DB == "local":
+        return f"{settings.LOCAL_STORE_PATH}/full"
+    return f"data/index/{settings.MILVUS_COLLECTION}.full"
+
+
+def build_store(session_id=None):
+    """
+    Build the wrapped store stack; with `session_id`, every layer keeps
+    its data apart from the shared index (see `src.vectorstore.sessions`).
+    """
+    store = _base_store(session_id)
+
+    # Stored or configured compact vectors (they differ until the next reset)
+    quantized = {store.precision, settings.VECTOR_PRECISION} != {"float32"}
+    if quantized and settings.RESCORE_CANDIDATES > 0:
+        from src.vectorstore.quantized import FullPrecisionVectors, RescoringStore
+
+        store = RescoringStore(
+            store,
+            FullPrecisionVectors(_full_vectors_path(session_id), dim=settings.EMBEDDING_DIM),
+            candidates=settings.RESCORE_CANDIDATES,
+        )
+
+    if settings.HYBRID_SEARCH:
+        from src.vectorstore.bm25 import BM25Index
+        from src.vectorstore.hybrid import HybridStore
+
+        store = HybridStore(
+            store,
+            BM25Index(_bm25_path(session_id)),
+            rrf_k=settings.RRF_K,
+            candidates=settings.HYBRID_CANDIDATES,
+        )
+
+    if settings.CHUNK_DEDUP:
+        from src.vectorstore.dedup import ChunkMap, DedupStore
+
+        store = DedupStore(store, ChunkMap(_chunk_map_path(session_id)))
+
+    return store
+
+
+def get_vector_store(session_id=None):
+    """
+    Return the process-wide vector store selected by VECTOR_DB:
+    "milvus" (remote Milvus) or "local" (in-process NumPy index).
+    With HYBRID_SEARCH on, it is wrapped with a BM25 index and results
+    are fused with reciprocal rank fusion. With VECTOR_PRECISION float16
+    or int8, compact vectors are searched and the best candidates are
+    re-scored at full precision. With CHUNK_DEDUP on, identical
+    chunks are stored once and shared by every document containing them.
+    All variants expose insert / search / reset_collection / delete_document.
+    With `session_id`, the store of that session is returned instead.
+    """
+    if session_id:
+        from src.vectorstore.sessions import sessions
+
+        return sessions.store(session_id)
+
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_store()
+    return _store
+
+
+def use_vector_store(session_id=None):
+    """
+    Context manager yielding `get_vector_store(session_id)`; a session's
+    store is held in use, so it is not released or deleted meanwhile.
+    """
+    if session_id:
+        from src.vectorstore.sessions import sessions
+
+        return sessions.use(session_id)
+    return nullcontext(get_vector_store())
@@ -0,0 +1,39 @@
+from src.Query.context_packer import pack_context
+from src.ingestion.chunker import estimate_tokens
+
+
+def _hit(row_id, text, embedding, document_id="d"):
+    return {
+        "id": row_id,
+        "text": text,
+        "score": 0.9,
+        "document": "d.txt",
+        "document_id": document_id,
+        "embedding": embedding,
+    }
+
+
+def test_packs_in_relevance_order_within_budget():
+    hits = [
+        _hit(1, "alpha " * 20, [1.0, 0.0, 0.0], "a"),
+        _hit(10, "beta " * 20, [0.0, 1.0, 0.0], "b"),
+    ]
+    packed, report = pack_context([1.0, 0.1, 0.0], hits, max_tokens=100)
+
+    assert [p["document_id"] for p in packed] == ["a", "b"]
+    assert report["tokens"] <= 100
+
+
+def test_top_hit_larger_than_budget_is_truncated():
+    hits = [
+        _hit(1, "first " * 300, [1.0, 0.0, 0.0]),
+        # Neighbour of the top hit: merging makes the passage even larger
+        _hit(2, "second " * 300, [0.9, 0.1, 0.0]),
+        _hit(7, "other " * 300, [0.0, 1.0, 0.0], "e"),
+    ]
+    packed, report = pack_context([1.0, 0.0, 0.0], hits, max_tokens=50)
+
+    assert len(packed) == 1
+    assert packed[0]["text"].startswith("first first")
+    assert 0 < estimate_tokens(packed[0]["text"]) <= 50
+    assert report["tokens"] == estimate_tokens(packed[0]["text"])
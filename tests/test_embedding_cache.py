@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import src.llm.embedding_cache as embedding_cache
+from src.llm.embedding_cache import EmbeddingCache, cache_key
+
+
+def _vectors(texts):
+    return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_repeated_keys_are_counted_once(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    cache.get_or_compute("m", ["a", "bb"], _vectors)
+    # Concurrent misses store the same keys again
+    cache._put_many({cache_key("m", "a"): [9.0, 9.0], cache_key("m", "c"): [1.0, 1.0]})
+
+    assert cache.stats()["entries"] == 3
+    assert cache.get_or_compute("m", ["a"], _vectors) == [[9.0, 9.0]]
+    assert EmbeddingCache(str(tmp_path / "cache.db")).stats()["entries"] == 3
+
+
+def test_eviction_drops_the_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(1, 1000))
+    # Every access gets a distinct, increasing last_used
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: float(next(clock))))
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_entries=10)
+    for i in range(10):
+        cache.get_or_compute("m", [f"text {i}"], _vectors)
+    # "text 0" is the oldest insert but was just used; "text 1" now is the LRU
+    cache.get_or_compute("m", ["text 0"], _vectors)
+
+    cache.get_or_compute("m", ["text 10"], _vectors)
+
+    stats = cache.stats()
+    assert stats["entries"] == 9 and stats["evictions"] == 2
+    computed = []
+
+    def _tracking(texts):
+        computed.extend(texts)
+        return _vectors(texts)
+
+    cache.get_or_compute("m", ["text 0", "text 10", "text 3"], _tracking)
+    assert computed == []
+    cache.get_or_compute("m", ["text 1"], _tracking)
+    cache.get_or_compute("m", ["text 2"], _tracking)
+    assert computed == ["text 1", "text 2"]
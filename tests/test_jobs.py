@@ -0,0 +1,37 @@
+import threading
+
+import src.ingestion.jobs as jobs
+from src.ingestion.jobs import IngestJobManager
+
+
+def test_preocr_runs_as_the_first_job_stage(monkeypatch, tmp_path):
+    analyzing = threading.Event()
+    release = threading.Event()
+    stages = []
+
+    def analyze(file_path):
+        analyzing.set()
+        release.wait(5)
+        return {"needs_ocr": True, "reason_code": "SCANNED_PAGES", "ocr_pages": [2]}
+
+    def ingest(file_path, progress, **kwargs):
+        stages.append("ingest")
+        progress("parsed", 1)
+        return {"chunks": 1}
+
+    monkeypatch.setattr(jobs, "analyze_document", analyze)
+    monkeypatch.setattr(jobs, "ingest_document", ingest)
+    manager = IngestJobManager(workers=1)
+
+    # Submitting returns before the document is profiled
+    job = manager.submit(str(tmp_path / "a.pdf"), "a", "a.pdf")
+    assert analyzing.wait(5)
+    assert job.to_dict()["stage"] == "analyzing"
+    assert job.to_dict()["preocr"] is None and stages == []
+
+    release.set()
+    manager._pool.shutdown(wait=True)
+    state = job.to_dict()
+    assert state["status"] == "completed"
+    assert state["preocr"] == {"needs_ocr": True, "reason_code": "SCANNED_PAGES", "ocr_pages": [2]}
+    assert stages == ["ingest"]
@@ -0,0 +1,183 @@
+import asyncio
+import time
+
+import pytest
+
+from src.llm.llm_client import FakeLLMProvider, LLMDeadlineExceeded, LLMRouter
+
+PROMPT = "Context:\nalpha beta gamma\n\nQuestion: what?"
+ANSWER = "alpha beta gamma"
+
+
+def _router(*providers, **kwargs):
+    kwargs.setdefault("backoff_seconds", 0.01)
+    kwargs.setdefault("hedge", False)
+    return LLMRouter(list(providers), **kwargs)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _collect(stream):
+    return [token async for token in stream]
+
+
+class _Failing(FakeLLMProvider):
+    """Raises `exc` on every call."""
+
+    def __init__(self, name, exc):
+        super().__init__(name)
+        self.exc = exc
+
+    async def complete(self, prompt, temperature, max_tokens):
+        self.calls += 1
+        raise self.exc
+
+
+def test_answers_from_primary():
+    primary, fallback = FakeLLMProvider("a"), FakeLLMProvider("b")
+    router = _router(primary, fallback)
+
+    assert _run(router.generate(PROMPT)) == ANSWER
+    assert (primary.calls, fallback.calls) == (1, 0)
+
+
+def test_transient_errors_are_retried_then_fail_over():
+    primary = FakeLLMProvider("a", failure_rate=1.0)
+    fallback = FakeLLMProvider("b")
+    router = _router(primary, fallback, max_retries=2)
+
+    assert _run(router.generate(PROMPT)) == ANSWER
+    assert primary.calls == 3
+    assert router.events["retry"] == 2
+    assert router.events["failover"] == 1
+
+
+def test_permanent_errors_fail_over_without_retry():
+    primary = _Failing("a", ValueError("bad request"))
+    fallback = FakeLLMProvider("b")
+    router = _router(primary, fallback, max_retries=2)
+
+    assert _run(router.generate(PROMPT)) == ANSWER
+    assert primary.calls == 1
+    assert router.events["retry"] == 0
+
+
+def test_last_error_is_raised_when_every_provider_fails():
+    router = _router(_Failing("a", ValueError("a down")), _Failing("b", ValueError("b down")))
+
+    with pytest.raises(ValueError, match="b down"):
+        _run(router.generate(PROMPT))
+
+
+def test_one_failure_per_call_not_per_retry():
+    primary = FakeLLMProvider("a", failure_rate=1.0)
+    router = _router(primary, FakeLLMProvider("b"), max_retries=2, failure_threshold=3)
+
+    _run(router.generate(PROMPT))
+    health = router.health["a"]
+    assert health.consecutive_failures == 1
+    assert health.available
+
+    _run(router.generate(PROMPT))
+    _run(router.generate(PROMPT))
+    assert not health.available
+
+
+def test_provider_in_cooldown_is_tried_last():
+    primary = FakeLLMProvider("a", failure_rate=1.0)
+    fallback = FakeLLMProvider("b")
+    router = _router(primary, fallback, max_retries=0, failure_threshold=1)
+
+    _run(router.generate(PROMPT))
+    _run(router.generate(PROMPT))
+    assert primary.calls == 1
+    assert fallback.calls == 2
+
+
+def test_slow_attempt_times_out_and_fails_over():
+    primary = FakeLLMProvider("a", latency_seconds=1.0)
+    fallback = FakeLLMProvider("b")
+    router = _router(primary, fallback, attempt_timeout_seconds=0.1)
+
+    start = time.perf_counter()
+    assert _run(router.generate(PROMPT)) == ANSWER
+    assert time.perf_counter() - start < 0.5
+    assert router.events["failover"] == 1
+
+
+def test_deadline_bounds_the_whole_call():
+    router = _router(
+        FakeLLMProvider("a", latency_seconds=5.0),
+        FakeLLMProvider("b", latency_seconds=5.0),
+        hedge=True,
+        hedge_after_seconds=0.05,
+    )
+
+    start = time.perf_counter()
+    with pytest.raises(LLMDeadlineExceeded):
+        _run(router.generate(PROMPT, deadline=0.3))
+    assert time.perf_counter() - start < 1.0
+
+
+def test_hedge_to_fallback_when_primary_is_slow():
+    primary = FakeLLMProvider("a", latency_seconds=1.0)
+    fallback = FakeLLMProvider("b", latency_seconds=0.01)
+    router = _router(primary, fallback, hedge=True, hedge_after_seconds=0.1)
+
+    start = time.perf_counter()
+    assert _run(router.generate(PROMPT)) == ANSWER
+    assert time.perf_counter() - start < 0.5
+    assert router.events["hedge"] == 1
+    assert router.events["hedge_win"] == 1
+    # The cancelled primary attempt is not a failure
+    assert router.health["a"].errors == 0
+
+
+def test_no_hedge_when_primary_is_fast():
+    primary = FakeLLMProvider("a", latency_seconds=0.01)
+    fallback = FakeLLMProvider("b")
+    router = _router(primary, fallback, hedge=True, hedge_after_seconds=0.5)
+
+    assert _run(router.generate(PROMPT)) == ANSWER
+    assert fallback.calls == 0
+    assert router.events["hedge"] == 0
+
+
+def test_hedge_delay_follows_recent_p95():
+    primary = FakeLLMProvider("a", latency_seconds=0.005)
+    router = _router(primary, FakeLLMProvider("b"), hedge=True, hedge_min_seconds=0.0)
+    # Without history, only clearly stuck requests are hedged
+    assert router._hedge_delay(primary, "complete") == router.attempt_timeout_seconds / 2
+
+    async def warm():
+        for _ in range(25):
+            await router.generate(PROMPT)
+
+    _run(warm())
+    assert 0.004 < router._hedge_delay(primary, "complete") < 0.1
+
+
+def test_stream_hedges_before_the_first_token():
+    primary = FakeLLMProvider("a", latency_seconds=1.0)
+    fallback = FakeLLMProvider("b", latency_seconds=0.01)
+    router = _router(primary, fallback, hedge=True, hedge_after_seconds=0.1)
+
+    tokens = _run(_collect(router.stream(PROMPT)))
+    assert "".join(tokens) == ANSWER
+    assert router.events["hedge_win"] == 1
+
+
+def test_stream_deadline_applies_per_token():
+    slow = FakeLLMProvider("a", token_seconds=1.0)
+    router = _router(slow)
+
+    async def consume():
+        tokens = []
+        with pytest.raises(LLMDeadlineExceeded):
+            async for token in router.stream(PROMPT, deadline=0.3):
+                tokens.append(token)
+        return tokens
+
+    assert _run(consume()) == ["alpha"]
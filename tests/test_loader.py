@@ -0,0 +1,15 @@
+from src.ingestion.loader import _iter_table
+
+
+def test_table_keeps_cells_left_of_the_header():
+    # Header starts in column B; row 27 also has a value in column A
+    rows = [["", "name", "email"]]
+    rows += [["", f"n{i}", f"n{i}@x"] for i in range(25)]
+    rows += [["LOST", "b", "b@x"], ["", "c", "c@x"]]
+
+    text = "\n".join(_iter_table("--- TABLE: t.csv ---", rows))
+
+    assert "name | email" in text
+    assert "LOST | b | b@x" in text
+    # Rows aligned with the header keep dropping the empty lead column
+    assert "\nc | c@x" in text
@@ -0,0 +1,46 @@
+import pytest
+
+from src.utils.metrics import MetricsRegistry
+
+
+def _series(text, prefix):
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line.startswith(prefix)
+    }
+
+
+def test_latency_is_exported_as_histogram():
+    registry = MetricsRegistry(window=8, buckets=(0.5, 0.1, 1))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0):
+        registry.observe("rag_stage_duration_seconds", value, stage="embed")
+    text = registry.render()
+
+    assert "# TYPE rag_stage_duration_seconds histogram" in text
+    assert "quantile=" not in text
+    name = "rag_stage_duration_seconds"
+    assert _series(text, name) == {
+        f'{name}_bucket{{stage="embed",le="0.1"}}': 2,
+        f'{name}_bucket{{stage="embed",le="0.5"}}': 3,
+        f'{name}_bucket{{stage="embed",le="1"}}': 4,
+        f'{name}_bucket{{stage="embed",le="+Inf"}}': 5,
+        f'{name}_sum{{stage="embed"}}': pytest.approx(3.15),
+        f'{name}_count{{stage="embed"}}': 5,
+    }
+    # /stats keeps its window quantiles
+    assert registry.snapshot()["embed"]["p50_ms"] == 300.0
+
+
+def test_track_counts_calls_and_errors():
+    registry = MetricsRegistry(buckets=(1,))
+    with registry.track("search", backend="local"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.track("search", backend="local"):
+            raise ValueError
+
+    stats = registry.snapshot()["search{backend=local}"]
+    assert (stats["calls"], stats["errors"], stats["in_flight"]) == (2, 1, 0)
+    text = registry.render()
+    assert 'rag_stage_duration_seconds_bucket{backend="local",stage="search",le="1"} 2' in text
@@ -0,0 +1,256 @@
+import numpy as np
+import pytest
+from pymilvus import DataType, MilvusException
+from pymilvus.client.prepare import Prepare
+from pymilvus.grpc_gen import common_pb2
+from pymilvus.orm.prepare import Prepare as OrmPrepare
+from pymilvus.orm.schema import check_insert_schema
+
+import src.vectorstore.milvus_client as milvus_client
+from src.app.config import settings
+from src.vectorstore.milvus_client import MilvusClient
+
+DIM = 768
+
+# Wire formats of the vector field / query placeholder per field type
+_VECTOR_ATTRS = {
+    DataType.FLOAT_VECTOR: ("float_vector", np.float32, "FloatVector"),
+    DataType.FLOAT16_VECTOR: ("float16_vector", np.float16, "Float16Vector"),
+    DataType.INT8_VECTOR: ("int8_vector", np.int8, "Int8Vector"),
+}
+
+
+class _Hit:
+    def __init__(self, row_id, score, entity):
+        self.id = row_id
+        self.score = score
+        self.entity = entity
+
+
+class _Partition:
+    def __init__(self, name):
+        self.name = name
+
+
+class _FakeCollection:
+    """
+    In-memory stand-in for a Milvus collection (milvus-lite has no
+    FLOAT16/INT8 vector fields). Inserts and searches are encoded with
+    pymilvus's own request builders, so a payload the server would
+    reject fails here too.
+    """
+
+    collections: dict = {}
+
+    def __init__(self, name, schema=None, using="default"):
+        if schema is not None:
+            self.collections[name] = {"schema": schema, "rows": [], "partitions": {"_default"}}
+        self.name = name
+        self.state = self.collections[name]
+
+    @property
+    def schema(self):
+        return self.state["schema"]
+
+    @property
+    def partitions(self):
+        return [_Partition(name) for name in sorted(self.state["partitions"])]
+
+    def _vector_field(self):
+        field = next(f for f in self.schema.fields if f.name == "embedding")
+        return field, _VECTOR_ATTRS[field.dtype]
+
+    def create_index(self, field_name, index_params):
+        pass
+
+    def has_partition(self, name):
+        return name in self.state["partitions"]
+
+    def create_partition(self, name):
+        self.state["partitions"].add(name)
+
+    def load(self, partition_names=None):
+        pass
+
+    def flush(self):
+        pass
+
+    def insert(self, data, partition_name=None):
+        return self._write(data, partition_name)
+
+    def upsert(self, data, partition_name=None):
+        return self._write(data, partition_name, upsert=True)
+
+    def _write(self, data, partition_name, upsert=False):
+        check_insert_schema(self.schema, data)
+        entities = OrmPrepare.prepare_data(data, self.schema)
+        request = Prepare.batch_insert_param(
+            self.name, entities, partition_name, self.schema.to_dict()["fields"]
+        )
+        field, (attr, dtype, _) = self._vector_field()
+        payload = next(f for f in request.fields_data if f.field_name == "embedding").vectors
+        raw = getattr(payload, attr)
+        vectors = np.asarray(raw.data if dtype == np.float32 else np.frombuffer(raw, dtype=dtype))
+        vectors = vectors.reshape(-1, field.params["dim"])
+
+        rows = self.state["rows"]
+        if self.schema.auto_id:
+            keys = [len(rows) + 1 + i for i in range(len(vectors))]
+        else:
+            keys, data = list(data[0]), data[1:]
+            if upsert:
+                rows[:] = [r for r in rows if r["id"] not in set(keys)]
+        for key, vector, text, document_id, document_name in zip(keys, vectors, *data[1:]):
+            rows.append({
+                "id": key,
+                "embedding": vector,
+                "text": text,
+                "document_id": document_id,
+                "document_name": document_name,
+                "partition": partition_name,
+            })
+
+        class _Result:
+            primary_keys = keys
+
+        return _Result()
+
+    def search(self, data, anns_field, param, limit, expr, output_fields, partition_names):
+        _, (_, dtype, placeholder) = self._vector_field()
+        group = common_pb2.PlaceholderGroup()
+        group.ParseFromString(Prepare._prepare_placeholder_str(data))
+        sent = common_pb2.PlaceholderType.Name(group.placeholders[0].type)
+        if sent != placeholder:
+            raise MilvusException(message=f"query is {sent}, field is {placeholder}")
+
+        rows = [r for r in self.state["rows"] if r["partition"] in partition_names]
+        results = []
+        for value in group.placeholders[0].values:
+            query = np.frombuffer(value, dtype=dtype).astype(np.float32)
+            hits = []
+            for row in rows:
+                stored = row["embedding"].astype(np.float32)
+                score = float(stored @ query / (np.linalg.norm(stored) * np.linalg.norm(query)))
+                entity = {name: row[name] for name in output_fields}
+                if "embedding" in entity and dtype != np.float32:
+                    # Byte vectors come back as raw bytes
+                    entity["embedding"] = row["embedding"].tobytes()
+                hits.append(_Hit(row["id"], score, entity))
+            hits.sort(key=lambda hit: hit.score, reverse=True)
+            results.append(hits[:limit])
+        return results
+
+
+class _Utility:
+    @staticmethod
+    def has_collection(name):
+        return name in _FakeCollection.collections
+
+    @staticmethod
+    def drop_collection(name):
+        _FakeCollection.collections.pop(name, None)
+
+
+class _Connections:
+    def connect(self, **kwargs):
+        pass
+
+    def disconnect(self, alias):
+        pass
+
+
+@pytest.fixture
+def fake_milvus(monkeypatch):
+    monkeypatch.setenv("MILVUS_URI", "http://milvus.test:19530")
+    monkeypatch.setenv("MILVUS_TOKEN", "")
+    monkeypatch.setattr(milvus_client, "Collection", _FakeCollection)
+    monkeypatch.setattr(milvus_client, "utility", _Utility)
+    monkeypatch.setattr(milvus_client, "connections", _Connections())
+    monkeypatch.setattr(_FakeCollection, "collections", {})
+
+
+def _vectors(n):
+    vectors = np.random.default_rng(0).standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("precision", ["float32", "float16", "int8"])
+def test_schema_insert_and_search(fake_milvus, monkeypatch, precision):
+    monkeypatch.setattr(settings, "VECTOR_PRECISION", precision)
+    client = MilvusClient()
+    field = next(f for f in client.collection.schema.fields if f.name == "embedding")
+    assert field.dtype == milvus_client._VECTOR_TYPES[precision]
+
+    vectors = _vectors(20)
+    ids = client.insert(vectors.tolist(), [f"t{i}" for i in range(20)], "doc", "doc.txt")
+    assert len(ids) == 20
+
+    hits = client.search(vectors[3].tolist(), 3, with_vectors=True)
+    assert hits[0]["text"] == "t3"
+    assert hits[0]["score"] > 0.99
+    # Decoded vectors point the same way as the originals (int8 drops the scale)
+    stored = np.asarray(hits[0]["embedding"])
+    assert stored.shape == (DIM,)
+    assert stored @ vectors[3] / np.linalg.norm(stored) > 0.99
+
+    batch = client.search_batch(vectors[:2].tolist(), 1)
+    assert [matches[0]["text"] for matches in batch] == ["t0", "t1"]
+
+
+def test_existing_collection_keeps_stored_precision(fake_milvus, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_PRECISION", "int8")
+    MilvusClient().insert(_vectors(5).tolist(), ["a"] * 5, "doc", "doc.txt")
+
+    monkeypatch.setattr(settings, "VECTOR_PRECISION", "float32")
+    client = MilvusClient()
+    assert client.precision == "int8"
+    assert client.search(_vectors(5)[0].tolist(), 1)[0]["score"] > 0.99
+
+
+def _fail_once_after(method, monkeypatch):
+    """
+    The first call of `method` reaches the server, then the client sees
+    an error (e.g. a timeout on the response).
+    """
+    original = getattr(_FakeCollection, method)
+    failed = []
+
+    def flaky(self, *args, **kwargs):
+        result = original(self, *args, **kwargs)
+        if not failed:
+            failed.append(method)
+            raise MilvusException(message="deadline exceeded")
+        return result
+
+    monkeypatch.setattr(_FakeCollection, method, flaky)
+
+
+def test_insert_retry_does_not_duplicate(fake_milvus, monkeypatch):
+    client = MilvusClient()
+    _fail_once_after("insert", monkeypatch)
+
+    ids = client.insert(_vectors(4).tolist(), ["a", "b", "c", "d"], "doc", "doc.txt")
+
+    rows = client.collection.state["rows"]
+    assert sorted(r["id"] for r in rows) == sorted(ids)
+    assert len(set(ids)) == 4
+
+
+def test_insert_is_not_replayed_on_auto_id_collections(fake_milvus, monkeypatch):
+    client = MilvusClient()
+    # A collection created before client-side keys
+    client.collection.schema.fields[0].auto_id = True
+    client.collection.schema._auto_id = True
+    client = MilvusClient()
+    assert client.auto_id
+    _fail_once_after("insert", monkeypatch)
+
+    with pytest.raises(MilvusException):
+        client.insert(_vectors(2).tolist(), ["a", "b"], "doc", "doc.txt")
+    assert len(client.collection.state["rows"]) == 2
+
+
+def test_keys_are_unique_and_increasing():
+    keys = milvus_client._keys.take(10_000)
+    assert keys == sorted(set(keys))
+    assert 0 < keys[0] < keys[-1] < 2**63
@@ -0,0 +1,65 @@
+import pytest
+
+import src.ingestion.pipeline as pipeline
+from src.vectorstore.local_store import LocalVectorStore
+
+
+def _embed(texts):
+    return [[1.0, float(len(t)), 0.0, 0.0] for t in texts]
+
+
+def _failing_embed(after_calls):
+    calls = []
+
+    def embed(texts):
+        calls.append(texts)
+        if len(calls) > after_calls:
+            raise RuntimeError("embedding API down")
+        return _embed(texts)
+
+    return embed
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalVectorStore(str(tmp_path / "index"), dim=4)
+
+
+def _document(tmp_path, name, paragraphs=4):
+    path = tmp_path / f"{name}.txt"
+    path.write_text(
+        "\n\n".join(f"{name} paragraph {i}: " + "word " * 200 for i in range(paragraphs)),
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def _ingest(store, path, document_id, mode):
+    return pipeline.ingest_document(
+        path, document_id, f"{document_id}.txt", store=store, mode=mode, batch_size=1
+    )
+
+
+def test_overwrite_failure_leaves_no_partial_document(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(pipeline, "embed_texts", _embed)
+    assert _ingest(store, _document(tmp_path, "a"), "a", "overwrite")["batches"] > 1
+
+    monkeypatch.setattr(pipeline, "embed_texts", _failing_embed(after_calls=2))
+    with pytest.raises(RuntimeError):
+        _ingest(store, _document(tmp_path, "b"), "b", "overwrite")
+
+    assert store.chunk_ids("b") == []
+    assert store.chunk_ids("a") == []
+
+
+def test_incremental_failure_keeps_previous_version(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(pipeline, "embed_texts", _embed)
+    path = _document(tmp_path, "a")
+    _ingest(store, path, "a", "incremental")
+    before = store.chunk_ids("a")
+
+    monkeypatch.setattr(pipeline, "embed_texts", _failing_embed(after_calls=2))
+    with pytest.raises(RuntimeError):
+        _ingest(store, _document(tmp_path, "a", paragraphs=6), "a", "incremental")
+
+    assert store.chunk_ids("a") == before
@@ -0,0 +1,22 @@
+import src.Query.semantic_cache as semantic_cache
+from src.Query.semantic_cache import SemanticCache
+from src.utils.metrics import MetricsRegistry
+
+
+def test_hits_misses_and_saved_time_are_exported(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(semantic_cache, "metrics", registry)
+    cache = SemanticCache(threshold=0.9)
+
+    cache.store([1.0, 0.0], "cached answer", latency_s=1.5)
+    assert cache.lookup([1.0, 0.05]) == "cached answer"
+    assert cache.lookup([0.0, 1.0]) is None
+    cache.invalidate()
+    assert cache.lookup([1.0, 0.0]) is None
+
+    text = registry.render()
+    assert 'rag_answer_cache_lookups_total{result="hit"} 1' in text
+    assert 'rag_answer_cache_lookups_total{result="miss"} 2' in text
+    assert "rag_answer_cache_saved_seconds_total 1.5" in text
+    assert "rag_answer_cache_invalidations_total 1" in text
+    assert cache.stats()["hit_rate"] == round(1 / 3, 4)